@@ -1,26 +1,39 @@
 import sys
+import click
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 import os
 from flask_migrate import Migrate
-import uuid
-import pdb
+import json
+import asyncio
 import logging
-from datetime import datetime
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import Enum, DateTime, inspect, text
-from supabase import create_client, Client
-
-from services import places_service
-from utils import generate_slug
-
-from openai_example import build_taste_profile, rank_candidates
-from models import db, User, Restaurant, UserRequest, RequestRestaurant, RequestType, UserRestaurantPreference, PreferenceType, FeedbackSuggestion, FeedbackVote
+from sqlalchemy import Enum, DateTime, select
+
+from services import places_service, get_async_places_service
+from services.candidate import Candidate
+import place_store
+import schema_check
+import db_pool
+import history
+import taste
+import preferences as preferences_store
+import prewarm
+import local_places
+import leaderboard
+from request_log import RequestLogEvent, make_request_log, write_events
+import prerank
+import votes
+from prerank import PRERANK_TOP_K, PRERANK_FALLBACK
+from restaurant_index import RestaurantPrefixIndex
+
+from openai_example import NUM_RECOMMENDATIONS, build_taste_profile, rank_candidates, rank_candidates_async, stream_rank_candidates
+from models import db, User, Restaurant, FeedbackSuggestion
 
 # Initialize Flask app, explicitly setting a writable instance path for Vercel
 app = Flask(__name__, instance_path='/tmp/instance')
@@ -66,16 +79,23 @@ if ENVIRONMENT == 'production':
         if not SUPABASE_URL: missing.append('SUPABASE_URL')
         if not SUPABASE_KEY: missing.append('SUPABASE_KEY')
         raise ValueError(f"Missing required Supabase credentials in production environment: {', '.join(missing)}")
-    
-    try:
-        # Initialize Supabase client
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+_supabase_client = None
+
+
+def get_supabase_client():
+    """Production Supabase client, created on first use so the SDK import stays off the cold-start path."""
+    global _supabase_client
+    if _supabase_client is None:
+        from supabase import create_client
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
         logging.info("Successfully configured Supabase client")
-    except Exception as e:
-        logging.error(f"Failed to initialize database connection: {str(e)}")
-        raise
+    return _supabase_client
+
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool profile (serverless / server / sqlite) from DB_POOL_PROFILE, see db_pool.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_pool.engine_options(DATABASE_URL)
 
 # Initialize SQLAlchemy
 db.init_app(app)
@@ -83,6 +103,9 @@ db.init_app(app)
 # Initialize Flask-Migrate
 migrate = Migrate(app, db)
 
+# UserRequest/RequestRestaurant history rows are written behind the response
+request_log = make_request_log(app)
+
 # Set up logging with configurable level
 log_level = os.getenv('LOG_LEVEL', 'DEBUG').upper()
 logging.basicConfig(
@@ -90,84 +113,52 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-# Run database migrations on startup in production
+# Schema verification is a release step (`flask verify-schema`); in production
+# startup only repeats it when SCHEMA_CHECK asks to (see schema_check.py)
 if ENVIRONMENT == 'production':
-    try:
-        logging.info("Running database migrations...")
-        with app.app_context():
-            # Check if tables exist first
-            from sqlalchemy import inspect, text
-            inspector = inspect(db.engine)
-            existing_tables = inspector.get_table_names()
-            logging.info(f"Found existing tables: {existing_tables}")
-            
-            # Log detailed schema information
-            if 'restaurant' in existing_tables:
-                columns = inspector.get_columns('restaurant')
-                logging.info("Restaurant table schema:")
-                for col in columns:
-                    logging.info(f"Column: {col['name']}, Type: {col['type']}, Nullable: {col['nullable']}")
-            
-            # Check if alembic_version table exists and has our initial migration
-            initial_migration_id = 'c9e344f09bd8'  # from our initial migration file
-            cuisine_type_migration_id = '2024_03_14_01'  # from increase_cuisine_type_length.py
-            rich_metadata_migration_id = 'a1b2c3d4e5f6'  # add_rich_metadata_to_restaurant
-            cuisine_type_text_migration_id = 'b2c3d4e5f6a7'  # cuisine_type_to_text
-            up_to_date_ids = {cuisine_type_migration_id, rich_metadata_migration_id, '078519919b65', cuisine_type_text_migration_id}
-            has_alembic = 'alembic_version' in existing_tables
-            should_run_migrations = True
-
-            if has_alembic:
-                # Check if our migrations are recorded
-                with db.engine.connect() as conn:
-                    result = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
-                    logging.info(f"Current migration version: {result}")
-                    if result in up_to_date_ids:
-                        logging.info("All migrations already applied, skipping migrations")
-                        should_run_migrations = False
-                    elif result == initial_migration_id:
-                        logging.info("Need to apply cuisine_type length migration")
-                    else:
-                        logging.info(f"Unknown migration state: {result}")
-            
-            if should_run_migrations:
-                if not existing_tables:
-                    # Only create tables if none exist
-                    logging.info("No tables found. Creating initial schema...")
-                    db.create_all()
-                    
-                    # Record our initial migration
-                    if not has_alembic:
-                        with db.engine.connect() as conn:
-                            conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
-                            conn.execute(text(f"INSERT INTO alembic_version (version_num) VALUES ('{cuisine_type_migration_id}')"))
-                            conn.commit()
-                    logging.info("Recorded initial migration")
-                else:
-                    logging.info("Tables exist but migrations not recorded. Recording initial state...")
-                    if not has_alembic:
-                        with db.engine.connect() as conn:
-                            conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
-                            conn.execute(text(f"INSERT INTO alembic_version (version_num) VALUES ('{cuisine_type_migration_id}')"))
-                            conn.commit()
-                    
-                    # Ensure cuisine_type column is the right length
-                    with db.engine.connect() as conn:
-                        conn.execute(text("ALTER TABLE restaurant ALTER COLUMN cuisine_type TYPE TEXT"))
-                        conn.commit()
-                        logging.info("Updated cuisine_type column to TEXT")
-            
-            # Verify final table state
-            if 'restaurant' in existing_tables:
-                columns = inspector.get_columns('restaurant')
-                logging.info("Final restaurant table schema:")
-                for col in columns:
-                    logging.info(f"Column: {col['name']}, Type: {col['type']}, Nullable: {col['nullable']}")
-        
-    except Exception as e:
-        logging.error(f"Database migration failed: {str(e)}")
-        if ENVIRONMENT == 'production':
-            raise
+    schema_check.check_on_startup(app)
+
+# Keeps the configured areas' candidate pools warm when PREWARM_INTERVAL is set
+# (see prewarm.py). Started by a worker's first request rather than at import,
+# so CLI commands such as `flask db upgrade` and `verify-schema` never run it
+@app.before_request
+def start_prewarm():
+    prewarm.start_background(app)
+
+
+@app.cli.command("rebuild-taste-aggregates")
+def rebuild_taste_aggregates_command():
+    """Recompute every user's taste aggregate from their likes (backfill after the migration)."""
+    user_ids = db.session.execute(select(User.id)).scalars().all()
+    for user_id in user_ids:
+        taste.rebuild_aggregate(user_id)
+    db.session.commit()
+    logging.info(f"Rebuilt taste aggregates for {len(user_ids)} users")
+
+
+@app.cli.command("prewarm-pools")
+@click.option("--loop", is_flag=True, help="Keep refreshing every PREWARM_INTERVAL seconds (default 1800).")
+def prewarm_pools_command(loop):
+    """Refresh the searchNearby candidate pool of every configured area."""
+    if loop:
+        prewarm.run_forever(app, prewarm.PREWARM_INTERVAL or 1800)
+    summary = prewarm.prewarm_all()
+    for target, outcome in summary["targets"]:
+        click.echo(f"{target}: {outcome}")
+    click.echo(
+        f"{summary['refreshed']} refreshed, {summary['skipped']} still fresh, "
+        f"{summary['failed']} failed in {summary['seconds']:.1f}s"
+    )
+
+
+@app.cli.command("verify-schema")
+def verify_schema_command():
+    """Check the production schema/alembic_version state and record the result."""
+    if not schema_check.verify_schema(app):
+        raise click.ClickException(
+            f"Pending migrations: upgrade to {schema_check.latest_migration_id()} (`flask db upgrade`) first"
+        )
+    schema_check.write_marker(app)
 
 
 @app.route('/')
@@ -176,304 +167,333 @@ def index():
     return render_template('index.html')
 
 def _restaurant_to_candidate(r):
-    """Convert a Restaurant ORM object to the candidate dict format used by rank_candidates."""
+    """A revisit Candidate for a Restaurant row or history RestaurantRecord."""
+    return Candidate.from_restaurant(r, is_revisit=True)
+
+
+def _parse_recommendation_request(data):
+    """Validate the /get_recommendations body. Returns (params, error_message)."""
+    if not data:
+        return None, "No data provided"
+
+    user_name = data.get('user', '').lower()
+    if not user_name:
+        return None, "User name is required"
+
+    city = data.get('city')
+    input_weight = float(data.get('input_weight', 0.7))
+    revisit_weight = float(data.get('revisit_weight', 0.0))
+    if not city:
+        return None, "City is required"
+
     return {
-        "name": r.name,
-        "place_id": r.place_id,
-        "address": r.location,
-        "categories": [r.cuisine_type] if r.cuisine_type else [],
-        "price_level": r.price_level,
-        "rating": r.rating,
-        "user_rating_count": r.user_rating_count,
-        "editorial_summary": r.editorial_summary,
-        "primary_type": r.primary_type,
-        "serves_dine_in": r.serves_dine_in,
-        "serves_takeout": r.serves_takeout,
-        "serves_delivery": r.serves_delivery,
-        "reservable": r.reservable,
-        "_is_revisit": True,
-    }
+        "user_name": user_name,
+        "place_ids": data.get('place_ids', []),
+        "input_restaurant_names": data.get('input_restaurants', []),
+        "city": city,
+        "neighborhood": data.get('neighborhood', None),
+        "restaurant_types": data.get('restaurant_types', []),
+        "input_weight": max(0.0, min(1.0, input_weight)),  # clamp to [0, 1]
+        "revisit_weight": max(0.0, min(1.0, revisit_weight)),  # clamp to [0, 1]
+    }, None
+
+
+def _start_user_request(user_name, city):
+    """Get or create the user and start the RequestLogEvent for this call."""
+    user = User.query.filter_by(name=user_name).first()
+    if not user:
+        # If user does not exist, create a new one with a unique email
+        user_email = f"{user_name.lower().replace(' ', '_')}@example.com"
+        user = User(name=user_name, email=user_email)
+        db.session.add(user)
+        db.session.flush()
+
+    return user, RequestLogEvent(user_id=user.id, city=city)
+
+
+def _link_inputs(request_event, input_restaurants):
+    request_event.input_ids = [r.id for r in input_restaurants]
+
+
+def _record_request(request_event):
+    """
+    Hand the request's history rows to the write-behind queue, or write them
+    now if it refuses. Call after the commit that stored the user and restaurants
+    the event refers to.
+    """
+    if not request_log.submit(request_event):
+        write_events([request_event])
+        db.session.commit()
 
 
-@app.route('/get_recommendations', methods=['POST'])
-def get_recommendations():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-            
-        user_name = data.get('user', '').lower()
-        if not user_name:
-            return jsonify({"error": "User name is required"}), 400
-            
-        place_ids = data.get('place_ids', [])
-        input_restaurant_names = data.get('input_restaurants', [])
-        city = data.get('city')
-        neighborhood = data.get('neighborhood', None)
-        restaurant_types = data.get('restaurant_types', [])
-        input_weight = float(data.get('input_weight', 0.7))
-        input_weight = max(0.0, min(1.0, input_weight))  # clamp to [0, 1]
-        revisit_weight = float(data.get('revisit_weight', 0.0))
-        revisit_weight = max(0.0, min(1.0, revisit_weight))  # clamp to [0, 1]
-        if not city:
-            return jsonify({"error": "City is required"}), 400
-
-        logging.info(f"Request: user='{user_name}', city='{city}', neighborhood='{neighborhood}', types='{restaurant_types}', input_weight={input_weight}, revisit_weight={revisit_weight}, place_ids={place_ids}, names={input_restaurant_names}")
-        
-        # Get or create user
-        user = User.query.filter_by(name=user_name).first()
-        if not user:
-            # If user does not exist, create a new one with a unique email
-            user_email = f"{user_name.lower().replace(' ', '_')}@example.com"
-            user = User(name=user_name, email=user_email)
-            db.session.add(user)
-            db.session.flush()
-
-        user_request = UserRequest(user_id=user.id, city=city)
-        db.session.add(user_request)
-
-        # Process and de-duplicate input restaurants
-        input_restaurants = []
-        processed_place_ids = set()
-
-        for place_id in place_ids:
-            if place_id in processed_place_ids:
-                continue # Skip duplicates from user input
-            
-            provider = os.getenv("PLACES_PROVIDER", "google")
-            restaurant = Restaurant.query.filter_by(provider=provider, place_id=place_id).first()
-            
-            if not restaurant:
-                details = places_service.get_details(place_id)
-                if not details or 'name' not in details:
-                    logging.warning(f"Could not fetch valid details for place_id: {place_id}. Skipping.")
-                    continue
+def _load_history(user_id, city):
+    """
+    Liked, disliked and previously recommended (in this city) restaurants for a
+    user, as immutable records with place_ids for hard exclusion. One query.
+    """
+    snapshot = history.load_snapshot(user_id)
+    return list(snapshot.liked), list(snapshot.disliked), list(snapshot.recommended_in(city)), taste.load_aggregate(user_id)
 
-                # Create new restaurant with debug logging
-                logging.info(f"Creating new restaurant with details: {details}")
-                
-                slug = generate_slug(details.get('name', ''), city)
-                # Handle potential slug collision
-                if Restaurant.query.filter_by(slug=slug).first():
-                    slug = f"{slug}-{uuid.uuid4().hex[:6]}"
-
-                restaurant = Restaurant(
-                    name=details.get('name'),
-                    location=details.get('address', ''),
-                    cuisine_type=", ".join(details.get('categories', [])),
-                    provider=provider,
-                    place_id=place_id,
-                    slug=slug,
-                    price_level=details.get('price_level'),
-                    rating=details.get('rating'),
-                    user_rating_count=details.get('user_rating_count'),
-                    editorial_summary=details.get('editorial_summary'),
-                    primary_type=details.get('primary_type'),
-                    serves_dine_in=details.get('serves_dine_in'),
-                    serves_takeout=details.get('serves_takeout'),
-                    serves_delivery=details.get('serves_delivery'),
-                    reservable=details.get('reservable'),
-                    last_enriched_at=datetime.utcnow(),
-                    city_hint=city
-                )
-                logging.info(f"Restaurant object created: {restaurant.__dict__}")
-                
-                db.session.add(restaurant)
-                db.session.flush()  # Get the ID without committing
-                logging.info(f"Restaurant added to session with ID: {restaurant.id}")
-            
-            processed_place_ids.add(place_id)
-            input_restaurants.append(restaurant)
-            
-            # Add to user request
-            req_rest = RequestRestaurant(user_request_id=user_request.id, restaurant_id=restaurant.id, type=RequestType.input)
-            db.session.add(req_rest)
-        
-        # Get user preferences — full ORM objects for both so we have place_ids for hard exclusion
-        liked_restaurant_objs = db.session.query(Restaurant).join(UserRestaurantPreference).filter(
-            UserRestaurantPreference.user_id == user.id,
-            UserRestaurantPreference.preference == PreferenceType.like
-        ).all()
-        disliked_restaurant_objs = db.session.query(Restaurant).join(UserRestaurantPreference).filter(
-            UserRestaurantPreference.user_id == user.id,
-            UserRestaurantPreference.preference == PreferenceType.dislike
-        ).all()
+
+class _RecommendationContext:
+    """Everything derived from history + inputs that candidate building and ranking need."""
+
+    def __init__(self, params, input_restaurants, liked_restaurant_objs, disliked_restaurant_objs, prev_recommended, taste_aggregate=None):
+        self.input_restaurants = input_restaurants
+        self.liked_restaurant_objs = liked_restaurant_objs
+        self.disliked_restaurant_objs = disliked_restaurant_objs
+        self.revisit_weight = revisit_weight = params["revisit_weight"]
 
         # Merge for exclusion purposes only; keep separate for weighted profile/ranking
         all_liked_objs = liked_restaurant_objs + input_restaurants
-        liked_restaurant_names = list({r.name for r in all_liked_objs})
-        disliked_restaurant_names = list({r.name for r in disliked_restaurant_objs})
+        self.liked_restaurant_names = list({r.name for r in all_liked_objs})
+        self.disliked_restaurant_names = list({r.name for r in disliked_restaurant_objs})
 
-        # Build weighted taste profile (history vs. session inputs controlled by input_weight)
-        taste_profile = build_taste_profile(liked_restaurant_objs, input_restaurants, input_weight)
+        # Build weighted taste profile (history vs. session inputs controlled by input_weight);
+        # the stored aggregate stands in for the likes when the user has one
+        taste_history = taste_aggregate if taste_aggregate is not None else liked_restaurant_objs
+        self.taste_profile = build_taste_profile(taste_history, input_restaurants, params["input_weight"])
 
         # Build revisit candidate pool: previously recommended restaurants for this user+city
         disliked_ids = {r.id for r in disliked_restaurant_objs}
         input_place_ids = {r.place_id for r in input_restaurants}
-        prev_recommended = db.session.query(Restaurant).join(RequestRestaurant).join(UserRequest).filter(
-            UserRequest.user_id == user.id,
-            UserRequest.city == city,
-            RequestRestaurant.type == RequestType.recommendation
-        ).all()
-        prev_recommended = [
+        self.prev_recommended = [
             r for r in prev_recommended
             if r.id not in disliked_ids and r.place_id not in input_place_ids
         ]
-        logging.info(f"revisit_weight={revisit_weight}, revisit pool: {len(prev_recommended)} restaurants")
+        logging.info(f"revisit_weight={revisit_weight}, revisit pool: {len(self.prev_recommended)} restaurants")
 
-        # -----------------------------------------------------------------------
-        # CANDIDATE POOL CONSTRUCTION
         # β=1.0 and enough revisits → skip Google entirely; β=0 → exclude revisits.
-        # -----------------------------------------------------------------------
+        self.use_only_revisits = revisit_weight >= 1.0 and len(self.prev_recommended) >= 3
+
+        # Build exclusion set: liked + inputs + disliked, plus prev_recommended when β=0
+        self.excluded_place_ids = {r.place_id for r in all_liked_objs + disliked_restaurant_objs}
+        if revisit_weight == 0.0:
+            self.excluded_place_ids |= {r.place_id for r in self.prev_recommended}
+
+
+def _build_candidate_pool(ctx, params, searched, from_store=False):
+    """
+    Combine search results with the revisit pool. `searched` is the
+    search_nearby_candidates result, or None when the search was skipped.
+    from_store marks a pool read from the local index, which is not written back.
+    """
+    revisit_weight = params["revisit_weight"]
+    if ctx.use_only_revisits:
+        logging.info("Skipping Google search — using revisit pool")
+        return [_restaurant_to_candidate(r) for r in ctx.prev_recommended]
+
+    if revisit_weight >= 1.0:
+        logging.info("Revisit pool too small, falling back to Google")
+
+    # Cached pools are already Candidates; dicts (a reloaded cache file, other providers) are converted once
+    candidates = [Candidate.coerce(c) for c in searched or []]
+    # Write every place we saw back to the local store so later inputs skip get_details.
+    # A pool read from the store has nothing new, and re-stamping it would keep its rows "fresh" forever.
+    if not from_store:
+        place_store.upsert_places(candidates, params["city"], provider=os.getenv("PLACES_PROVIDER", "google"))
+
+    # Inject revisit candidates for mixed mode (β > 0 and β < 1)
+    if revisit_weight > 0.0 and ctx.prev_recommended:
+        n_revisit = round(revisit_weight * min(len(ctx.prev_recommended), 10))
+        revisit_by_rating = sorted(ctx.prev_recommended, key=lambda r: r.rating or 0, reverse=True)
+        new_place_ids = {c.place_id for c in candidates}
+        revisit_to_inject = [
+            _restaurant_to_candidate(r) for r in revisit_by_rating
+            if r.place_id not in new_place_ids
+        ][:n_revisit]
+        candidates = candidates + revisit_to_inject
+        logging.info(f"Injected {len(revisit_to_inject)} revisit candidates into pool")
+    return candidates
+
+
+def _filter_candidates(candidates, ctx, restaurant_types):
+    # -----------------------------------------------------------------------
+    # CANDIDATE PRE-FILTERING
+    # All rules run before Haiku sees the list. Order matters: exclusions first,
+    # then type filter, then sort. Fallback: if a filter leaves <3 candidates
+    # it is skipped to avoid empty results.
+    # -----------------------------------------------------------------------
+
+    # 1. Exclude non-restaurants (hotels, lodging) — skip for revisit-only pool
+    if not ctx.use_only_revisits:
+        LODGING_TYPES = {
+            "hotel", "motel", "lodging", "extended_stay_hotel", "resort_hotel",
+            "bed_and_breakfast", "hostel", "inn", "vacation_rental"
+        }
+        candidates = [
+            c for c in candidates
+            if (c.primary_type or "").lower() not in LODGING_TYPES
+        ]
+
+    # 2. Exclude places the user has already interacted with (liked, disliked, input)
+    if not ctx.use_only_revisits:
+        candidates = [c for c in candidates if c.place_id not in ctx.excluded_place_ids]
+
+    # 3. Minimum rating floor — exclude places rated below 3.5
+    RATING_FLOOR = 3.5
+    above_floor = [c for c in candidates if (c.rating or 0) >= RATING_FLOOR]
+    candidates = above_floor if len(above_floor) >= 3 else candidates
+
+    # 4. Type filter — enforce Fine Dining / Bar / Casual using price_level and primary_type
+    if restaurant_types:
+        FINE_DINING_PRICES = {"PRICE_LEVEL_EXPENSIVE", "PRICE_LEVEL_VERY_EXPENSIVE"}
+        BAR_TYPES = {"bar", "cocktail_bar", "wine_bar", "pub", "bar_and_grill"}
+
+        def matches_type(c):
+            price = c.price_level or ""
+            ptype = (c.primary_type or "").lower()
+            cats = [t.lower() for t in c.categories]
+            for rt in restaurant_types:
+                if rt == "Fine Dining":
+                    if price in FINE_DINING_PRICES or ptype == "fine_dining_restaurant":
+                        return True
+                elif rt == "Bar":
+                    if ptype in BAR_TYPES or any(t in BAR_TYPES for t in cats):
+                        return True
+                elif rt == "Casual":
+                    if ptype != "fine_dining_restaurant" and price != "PRICE_LEVEL_VERY_EXPENSIVE":
+                        return True
+            return False
+
+        type_filtered = [c for c in candidates if matches_type(c)]
+        candidates = type_filtered if len(type_filtered) >= 3 else candidates
+
+    # 5. Sort by rating descending so equal pre-rank scores keep the better-rated place first
+    candidates.sort(key=lambda c: c.rating or 0, reverse=True)
+
+    # 6. Local pre-rank against the taste profile; only the top K reach the prompt
+    pool_size = len(candidates)
+    candidates = prerank.top_k(candidates, ctx.taste_profile, PRERANK_TOP_K, ctx.revisit_weight)
+
+    logging.info(f"Candidate pool after filtering: {pool_size} restaurants, {len(candidates)} sent to ranking")
+    return candidates
+
+
+def _fallback_ranked(ctx, candidates):
+    """Pre-ranker picks for when the LLM rank call fails; [] if the fallback is disabled."""
+    if not PRERANK_FALLBACK:
+        return []
+    logging.warning("LLM ranking returned nothing; serving pre-ranked fallback")
+    return prerank.fallback_rank(candidates, ctx.taste_profile, NUM_RECOMMENDATIONS, ctx.revisit_weight)
+
+
+def _rank_kwargs(ctx, params, candidates):
+    """Keyword arguments shared by rank_candidates and rank_candidates_async."""
+    return dict(
+        taste_profile=ctx.taste_profile,
+        candidates=candidates,
+        liked_restaurant_objs=ctx.liked_restaurant_objs,
+        input_restaurant_objs=ctx.input_restaurants,
+        alpha=params["input_weight"],
+        liked_names=ctx.liked_restaurant_names,
+        disliked_names=ctx.disliked_restaurant_names,
+        city=params["city"],
+        neighborhood=params["neighborhood"],
+        restaurant_types=params["restaurant_types"],
+        revisit_weight=params["revisit_weight"]
+    )
+
+
+def _save_recommendations(ranked, request_event, city):
+    """
+    Save ranked recommendations as Restaurant records and add them to the
+    request's history event; returns the response dicts. Round trips don't grow
+    with len(ranked): place_store.ensure_places() resolves and inserts the
+    restaurants in bulk.
+    """
+    recs = [rec for rec in ranked if rec.get('place_id')]
+    rows = place_store.ensure_places(recs, city, provider='google')
+    saved = [(rec, rows[rec['place_id']]) for rec in recs if rec['place_id'] in rows]
+    request_event.recommendation_ids.extend(row.id for _, row in saved)
+
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "description": rec.get('description', ''),
+            "reason": rec.get('reason'),
+            "address": row.location
+        }
+        for rec, row in saved
+    ]
+
+
+def _log_request(params):
+    logging.info(f"Request: user='{params['user_name']}', city='{params['city']}', neighborhood='{params['neighborhood']}', types='{params['restaurant_types']}', input_weight={params['input_weight']}, revisit_weight={params['revisit_weight']}, place_ids={params['place_ids']}, names={params['input_restaurant_names']}")
+
+
+def _search_local(city, neighborhood, restaurant_types, cuisine_types=None):
+    """The local index's candidate pool, or None to search the provider."""
+    if not local_places.LOCAL_INDEX_ENABLED:
+        return None
+    return local_places.LocalPlacesService(places_service).search_local(
+        city, neighborhood, restaurant_types, cuisine_types=cuisine_types
+    )
+
+
+def _session_cuisines(input_restaurants):
+    """Primary types of the session's input restaurants; the provider turns cuisine types among them into extra searches."""
+    return [r.primary_type for r in input_restaurants if r.primary_type]
+
+
+def _prepare_recommendation(params):
+    """
+    Sync pipeline up to ranking: user + UserRequest, input resolution, history,
+    candidate pool and filters. Returns (request_event, ctx, candidates).
+    """
+    city = params["city"]
+    user, request_event = _start_user_request(params["user_name"], city)
+
+    # Resolve and de-duplicate input restaurants: one IN query for known places,
+    # concurrent get_details for the misses, one flush for the new rows
+    provider = os.getenv("PLACES_PROVIDER", "google")
+    place_ids = params["place_ids"]
+    input_restaurants = place_store.resolve_many(place_ids, city, provider=provider)
+    if len(input_restaurants) < len(set(place_ids)):
+        logging.warning(f"Resolved {len(input_restaurants)} of {len(set(place_ids))} input place_ids")
+    _link_inputs(request_event, input_restaurants)
+
+    ctx = _RecommendationContext(params, input_restaurants, *_load_history(user.id, city))
+
+    searched, from_store = None, False
+    if not ctx.use_only_revisits:
+        cuisines = _session_cuisines(ctx.input_restaurants)
+        searched = _search_local(city, params["neighborhood"], params["restaurant_types"], cuisines)
+        from_store = searched is not None
+        if searched is None:
+            searched = places_service.search_nearby_candidates(
+                city, params["neighborhood"], params["restaurant_types"], cuisine_types=cuisines,
+            )
+    candidates = _filter_candidates(
+        _build_candidate_pool(ctx, params, searched, from_store), ctx, params["restaurant_types"]
+    )
+    return request_event, ctx, candidates
 
-        USE_ONLY_REVISITS = revisit_weight >= 1.0 and len(prev_recommended) >= 3
 
-        if USE_ONLY_REVISITS:
-            logging.info("Skipping Google search — using revisit pool")
-            candidates = [_restaurant_to_candidate(r) for r in prev_recommended]
-        else:
-            if revisit_weight >= 1.0:
-                logging.info("Revisit pool too small, falling back to Google")
-
-            # Build exclusion set: liked + inputs + disliked, plus prev_recommended when β=0
-            excluded_place_ids = {r.place_id for r in all_liked_objs + disliked_restaurant_objs}
-            if revisit_weight == 0.0:
-                excluded_place_ids |= {r.place_id for r in prev_recommended}
-
-            candidates = places_service.search_nearby_candidates(city, neighborhood, restaurant_types)
-
-            # Inject revisit candidates for mixed mode (β > 0 and β < 1)
-            if revisit_weight > 0.0 and prev_recommended:
-                n_revisit = round(revisit_weight * min(len(prev_recommended), 10))
-                revisit_by_rating = sorted(prev_recommended, key=lambda r: r.rating or 0, reverse=True)
-                new_place_ids = {c['place_id'] for c in candidates}
-                revisit_to_inject = [
-                    _restaurant_to_candidate(r) for r in revisit_by_rating
-                    if r.place_id not in new_place_ids
-                ][:n_revisit]
-                candidates = candidates + revisit_to_inject
-                logging.info(f"Injected {len(revisit_to_inject)} revisit candidates into pool")
-
-        # -----------------------------------------------------------------------
-        # CANDIDATE PRE-FILTERING
-        # All rules run before Haiku sees the list. Order matters: exclusions first,
-        # then type filter, then sort. Fallback: if a filter leaves <3 candidates
-        # it is skipped to avoid empty results.
-        # -----------------------------------------------------------------------
-
-        # 1. Exclude non-restaurants (hotels, lodging) — skip for revisit-only pool
-        if not USE_ONLY_REVISITS:
-            LODGING_TYPES = {
-                "hotel", "motel", "lodging", "extended_stay_hotel", "resort_hotel",
-                "bed_and_breakfast", "hostel", "inn", "vacation_rental"
-            }
-            candidates = [
-                c for c in candidates
-                if (c.get("primary_type") or "").lower() not in LODGING_TYPES
-            ]
-
-        # 2. Exclude places the user has already interacted with (liked, disliked, input)
-        if not USE_ONLY_REVISITS:
-            candidates = [c for c in candidates if c.get("place_id") not in excluded_place_ids]
-
-        # 3. Minimum rating floor — exclude places rated below 3.5
-        RATING_FLOOR = 3.5
-        above_floor = [c for c in candidates if (c.get("rating") or 0) >= RATING_FLOOR]
-        candidates = above_floor if len(above_floor) >= 3 else candidates
-
-        # 4. Type filter — enforce Fine Dining / Bar / Casual using price_level and primary_type
-        if restaurant_types:
-            FINE_DINING_PRICES = {"PRICE_LEVEL_EXPENSIVE", "PRICE_LEVEL_VERY_EXPENSIVE"}
-            BAR_TYPES = {"bar", "cocktail_bar", "wine_bar", "pub", "bar_and_grill"}
-
-            def matches_type(c):
-                price = c.get("price_level") or ""
-                ptype = (c.get("primary_type") or "").lower()
-                cats = [t.lower() for t in c.get("categories", [])]
-                for rt in restaurant_types:
-                    if rt == "Fine Dining":
-                        if price in FINE_DINING_PRICES or ptype == "fine_dining_restaurant":
-                            return True
-                    elif rt == "Bar":
-                        if ptype in BAR_TYPES or any(t in BAR_TYPES for t in cats):
-                            return True
-                    elif rt == "Casual":
-                        if ptype != "fine_dining_restaurant" and price != "PRICE_LEVEL_VERY_EXPENSIVE":
-                            return True
-                return False
-
-            type_filtered = [c for c in candidates if matches_type(c)]
-            candidates = type_filtered if len(type_filtered) >= 3 else candidates
-
-        # 5. Sort by rating descending so highest-quality candidates appear first in the prompt
-        candidates.sort(key=lambda c: c.get("rating") or 0, reverse=True)
-
-        logging.info(f"Candidate pool after filtering: {len(candidates)} restaurants")
+@app.route('/get_recommendations', methods=['POST'])
+def get_recommendations():
+    try:
+        params, error = _parse_recommendation_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+        _log_request(params)
+        city = params["city"]
+
+        request_event, ctx, candidates = _prepare_recommendation(params)
 
         if not candidates:
             return jsonify({"error": "Could not retrieve candidate restaurants at this time."}), 500
 
         # Rank candidates using Haiku, with session inputs and history as separate contexts
-        ranked = rank_candidates(
-            taste_profile=taste_profile,
-            candidates=candidates,
-            liked_restaurant_objs=liked_restaurant_objs,
-            input_restaurant_objs=input_restaurants,
-            alpha=input_weight,
-            liked_names=liked_restaurant_names,
-            disliked_names=disliked_restaurant_names,
-            city=city,
-            neighborhood=neighborhood,
-            restaurant_types=restaurant_types,
-            revisit_weight=revisit_weight
-        )
+        ranked = rank_candidates(**_rank_kwargs(ctx, params, candidates)) or _fallback_ranked(ctx, candidates)
 
         if not ranked:
             return jsonify({"error": "Could not retrieve recommendations at this time."}), 500
 
-        # Save ranked recommendations as Restaurant records and RequestRestaurant links
-        output_restaurants = []
-        for rec in ranked:
-            rec_place_id = rec.get('place_id')
-            if not rec_place_id:
-                continue
-
-            resolved_restaurant = Restaurant.query.filter_by(provider='google', place_id=rec_place_id).first()
-            if not resolved_restaurant:
-                slug = generate_slug(rec['name'], city)
-                if Restaurant.query.filter_by(slug=slug).first():
-                    slug = f"{slug}-{uuid.uuid4().hex[:6]}"
-                resolved_restaurant = Restaurant(
-                    name=rec['name'],
-                    location=rec.get('address', city),
-                    cuisine_type="",
-                    provider='google',
-                    place_id=rec_place_id,
-                    slug=slug,
-                    price_level=rec.get('price_level'),
-                    rating=rec.get('rating'),
-                    last_enriched_at=datetime.utcnow(),
-                    city_hint=city
-                )
-                db.session.add(resolved_restaurant)
-                db.session.flush()
-
-            req_rec = RequestRestaurant(
-                user_request_id=user_request.id,
-                restaurant_id=resolved_restaurant.id,
-                type=RequestType.recommendation
-            )
-            db.session.add(req_rec)
-
-            output_restaurants.append({
-                "id": resolved_restaurant.id,
-                "name": resolved_restaurant.name,
-                "description": rec.get('description', ''),
-                "reason": rec.get('reason'),
-                "address": resolved_restaurant.location
-            })
-
+        output_restaurants = _save_recommendations(ranked, request_event, city)
         db.session.commit()
+        _record_request(request_event)
         return jsonify({"recommendations": output_restaurants})
         
     except Exception as e:
@@ -481,12 +501,242 @@ def get_recommendations():
         logging.error(f"Error in get_recommendations: {str(e)}", exc_info=True)
         return jsonify({"error": "An internal server error occurred."}), 500
 
+
+def _stream_ranked(rank_kwargs, ctx, candidates):
+    """Streamed LLM picks, or the pre-ranked fallback if the stream produced none."""
+    streamed = False
+    for rec in stream_rank_candidates(**rank_kwargs):
+        streamed = True
+        yield rec
+    if not streamed:
+        yield from _fallback_ranked(ctx, candidates)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/get_recommendations_stream', methods=['POST'])
+def get_recommendations_stream():
+    """
+    Streaming /get_recommendations. Request validation and candidate building
+    are identical and still answer with JSON errors; once ranking starts the
+    response is text/event-stream:
+
+        event: recommendation   one per pick, same shape as the JSON endpoint's items
+        event: done             {"count": n}
+        event: error            {"error": "..."}
+
+    Each recommendation is committed before it is sent, so its id can be
+    liked/disliked as soon as the card renders.
+    """
+    try:
+        params, error = _parse_recommendation_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+        _log_request(params)
+        city = params["city"]
+
+        request_event, ctx, candidates = _prepare_recommendation(params)
+
+        if not candidates:
+            return jsonify({"error": "Could not retrieve candidate restaurants at this time."}), 500
+
+        rank_kwargs = _rank_kwargs(ctx, params, candidates)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error in get_recommendations_stream: {str(e)}", exc_info=True)
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+    def generate():
+        sent = 0
+        try:
+            for rec in _stream_ranked(rank_kwargs, ctx, candidates):
+                saved = _save_recommendations([rec], request_event, city)
+                if not saved:
+                    continue
+                db.session.commit()
+                sent += 1
+                yield _sse("recommendation", saved[0])
+
+            if not sent:
+                db.session.rollback()
+                yield _sse("error", {"error": "Could not retrieve recommendations at this time."})
+                return
+            _record_request(request_event)
+            yield _sse("done", {"count": sent})
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error in get_recommendations_stream: {str(e)}", exc_info=True)
+            yield _sse("error", {"error": "An internal server error occurred."})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route('/get_recommendations_async', methods=['POST'])
+async def get_recommendations_async():
+    """
+    Same contract as /get_recommendations, with the independent stages overlapped:
+    the nearby search, the get_details calls for unknown inputs and the history
+    queries all run at once, so the wait is the slowest of them rather than the sum.
+
+    The history queries run on a worker thread with the request's session while
+    this coroutine only awaits network I/O; every other DB access happens here,
+    before or after that window, so the session is never used from two threads at once.
+    """
+    try:
+        params, error = _parse_recommendation_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+        _log_request(params)
+        city = params["city"]
+
+        user, request_event = _start_user_request(params["user_name"], city)
+        plan = place_store.plan_resolve(params["place_ids"], provider=os.getenv("PLACES_PROVIDER", "google"))
+
+        # The local index query uses the session, so it runs before the history thread starts
+        # Only inputs already stored are known before the search starts
+        cuisines = _session_cuisines(plan.known.values())
+        local_pool = _search_local(city, params["neighborhood"], params["restaurant_types"], cuisines)
+
+        async with get_async_places_service() as places:
+            # The search is started up front even though β=1.0 with a big enough
+            # revisit pool won't use it; that is only known once history is loaded.
+            if local_pool is not None:
+                search_task = asyncio.ensure_future(asyncio.sleep(0, result=local_pool))
+            else:
+                search_task = asyncio.ensure_future(places.search_nearby_candidates(
+                    city, params["neighborhood"], params["restaurant_types"], cuisine_types=cuisines
+                ))
+            details_task = asyncio.ensure_future(place_store.fetch_details_async(plan.misses, places))
+            history_rows = await asyncio.to_thread(_load_history, user.id, city)
+            fetched, searched = await asyncio.gather(details_task, search_task)
+
+        input_restaurants = place_store.finish_resolve(plan, fetched, city)
+        if len(input_restaurants) < len(plan.ordered_ids):
+            logging.warning(f"Resolved {len(input_restaurants)} of {len(plan.ordered_ids)} input place_ids")
+        _link_inputs(request_event, input_restaurants)
+
+        ctx = _RecommendationContext(params, input_restaurants, *history_rows)
+        candidates = _filter_candidates(
+            _build_candidate_pool(ctx, params, searched, from_store=local_pool is not None), ctx, params["restaurant_types"]
+        )
+
+        if not candidates:
+            return jsonify({"error": "Could not retrieve candidate restaurants at this time."}), 500
+
+        ranked = await rank_candidates_async(**_rank_kwargs(ctx, params, candidates)) or _fallback_ranked(ctx, candidates)
+
+        if not ranked:
+            return jsonify({"error": "Could not retrieve recommendations at this time."}), 500
+
+        output_restaurants = _save_recommendations(ranked, request_event, city)
+        db.session.commit()
+        _record_request(request_event)
+        return jsonify({"recommendations": output_restaurants})
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error in get_recommendations_async: {str(e)}", exc_info=True)
+        return jsonify({"error": "An internal server error occurred."}), 500
+
+
+# Columns /get_restaurants may project; `id` is always returned (it is the cursor)
+RESTAURANT_LIST_FIELDS = (
+    "id", "name", "location", "cuisine_type", "place_id", "slug", "price_level", "rating",
+    "user_rating_count", "editorial_summary", "primary_type", "city_hint",
+)
+RESTAURANT_PAGE_SIZE = 100
+RESTAURANT_PAGE_MAX = 500
+# Rows fetched per round trip from the server-side cursor in NDJSON mode
+RESTAURANT_STREAM_CHUNK = 1000
+
+
+def _parse_restaurant_listing(args):
+    """Validate /get_restaurants query args. Returns (params, error_message)."""
+    fields = ["id"]
+    for field in (args.get('fields') or "name").split(","):
+        field = field.strip()
+        if field not in RESTAURANT_LIST_FIELDS:
+            return None, f"Unknown field '{field}'"
+        if field not in fields:
+            fields.append(field)
+
+    stream = args.get('format') == 'ndjson'
+    # JSON pages always have a size; an NDJSON export is unbounded unless one is given
+    default_limit = None if stream else RESTAURANT_PAGE_SIZE
+    try:
+        cursor = int(args.get('cursor', 0))
+        limit = int(args['limit']) if args.get('limit') else default_limit
+    except ValueError:
+        return None, "cursor and limit must be integers"
+    if limit is not None and (limit < 1 or (not stream and limit > RESTAURANT_PAGE_MAX)):
+        return None, f"limit must be between 1 and {RESTAURANT_PAGE_MAX}"
+
+    return {
+        "fields": fields,
+        "cursor": cursor,
+        "limit": limit,
+        "city": args.get('city'),
+        "primary_type": args.get('primary_type'),
+        "stream": stream,
+    }, None
+
+
+def _restaurant_listing_stmt(params):
+    """Keyset query: WHERE id > cursor [AND filters] ORDER BY id, selecting only the requested columns."""
+    stmt = select(*(getattr(Restaurant, f) for f in params["fields"])).where(
+        Restaurant.id > params["cursor"]
+    ).order_by(Restaurant.id)
+    if params["city"]:
+        stmt = stmt.where(Restaurant.city_hint == params["city"])
+    if params["primary_type"]:
+        stmt = stmt.where(Restaurant.primary_type == params["primary_type"])
+    return stmt
+
+
 @app.route('/get_restaurants', methods=['GET'])
 def get_restaurants():
+    """
+    Restaurant catalog, keyset-paginated on id.
+
+        ?fields=name,rating       columns to return (id is always included; default: name)
+        ?city=Chicago             filter on city_hint
+        ?primary_type=pizza_restaurant
+        ?cursor=<id>              return rows after this id (the previous page's next_cursor)
+        ?limit=100                page size (max RESTAURANT_PAGE_MAX)
+        ?format=ndjson            stream every matching row, one JSON object per line,
+                                  from a server-side cursor; memory stays constant
+
+    JSON pages look like {"restaurants": [...], "next_cursor": id or null}.
+    """
+    params, error = _parse_restaurant_listing(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    stmt = _restaurant_listing_stmt(params)
+
+    if params["stream"]:
+        if params["limit"]:
+            stmt = stmt.limit(params["limit"])
+
+        def generate():
+            result = db.session.execute(stmt.execution_options(yield_per=RESTAURANT_STREAM_CHUNK))
+            for row in result:
+                yield json.dumps(row._asdict()) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
     try:
-        restaurants = Restaurant.query.all()
-        restaurant_list = [{"id": r.id, "name": r.name} for r in restaurants]
-        return jsonify({"restaurants": restaurant_list})
+        rows = db.session.execute(stmt.limit(params["limit"] + 1)).all()
+        page = rows[:params["limit"]]
+        return jsonify({
+            "restaurants": [row._asdict() for row in page],
+            "next_cursor": page[-1].id if len(rows) > params["limit"] else None,
+        })
     except Exception as e:
         logging.error(f"Error fetching restaurants: {e}")
         return jsonify({"error": str(e)})
@@ -518,40 +768,13 @@ def save_preferences():
             logging.error(f"User not found: {user_name}")
             return jsonify({"error": "User not found"}), 404
 
-        # Get all existing preferences for this user
-        existing_preferences = UserRestaurantPreference.query.filter_by(user_id=user.id).all()
-        existing_pref_map = {pref.restaurant_id: pref for pref in existing_preferences}
-
-        # Process incoming preferences
-        for pref in preferences:
-            restaurant_id = pref['restaurant_id']
-            preference_type = pref['preference'].lower()
-            
-            logging.debug(f"Processing preference: restaurant_id={restaurant_id}, type={preference_type}")
-
-            try:
-                pref_enum = PreferenceType[preference_type]
-                
-                if restaurant_id in existing_pref_map:
-                    # Update existing preference
-                    existing_pref = existing_pref_map[restaurant_id]
-                    existing_pref.preference = pref_enum
-                    existing_pref.timestamp = datetime.utcnow()
-                    logging.debug(f"Updated existing preference to {pref_enum}")
-                else:
-                    # Create new preference
-                    new_pref = UserRestaurantPreference(
-                        user_id=user.id,
-                        restaurant_id=restaurant_id,
-                        preference=pref_enum,
-                        timestamp=datetime.utcnow()
-                    )
-                    db.session.add(new_pref)
-                    logging.debug(f"Created new preference: {pref_enum}")
-
-            except KeyError as e:
-                logging.error(f"Invalid preference type: {preference_type}")
-                return jsonify({"error": f"Invalid preference type: {preference_type}"}), 400
+        # One validating read, then one upsert for whatever actually changed
+        try:
+            diff = preferences_store.save_preferences(user.id, preferences)
+        except preferences_store.InvalidPreferences as e:
+            logging.error(str(e))
+            return jsonify({"error": str(e)}), 400
+        logging.debug(f"Preferences: {len(diff.inserts)} new, {len(diff.updates)} changed, {len(diff.unchanged)} unchanged")
 
         db.session.commit()
         logging.debug("Successfully saved all preferences")
@@ -573,21 +796,12 @@ def get_user_preferences():
             logging.error(f"User not found: {user_name}")
             return jsonify({"error": "User not found"}), 404
 
-        # 1. Get existing preferences
-        preferences = UserRestaurantPreference.query.filter_by(user_id=user.id).all()
-        pref_map = {p.restaurant_id: p.preference.value for p in preferences}
-
-        # 2. Get restaurants recommended to the user (History)
-        # Join UserRequest -> RequestRestaurant -> Restaurant
-        recommended_restaurants = db.session.query(Restaurant).join(RequestRestaurant).join(UserRequest)\
-            .filter(UserRequest.user_id == user.id, RequestRestaurant.type == RequestType.recommendation).all()
-
-        # 3. Get restaurants explicitly rated (even if not recommended recently)
-        rated_restaurants = db.session.query(Restaurant).join(UserRestaurantPreference)\
-            .filter(UserRestaurantPreference.user_id == user.id).all()
+        # Rated and previously recommended restaurants in one query
+        snapshot = history.load_snapshot(user.id)
+        pref_map = snapshot.preference_map()
 
         # Combine and deduplicate
-        all_relevant_restaurants = {r.id: r for r in recommended_restaurants + rated_restaurants}.values()
+        all_relevant_restaurants = {r.id: r for r in snapshot.recommended_in() + tuple(r for r, _ in snapshot.preferences)}.values()
 
         # Build response
         restaurant_list = []
@@ -633,6 +847,11 @@ def update_user():
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+# Suggestions returned per keystroke, and how many local matches answer without the provider
+AUTOCOMPLETE_LIMIT = 5
+AUTOCOMPLETE_LOCAL_MIN = int(os.getenv("AUTOCOMPLETE_LOCAL_MIN", AUTOCOMPLETE_LIMIT))
+restaurant_prefix_index = RestaurantPrefixIndex()
+
 @app.route('/autocomplete')
 def autocomplete():
     query = request.args.get('query', '')
@@ -641,12 +860,23 @@ def autocomplete():
     
     if not query or not city:
         return jsonify([])
-    
+
+    # First tier: restaurants we already store for this city
+    provider = os.getenv("PLACES_PROVIDER", "google")
+    local_results = restaurant_prefix_index.search(query, city, provider, limit=AUTOCOMPLETE_LIMIT)
+    if len(local_results) >= AUTOCOMPLETE_LOCAL_MIN:
+        return jsonify(local_results)
+
+    # Second tier: provider autocomplete (cached per normalized prefix + city)
     results = places_service.autocomplete(query, city, session_token=session_token)
     if results is None:
+        if local_results:
+            return jsonify(local_results)
         return jsonify({"error": "API call failed. Check server logs and API key configuration."}), 500
-    
-    return jsonify(results)
+
+    local_place_ids = {r["place_id"] for r in local_results}
+    merged = local_results + [r for r in results if r.get("place_id") not in local_place_ids]
+    return jsonify(merged[:AUTOCOMPLETE_LIMIT])
 
 # --- Feedback Routes ---
 
@@ -671,6 +901,7 @@ def submit_feedback():
         )
         db.session.add(suggestion)
         db.session.commit()
+        leaderboard.invalidate()
         
         return jsonify({"success": True, "id": suggestion.id})
         
@@ -681,6 +912,11 @@ def submit_feedback():
 
 @app.route('/get_feedback', methods=['GET'])
 def get_feedback():
+    """
+    Top suggestions with the caller's vote on each. The ranking comes from the
+    cached leaderboard snapshot; the caller's votes are looked up for the shown
+    ids only. Supports If-None-Match: an unchanged board answers 304.
+    """
     try:
         user_name = request.args.get('user_name')
         user_id = None
@@ -688,28 +924,24 @@ def get_feedback():
             user = User.query.filter_by(name=user_name).first()
             if user:
                 user_id = user.id
-        
-        # Get all suggestions sorted by score desc
-        suggestions = FeedbackSuggestion.query.order_by(FeedbackSuggestion.score.desc()).limit(50).all()
-        
-        # Get user's votes if user exists
-        user_votes = {} # suggestion_id -> vote_type
-        if user_id:
-            votes = FeedbackVote.query.filter_by(user_id=user_id).all()
-            for v in votes:
-                user_votes[v.suggestion_id] = v.vote_type
-        
+
+        snapshot = leaderboard.top_suggestions()
+        user_votes = leaderboard.user_votes(user_id, snapshot.ids) if user_id else {}
+
         result = []
-        for s in suggestions:
+        for suggestion_id, content, score in snapshot.entries:
             result.append({
-                "id": s.id,
-                "content": s.content,
-                "score": s.score,
-                "user_vote": user_votes.get(s.id, 0) # 0 if no vote, 1 if up, -1 if down
+                "id": suggestion_id,
+                "content": content,
+                "score": score,
+                "user_vote": user_votes.get(suggestion_id, 0) # 0 if no vote, 1 if up, -1 if down
             })
-            
-        return jsonify({"suggestions": result})
-        
+
+        response = jsonify({"suggestions": result})
+        response.set_etag(leaderboard.response_etag(snapshot, user_votes))
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
     except Exception as e:
         logging.error(f"Error getting feedback: {e}")
         return jsonify({"error": str(e)}), 500
@@ -725,53 +957,33 @@ def vote_feedback():
         if not all([user_name, suggestion_id, vote_type]):
             return jsonify({"error": "Missing data"}), 400
             
+        if vote_type not in votes.VOTE_TYPES:
+            return jsonify({"error": "vote_type must be 1 or -1"}), 400
+
         user = User.query.filter_by(name=user_name).first()
         if not user:
             return jsonify({"error": "User not found"}), 404
-            
-        suggestion = FeedbackSuggestion.query.get(suggestion_id)
-        if not suggestion:
+
+        # Vote row transition and score update happen in the database; see votes.py
+        voted = votes.cast_vote(user.id, suggestion_id, vote_type)
+        if voted is None:
             return jsonify({"error": "Suggestion not found"}), 404
-            
-        # Check existing vote
-        existing_vote = FeedbackVote.query.filter_by(
-            user_id=user.id, 
-            suggestion_id=suggestion.id
-        ).first()
-        
-        new_score_delta = 0
-        
-        if existing_vote:
-            if existing_vote.vote_type == vote_type:
-                # Toggle off (remove vote)
-                db.session.delete(existing_vote)
-                new_score_delta = -vote_type
-            else:
-                # Switch vote (e.g. 1 to -1)
-                # Score change: -1 - 1 = -2
-                new_score_delta = vote_type - existing_vote.vote_type
-                existing_vote.vote_type = vote_type
-        else:
-            # New vote
-            new_vote = FeedbackVote(
-                user_id=user.id,
-                suggestion_id=suggestion.id,
-                vote_type=vote_type
-            )
-            db.session.add(new_vote)
-            new_score_delta = vote_type
-            
-        # Update cached score
-        suggestion.score += new_score_delta
+        _, new_score = voted
         db.session.commit()
-        
-        return jsonify({"success": True, "new_score": suggestion.score})
+        leaderboard.invalidate()
+
+        return jsonify({"success": True, "new_score": new_score})
         
     except Exception as e:
         logging.error(f"Error voting: {e}")
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics/db_pool', methods=['GET'])
+def db_pool_metrics():
+    """Connection pool checkout/wait counters and the live pool state for this worker."""
+    return jsonify(db_pool.pool_status(db.engine))
+
 # This is required for Vercel deployment
 app.debug = True
 
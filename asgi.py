@@ -0,0 +1,18 @@
+"""
+ASGI entry point.
+
+Serves the same Flask app to an ASGI server, e.g.
+
+    uvicorn asgi:asgi_app --workers 2
+
+Flask still handles each request synchronously; `async def` views such as
+/get_recommendations_async run their awaits on an event loop per request,
+which is where the overlapping of Places, history and ranking I/O happens.
+The WSGI entry point (app.py / gunicorn / Vercel) is unchanged.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+asgi_app = WsgiToAsgi(app)
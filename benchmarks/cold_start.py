@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark: import time of app.py and time to first response, each
+measured in a fresh interpreter.
+
+Each run starts a new `python` process. It times `import app` and then the
+first request through the test client (GET /get_restaurants?limit=1, which
+opens the first DB connection). The "eager SDKs" row imports openai,
+anthropic and supabase before the app, as app.py used to.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 10 --database-url sqlite:////tmp/campfire.db
+
+Uses a temporary SQLite database unless --database-url is given (its tables are created if missing).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+for name in {preload!r}:
+    __import__(name)
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get("/get_restaurants?limit=1")
+assert response.status_code == 200, response.status_code
+responded = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "first_response": responded - imported,
+    "sdks_loaded": [m for m in ("openai", "anthropic", "supabase") if m in sys.modules],
+}}))
+"""
+
+
+def run_child(preload, env):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(preload=preload)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="database for the first request (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cold_start.db')}"
+    env = dict(os.environ, FLASK_ENV="development", DEV_DATABASE_URL=database_url, LOG_LEVEL="WARNING")
+
+    # Create the schema once, outside the timed runs
+    subprocess.run(
+        [sys.executable, "-c", "import app\nwith app.app.app_context(): app.db.create_all()"],
+        cwd=ROOT, env=env, check=True, capture_output=True,
+    )
+
+    print(f"{args.runs} fresh interpreters per row ({database_url})\n")
+    print(f"{'':14} {'import (ms)':>12} {'first resp (ms)':>16}  SDKs loaded at first response")
+    for label, preload in (("lazy SDKs", ()), ("eager SDKs", ("openai", "anthropic", "supabase"))):
+        results = [run_child(preload, env) for _ in range(args.runs)]
+        import_ms = statistics.median(r["import"] for r in results) * 1000
+        first_ms = statistics.median(r["first_response"] for r in results) * 1000
+        print(f"{label:14} {import_ms:12.0f} {first_ms:16.0f}  {', '.join(results[-1]['sdks_loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
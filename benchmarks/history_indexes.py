@@ -0,0 +1,150 @@
+"""
+Benchmark the per-user history queries with and without the composite indexes
+from migrations/versions/add_history_indexes.py.
+
+Seeds `--rows` history rows (user_request, request_restaurant and
+user_restaurant_preference, split 1:2:1) into a scratch database, then times
+history.load_snapshot() for random users. The three indexes are dropped for the
+"before" run and recreated for "after". The query plan is printed for both.
+
+    python benchmarks/history_indexes.py                     # 1M rows, temp SQLite file
+    python benchmarks/history_indexes.py --rows 100000
+    python benchmarks/history_indexes.py --database-url postgresql://...   # must be a scratch DB
+
+The target database's tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask
+from sqlalchemy import text
+
+import history
+from models import db, User, Restaurant, UserRequest, RequestRestaurant, UserRestaurantPreference
+
+HISTORY_INDEXES = (
+    "ix_user_request_user_city",
+    "ix_request_restaurant_request_type_restaurant",
+    "ix_user_restaurant_preference_user_preference",
+)
+CITIES = ("Chicago", "New York")
+BATCH = 50000
+
+
+def _indexes():
+    tables = (UserRequest.__table__, RequestRestaurant.__table__, UserRestaurantPreference.__table__)
+    return [index for table in tables for index in table.indexes if index.name in HISTORY_INDEXES]
+
+
+def seed(rows, users, restaurants):
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [
+        {"id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, users + 1)
+    ])
+    conn.execute(Restaurant.__table__.insert(), [
+        {"id": i, "name": f"Restaurant {i}", "location": "1 Bench St", "provider": "google",
+         "place_id": f"pid_{i}", "slug": f"restaurant-{i}", "rating": 4.0, "city_hint": CITIES[i % 2]}
+        for i in range(1, restaurants + 1)
+    ])
+
+    n_requests = rows // 4
+    n_links = rows // 2
+    # One preference per (user, restaurant), as uq_user_restaurant_preference_user_restaurant requires
+    n_prefs = min(rows - n_requests - n_links, users * restaurants)
+    rng = random.Random(42)
+
+    for start in range(0, n_requests, BATCH):
+        conn.execute(UserRequest.__table__.insert(), [
+            {"id": i + 1, "user_id": rng.randint(1, users), "city": rng.choice(CITIES)}
+            for i in range(start, min(start + BATCH, n_requests))
+        ])
+    for start in range(0, n_links, BATCH):
+        conn.execute(RequestRestaurant.__table__.insert(), [
+            {"user_request_id": i // 2 + 1, "restaurant_id": rng.randint(1, restaurants),
+             "type": "recommendation" if i % 2 else "input"}
+            for i in range(start, min(start + BATCH, n_links))
+        ])
+    pairs = rng.sample(range(users * restaurants), n_prefs)
+    for start in range(0, n_prefs, BATCH):
+        conn.execute(UserRestaurantPreference.__table__.insert(), [
+            {"user_id": pair // restaurants + 1, "restaurant_id": pair % restaurants + 1,
+             "preference": rng.choice(("like", "dislike"))}
+            for pair in pairs[start:start + BATCH]
+        ])
+    db.session.commit()
+
+
+def time_snapshots(users, repeat):
+    rng = random.Random(7)
+    timings = []
+    for _ in range(repeat):
+        user_id = rng.randint(1, users)
+        started = time.perf_counter()
+        history.load_snapshot(user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def print_plan(label):
+    snapshot_sql = str(history.snapshot_query(1).compile(db.engine, compile_kwargs={"literal_binds": True}))
+    explain = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    print(f"\n-- plan {label} --")
+    for row in db.session.execute(text(explain + snapshot_sql)):
+        print("  ", " | ".join(str(v) for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="history rows to seed (default 1,000,000)")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--restaurants", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200, help="snapshot loads per run")
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'history_bench.db')}"
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    db.init_app(app)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for index in _indexes():
+            index.drop(db.engine)
+
+        started = time.perf_counter()
+        seed(args.rows, args.users, args.restaurants)
+        print(f"Seeded {args.rows:,} history rows in {time.perf_counter() - started:.1f}s ({database_url})")
+
+        print_plan("without indexes")
+        before = time_snapshots(args.users, args.repeat)
+
+        for index in _indexes():
+            index.create(db.engine)
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+
+        print_plan("with indexes")
+        after = time_snapshots(args.users, args.repeat)
+
+        print(f"\nload_snapshot over {args.repeat} users   mean      p95")
+        print(f"  without indexes            {before[0]:8.2f}ms {before[1]:8.2f}ms")
+        print(f"  with indexes               {after[0]:8.2f}ms {after[1]:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Concurrency benchmark for feedback voting.
+
+Fires `--voters` users at one popular suggestion from `--threads` threads. Each
+voter votes +1, switches to -1, then switches back to +1, so the correct final
+score is exactly `--voters`. The same workload runs twice:
+
+    atomic   votes.cast_vote(): conditional vote-row statements + score = score + :delta
+    legacy   the old route body: read suggestion and vote, change them in Python, commit
+
+For each run it reports throughput, failed transactions, and whether the
+materialized score matches both the expected value and SUM(vote_type).
+
+    python benchmarks/vote_concurrency.py                      # temp SQLite file (WAL)
+    python benchmarks/vote_concurrency.py --voters 5000 --threads 32
+    python benchmarks/vote_concurrency.py --database-url postgresql://...   # must be a scratch DB
+
+The target database's tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask
+from sqlalchemy import event, func, select
+
+import votes
+from models import db, User, FeedbackSuggestion, FeedbackVote
+
+SEQUENCE = (1, -1, 1)
+
+
+def legacy_vote(user_id, suggestion_id, vote_type):
+    """The pre-votes.py route body: read-modify-write in Python."""
+    suggestion = db.session.get(FeedbackSuggestion, suggestion_id)
+    existing_vote = FeedbackVote.query.filter_by(user_id=user_id, suggestion_id=suggestion_id).first()
+    if existing_vote:
+        if existing_vote.vote_type == vote_type:
+            db.session.delete(existing_vote)
+            delta = -vote_type
+        else:
+            delta = vote_type - existing_vote.vote_type
+            existing_vote.vote_type = vote_type
+    else:
+        db.session.add(FeedbackVote(user_id=user_id, suggestion_id=suggestion_id, vote_type=vote_type))
+        delta = vote_type
+    suggestion.score += delta
+
+
+def atomic_vote(user_id, suggestion_id, vote_type):
+    votes.cast_vote(user_id, suggestion_id, vote_type)
+
+
+def reset(voters):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(User.__table__.insert(), [
+        {"id": i, "name": f"voter{i}", "email": f"voter{i}@example.com"} for i in range(1, voters + 1)
+    ])
+    suggestion = FeedbackSuggestion(user_id=1, content="Popular idea", score=0)
+    db.session.add(suggestion)
+    db.session.commit()
+    return suggestion.id
+
+
+def run(app, vote_fn, voters, threads):
+    with app.app_context():
+        suggestion_id = reset(voters)
+
+    def voter(user_id):
+        failed = 0
+        for vote_type in SEQUENCE:
+            with app.app_context():
+                try:
+                    vote_fn(user_id, suggestion_id, vote_type)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    failed += 1
+        return failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        failed = sum(pool.map(voter, range(1, voters + 1)))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        score = db.session.get(FeedbackSuggestion, suggestion_id).score
+        vote_sum = db.session.execute(select(func.coalesce(func.sum(FeedbackVote.vote_type), 0))).scalar_one()
+    return {
+        "votes": voters * len(SEQUENCE),
+        "elapsed": elapsed,
+        "failed": failed,
+        "score": score,
+        "vote_sum": vote_sum,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'votes_bench.db')}"
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    engine_options = {"pool_size": args.threads, "max_overflow": 0}
+    if database_url.startswith("sqlite"):
+        engine_options["connect_args"] = {"timeout": 30, "check_same_thread": False}
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
+    db.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            @event.listens_for(db.engine, "connect")
+            def _wal(dbapi_connection, _):
+                dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    print(f"{args.voters} voters x {len(SEQUENCE)} votes on one suggestion, {args.threads} threads ({database_url})")
+    print(f"expected final score: {args.voters}\n")
+    print(f"{'':8} {'votes/s':>9} {'failed':>7} {'score':>7} {'SUM(vote)':>10}  consistent")
+    for label, vote_fn in (("atomic", atomic_vote), ("legacy", legacy_vote)):
+        r = run(app, vote_fn, args.voters, args.threads)
+        consistent = r["score"] == r["vote_sum"] == args.voters and not r["failed"]
+        print(f"{label:8} {r['votes'] / r['elapsed']:9.0f} {r['failed']:7d} {r['score']:7d} {r['vote_sum']:10d}  {consistent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+SQLAlchemy engine profiles and connection-pool metrics.
+
+engine_options(url) returns SQLALCHEMY_ENGINE_OPTIONS for the selected
+DB_POOL_PROFILE:
+
+    serverless  NullPool: every checkout opens a fresh connection and closes it
+                on checkin, so frozen or recycled function instances never hold
+                idle Postgres connections. Point the URL at a transaction pooler
+                (Supavisor / PgBouncer, port 6543 on Supabase), which does the
+                pooling.
+    server      sized QueuePool for gunicorn and other long-running workers:
+                pre-ping on checkout, recycle before the pooler's idle timeout,
+                LIFO so surplus connections age out, and a bounded checkout wait.
+    sqlite      local development and tests. A file database waits on locks
+                instead of failing. In-memory databases keep Flask-SQLAlchemy's
+                StaticPool.
+
+DB_POOL_PROFILE=auto (the default) picks sqlite for sqlite:// URLs, serverless
+on Vercel (VERCEL is set) and server otherwise.
+
+The pooled profiles use Timed* pool classes, which record checkout counts and
+how long each checkout waited. pool_metrics.stats() reports them, and
+/metrics/db_pool serves them with the live pool status.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "auto")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+# Seconds a request waits for a pooled connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Below Supavisor's idle timeout, so the pool never hands out a connection the pooler already dropped
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+# Checkouts slower than this are logged
+DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", 100))
+
+PROFILES = ("serverless", "server", "sqlite")
+
+
+class PoolMetrics:
+    """Process-wide checkout counters for the Timed* pools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+        if seconds * 1000 >= DB_POOL_SLOW_CHECKOUT_MS:
+            logging.warning(f"db pool: checkout waited {seconds * 1000:.0f}ms" + (" and timed out" if timed_out else ""))
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedPool:
+    """Pool mixin timing _do_get(): the wait for a pooled connection, or the connect for NullPool."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    pass
+
+
+for _pool_class in (TimedQueuePool, TimedNullPool):
+    event.listen(_pool_class, "checkin", lambda *args: pool_metrics.count("checkins"))
+    event.listen(_pool_class, "connect", lambda *args: pool_metrics.count("connects"))
+    event.listen(_pool_class, "invalidate", lambda *args: pool_metrics.count("invalidations"))
+
+
+def select_profile(url: str) -> str:
+    profile = DB_POOL_PROFILE
+    if profile == "auto":
+        if make_url(url).get_backend_name() == "sqlite":
+            return "sqlite"
+        return "serverless" if os.getenv("VERCEL") else "server"
+    if profile not in PROFILES:
+        raise ValueError(f"DB_POOL_PROFILE must be one of {PROFILES} or 'auto', got {profile!r}")
+    return profile
+
+
+def engine_options(url: str, profile: str = None) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for url under profile (default: select_profile(url))."""
+    profile = profile or select_profile(url)
+    backend = make_url(url).get_backend_name()
+
+    if profile == "sqlite":
+        # Flask-SQLAlchemy swaps in StaticPool for in-memory databases
+        return {"connect_args": {"timeout": 30}} if backend == "sqlite" else {}
+
+    connect_args = {}
+    if backend == "postgresql":
+        connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT, "application_name": "campfire"}
+
+    if profile == "serverless":
+        return {"poolclass": TimedNullPool, "connect_args": connect_args}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+        "connect_args": connect_args,
+    }
+
+
+def pool_status(engine) -> dict:
+    """pool_metrics.stats() plus the live pool state for engine."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **pool_metrics.stats()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "idle": pool.checkedin(),
+        })
+    return status
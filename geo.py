@@ -0,0 +1,90 @@
+"""
+Geohash encoding and circle covers for the local spatial index.
+
+Restaurant rows store a GEOHASH_PRECISION-character geohash of their
+coordinates. A geohash prefix is a lat/lng cell, and all points in a cell
+share the prefix, so "rows in these cells" is a set of index range scans.
+cover() picks the finest precision whose cells still cover a search circle in
+at most `max_cells` cells.
+"""
+
+import math
+from typing import List, Tuple
+
+GEOHASH_PRECISION = 9  # ~5m cells
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6_371_000
+METRES_PER_DEGREE = 111_320
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True  # bits alternate longitude, latitude, starting with longitude
+    while len(chars) < precision:
+        rng, coord = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(latitude degrees, longitude degrees) spanned by one cell at precision."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def cover(latitude: float, longitude: float, radius_m: float, max_cells: int = 16) -> List[str]:
+    """Geohash cells that together contain the circle's bounding box, at the finest precision with <= max_cells."""
+    dlat = radius_m / METRES_PER_DEGREE
+    dlng = radius_m / (METRES_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        cells = _cells_in_box(latitude - dlat, latitude + dlat, longitude - dlng, longitude + dlng,
+                              precision, lat_step, lng_step, max_cells)
+        if cells is not None:
+            return cells
+    return [""]  # the whole world
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _cells_in_box(south, north, west, east, precision, lat_step, lng_step, max_cells):
+    """Cells touching the box, sampled at cell spacing (plus the far edges); None if more than max_cells."""
+    cells = []
+    for lat in _steps(south, north, lat_step):
+        for lng in _steps(west, east, lng_step):
+            cell = encode(max(-90.0, min(90.0, lat)), ((lng + 180.0) % 360.0) - 180.0, precision)
+            if cell not in cells:
+                cells.append(cell)
+                if len(cells) > max_cells:
+                    return None
+    return cells
+
+
+def _steps(start: float, stop: float, step: float):
+    value = start
+    while value < stop:
+        yield value
+        value += step
+    yield stop
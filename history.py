@@ -0,0 +1,125 @@
+"""
+Per-user history snapshot for the recommendation hot path.
+
+A user's likes, dislikes and past recommendations come back from one UNION ALL
+query (one round trip instead of three or four) as frozen RestaurantRecord
+tuples rather than live ORM objects. The records can be handed to another
+thread, cached or compared without touching the session. They expose the
+same attribute names as Restaurant, so build_taste_profile, rank_candidates
+and the candidate helpers accept either.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import String, cast, literal, null, select, union_all
+
+from models import db, Restaurant, UserRestaurantPreference, UserRequest, RequestRestaurant, RequestType
+
+RECORD_COLUMNS = (
+    "id", "name", "place_id", "location", "cuisine_type", "price_level", "rating",
+    "user_rating_count", "editorial_summary", "primary_type", "serves_dine_in",
+    "serves_takeout", "serves_delivery", "reservable", "city_hint",
+)
+
+RECOMMENDATION = "recommendation"
+
+
+@dataclass(frozen=True)
+class RestaurantRecord:
+    """Immutable copy of the Restaurant columns the recommendation flow reads."""
+    id: int
+    name: str
+    place_id: str
+    location: str
+    cuisine_type: Optional[str]
+    price_level: Optional[str]
+    rating: Optional[float]
+    user_rating_count: Optional[int]
+    editorial_summary: Optional[str]
+    primary_type: Optional[str]
+    serves_dine_in: Optional[bool]
+    serves_takeout: Optional[bool]
+    serves_delivery: Optional[bool]
+    reservable: Optional[bool]
+    city_hint: Optional[str]
+
+    @classmethod
+    def from_restaurant(cls, restaurant: Restaurant) -> "RestaurantRecord":
+        return cls(**{name: getattr(restaurant, name) for name in RECORD_COLUMNS})
+
+
+@dataclass(frozen=True)
+class UserHistorySnapshot:
+    """
+    Everything a request needs from a user's history.
+
+    `preferences` holds every rated restaurant with its preference value
+    ("like", "dislike", "neutral"). `recommended` holds (city, record) pairs,
+    one per restaurant per city it was recommended in.
+    """
+    user_id: Optional[int]
+    preferences: Tuple[Tuple[RestaurantRecord, str], ...] = ()
+    recommended: Tuple[Tuple[str, RestaurantRecord], ...] = ()
+
+    @property
+    def liked(self) -> Tuple[RestaurantRecord, ...]:
+        return tuple(r for r, pref in self.preferences if pref == "like")
+
+    @property
+    def disliked(self) -> Tuple[RestaurantRecord, ...]:
+        return tuple(r for r, pref in self.preferences if pref == "dislike")
+
+    def recommended_in(self, city: Optional[str] = None) -> Tuple[RestaurantRecord, ...]:
+        """Previously recommended restaurants, for one city or (city=None) all of them, de-duplicated."""
+        seen = set()
+        records = []
+        for rec_city, record in self.recommended:
+            if (city is None or rec_city == city) and record.id not in seen:
+                seen.add(record.id)
+                records.append(record)
+        return tuple(records)
+
+    def preference_map(self) -> dict:
+        """restaurant_id -> preference value."""
+        return {r.id: pref for r, pref in self.preferences}
+
+
+def snapshot_query(user_id: int):
+    """The UNION ALL behind load_snapshot(): preference rows, then distinct (city, restaurant) recommendation rows."""
+    columns = [getattr(Restaurant, name) for name in RECORD_COLUMNS]
+    # The Enum column is cast to text so both branches of the union share a plain string "kind"
+    preferences = select(
+        cast(UserRestaurantPreference.preference, String).label("kind"),
+        null().label("request_city"),
+        *columns,
+    ).join(UserRestaurantPreference, UserRestaurantPreference.restaurant_id == Restaurant.id).where(
+        UserRestaurantPreference.user_id == user_id
+    )
+    recommended = select(
+        literal(RECOMMENDATION, String).label("kind"),
+        UserRequest.city.label("request_city"),
+        *columns,
+    ).distinct().join(RequestRestaurant, RequestRestaurant.restaurant_id == Restaurant.id).join(
+        UserRequest, UserRequest.id == RequestRestaurant.user_request_id
+    ).where(
+        UserRequest.user_id == user_id,
+        RequestRestaurant.type == RequestType.recommendation
+    )
+    return union_all(preferences, recommended)
+
+
+def load_snapshot(user_id: Optional[int]) -> UserHistorySnapshot:
+    """Load a user's preferences and recommendation history in a single query."""
+    if user_id is None:
+        return UserHistorySnapshot(user_id=None)
+
+    prefs = []
+    recs = []
+    for row in db.session.execute(snapshot_query(user_id)):
+        record = RestaurantRecord(**{name: row._mapping[name] for name in RECORD_COLUMNS})
+        if row.kind == RECOMMENDATION:
+            recs.append((row.request_city, record))
+        else:
+            prefs.append((record, row.kind))
+    return UserHistorySnapshot(user_id=user_id, preferences=tuple(prefs), recommended=tuple(recs))
@@ -0,0 +1,84 @@
+"""
+Feedback leaderboard for /get_feedback.
+
+The top LEADERBOARD_SIZE suggestions are read once (an index-backed ORDER BY
+score DESC, id LIMIT n) and kept as an immutable snapshot in a one-entry
+TTLCache. /vote_feedback and /submit_feedback call invalidate() after they
+commit. LEADERBOARD_TTL bounds how stale another worker process's snapshot can
+get, since invalidation is per process.
+
+Each snapshot carries an etag derived from its contents. The route combines it
+with the caller's votes, so a polling client can get a 304 with no body.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import select
+
+from models import db, FeedbackSuggestion, FeedbackVote
+from services.cache import TTLCache
+
+LEADERBOARD_SIZE = 50
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", 30))
+
+SNAPSHOT_KEY = "top"
+leaderboard_cache = TTLCache("leaderboard", ttl=LEADERBOARD_TTL, max_entries=1)
+
+
+@dataclass(frozen=True)
+class LeaderboardSnapshot:
+    entries: Tuple[Tuple[int, str, int], ...]  # (id, content, score), best first
+    etag: str
+
+    @property
+    def ids(self) -> Tuple[int, ...]:
+        return tuple(entry[0] for entry in self.entries)
+
+
+def top_suggestions() -> LeaderboardSnapshot:
+    """The current top-N snapshot, from the cache when it is warm."""
+    # An empty board is a valid snapshot; only a failed load should skip the cache
+    return leaderboard_cache.get_or_load(SNAPSHOT_KEY, _load_snapshot, cacheable=lambda s: s is not None)
+
+
+def invalidate() -> None:
+    leaderboard_cache.invalidate(SNAPSHOT_KEY)
+
+
+def user_votes(user_id: int, suggestion_ids: Iterable[int]) -> Dict[int, int]:
+    """suggestion_id -> vote_type for the given suggestions only."""
+    suggestion_ids = list(suggestion_ids)
+    if not suggestion_ids:
+        return {}
+    rows = db.session.execute(
+        select(FeedbackVote.suggestion_id, FeedbackVote.vote_type).where(
+            FeedbackVote.user_id == user_id,
+            FeedbackVote.suggestion_id.in_(suggestion_ids)
+        )
+    )
+    return {suggestion_id: vote_type for suggestion_id, vote_type in rows}
+
+
+def response_etag(snapshot: LeaderboardSnapshot, votes: Dict[int, int]) -> str:
+    """ETag for a /get_feedback body: the snapshot plus the caller's votes on it."""
+    if not votes:
+        return snapshot.etag
+    return _digest([snapshot.etag, sorted(votes.items())])
+
+
+def _load_snapshot() -> LeaderboardSnapshot:
+    rows = db.session.execute(
+        select(FeedbackSuggestion.id, FeedbackSuggestion.content, FeedbackSuggestion.score)
+        .order_by(FeedbackSuggestion.score.desc(), FeedbackSuggestion.id)
+        .limit(LEADERBOARD_SIZE)
+    )
+    entries = tuple((id_, content, score) for id_, content, score in rows)
+    return LeaderboardSnapshot(entries=entries, etag=_digest(entries))
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(json.dumps(value).encode()).hexdigest()
@@ -0,0 +1,157 @@
+"""
+Nearby candidate search served from the Restaurant table.
+
+Every place the provider returns is stored by place_store with its
+coordinates and a geohash (geo.py). search_local() answers a
+search_nearby_candidates() call from those rows: the search circle is
+covered with a few geohash cells, each cell is one range scan on
+ix_restaurant_geohash, and the rows are filtered by exact distance, type set
+and freshness. When the circle holds fewer than PLACES_LOCAL_MIN_CANDIDATES
+matching rows, or fewer than PLACES_LOCAL_MIN_CUISINE_CANDIDATES rows of one
+of the session's cuisines, it returns None and LocalPlacesService asks the
+provider.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select
+
+import geo
+import place_store
+from models import db, Restaurant
+from services.candidate import Candidate
+from services.google_service import nearby_searches, search_area, session_cuisine_types
+from services.places import PlacesService
+
+# PLACES_LOCAL_INDEX=0 sends every nearby search to the provider
+LOCAL_INDEX_ENABLED = os.getenv("PLACES_LOCAL_INDEX", "1") != "0"
+# Fewer matching rows than this (capped at max_results) counts as thin coverage
+LOCAL_MIN_CANDIDATES = int(os.getenv("PLACES_LOCAL_MIN_CANDIDATES", 20))
+# Same, per session cuisine: the provider's cuisine searches are what find these
+LOCAL_MIN_CUISINE_CANDIDATES = int(os.getenv("PLACES_LOCAL_MIN_CUISINE_CANDIDATES", 5))
+# Rows older than this are not served; ratings are the shortest-lived field
+LOCAL_MAX_AGE = place_store.FIELD_MAX_AGE["rating"]
+
+
+def search_local(
+    city: str,
+    neighborhood: Optional[str] = None,
+    restaurant_types: Optional[List] = None,
+    radius: int = 8000,
+    max_results: int = 20,
+    min_candidates: int = LOCAL_MIN_CANDIDATES,
+    cuisine_types: Optional[List[str]] = None,
+) -> Optional[List[Candidate]]:
+    """
+    search_nearby_candidates() from stored rows, most-reviewed first, or None
+    if the area is unknown or has too few fresh matching rows. Like the
+    provider's cuisine searches (nearby_searches), each session cuisine in
+    cuisine_types contributes its own most-reviewed rows, and a cuisine with
+    fewer than LOCAL_MIN_CUISINE_CANDIDATES rows counts as thin coverage.
+    """
+    area = search_area(city, neighborhood, restaurant_types, radius)
+    if area is None:
+        return None
+    centre, search_radius, included_types = area
+    started = time.perf_counter()
+
+    lat, lng = centre["latitude"], centre["longitude"]
+    rows = db.session.execute(
+        select(Restaurant).where(
+            Restaurant.provider == place_store.default_provider(),
+            Restaurant.last_enriched_at >= datetime.utcnow() - LOCAL_MAX_AGE,
+            or_(*(_prefix_range(cell) for cell in geo.cover(lat, lng, search_radius))),
+        )
+    ).scalars().all()
+
+    wanted = set(included_types)
+    matches = [
+        r for r in rows
+        if r.name and r.latitude is not None
+        and wanted.intersection((r.cuisine_type or "").split(", "))
+        and geo.distance_m(lat, lng, r.latitude, r.longitude) <= search_radius
+    ]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if len(matches) < min(min_candidates, max_results):
+        logging.debug(f"local places: {len(matches)} rows near {neighborhood or city}, too few ({elapsed_ms:.1f}ms)")
+        return None
+
+    matches.sort(key=lambda r: (r.user_rating_count or 0, r.rating or 0), reverse=True)
+    cuisines = session_cuisine_types(cuisine_types) if included_types == ["restaurant"] else []
+    by_cuisine = [
+        [r for r in matches if cuisine in (r.cuisine_type or "").split(", ")]
+        for cuisine in cuisines
+    ]
+    for cuisine, cuisine_rows in zip(cuisines, by_cuisine):
+        if len(cuisine_rows) < min(LOCAL_MIN_CUISINE_CANDIDATES, min_candidates, max_results):
+            logging.debug(f"local places: {len(cuisine_rows)} {cuisine} rows near {neighborhood or city}, too few ({elapsed_ms:.1f}ms)")
+            return None
+
+    logging.debug(f"local places: served {neighborhood or city} from {len(matches)} rows ({elapsed_ms:.1f}ms)")
+    # As many rows as the provider's whole-circle and tile searches would return,
+    # then each cuisine's own top rows, in search order without duplicates
+    limit = max_results * (len(nearby_searches(centre, search_radius, included_types, cuisine_types)) - len(cuisines))
+    served, seen = [], set()
+    for r in matches[:limit] + [r for rows in by_cuisine for r in rows[:max_results]]:
+        if r.place_id not in seen:
+            seen.add(r.place_id)
+            served.append(r)
+    return [Candidate.from_restaurant(r) for r in served]
+
+
+class LocalPlacesService(PlacesService):
+    """
+    PlacesService that answers nearby searches from the local index and hands
+    everything else, and thin-coverage searches, to `fallback`. Needs an app
+    context for the DB query.
+    """
+
+    def __init__(self, fallback: PlacesService, min_candidates: int = LOCAL_MIN_CANDIDATES):
+        self.fallback = fallback
+        self.min_candidates = min_candidates
+
+    def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> list[dict]:
+        return self.fallback.autocomplete(query, city, session_token=session_token)
+
+    def get_details(self, place_id: str, session_token: Optional[str] = None) -> dict:
+        return self.fallback.get_details(place_id, session_token=session_token)
+
+    def search_nearby_candidates(
+        self, city: str, neighborhood: Optional[str] = None,
+        restaurant_types: Optional[List] = None, radius: int = 8000,
+        max_results: int = 20, cuisine_types: Optional[List[str]] = None
+    ) -> List[dict]:
+        local = self.search_local(city, neighborhood, restaurant_types, radius, max_results, cuisine_types)
+        if local is not None:
+            return local
+        return self.fallback.search_nearby_candidates(
+            city, neighborhood, restaurant_types, radius, max_results, cuisine_types=cuisine_types
+        )
+
+    def search_local(
+        self, city: str, neighborhood: Optional[str] = None,
+        restaurant_types: Optional[List] = None, radius: int = 8000,
+        max_results: int = 20, cuisine_types: Optional[List[str]] = None
+    ) -> Optional[List[dict]]:
+        """The local half of search_nearby_candidates(): search_local(), or None on thin coverage or error."""
+        try:
+            # A savepoint, so a failed query does not poison the request's transaction
+            with db.session.begin_nested():
+                return search_local(
+                    city, neighborhood, restaurant_types, radius, max_results, self.min_candidates, cuisine_types
+                )
+        except Exception as e:
+            logging.warning(f"local places: index query failed, using the provider: {e}")
+            return None
+
+
+def _prefix_range(cell: str):
+    """Rows whose geohash starts with cell, as an index-friendly range (LIKE 'x%' often is not)."""
+    if not cell:
+        return Restaurant.geohash.isnot(None)
+    upper = cell[:-1] + chr(ord(cell[-1]) + 1)
+    return and_(Restaurant.geohash >= cell, Restaurant.geohash < upper)
@@ -0,0 +1,25 @@
+"""add_feedback_score_index
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-17 00:00:00.000000
+
+Index for the /get_feedback leaderboard (ORDER BY score DESC, id LIMIT 50),
+so the top-N read walks the index instead of sorting the whole table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_feedback_suggestion_score', 'feedback_suggestion', [sa.text('score DESC'), 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_feedback_suggestion_score', table_name='feedback_suggestion')
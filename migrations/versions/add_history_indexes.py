@@ -0,0 +1,30 @@
+"""add_history_indexes
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-17 00:00:00.000000
+
+Composite indexes for the per-user history queries (history.load_snapshot,
+get_user_preferences). Without them every lookup scans the whole table.
+"""
+from alembic import op
+
+
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_request_user_city', 'user_request', ['user_id', 'city'])
+    op.create_index('ix_request_restaurant_request_type_restaurant', 'request_restaurant',
+                    ['user_request_id', 'type', 'restaurant_id'])
+    op.create_index('ix_user_restaurant_preference_user_preference', 'user_restaurant_preference',
+                    ['user_id', 'preference'])
+
+
+def downgrade():
+    op.drop_index('ix_user_restaurant_preference_user_preference', table_name='user_restaurant_preference')
+    op.drop_index('ix_request_restaurant_request_type_restaurant', table_name='request_restaurant')
+    op.drop_index('ix_user_request_user_city', table_name='user_request')
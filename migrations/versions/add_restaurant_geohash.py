@@ -0,0 +1,34 @@
+"""add_restaurant_geohash
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-17 00:00:00.000000
+
+Coordinates and a geohash per restaurant for the local spatial index
+(local_places.py). Existing rows get coordinates the next time the place store
+refreshes them from a Places response.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurant') as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_restaurant_geohash', 'restaurant', ['geohash'])
+
+
+def downgrade():
+    op.drop_index('ix_restaurant_geohash', table_name='restaurant')
+    with op.batch_alter_table('restaurant') as batch_op:
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
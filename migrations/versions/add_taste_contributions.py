@@ -0,0 +1,29 @@
+"""add_taste_contributions
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-17 00:00:00.000000
+
+The attribute values each liked restaurant contributed to a user's taste
+aggregate, so an unlike subtracts what was added even after the restaurant
+was refreshed. Existing rows start empty; their next unlike rebuilds them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'user_taste_aggregate',
+        sa.Column('contributions', sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+    )
+
+
+def downgrade():
+    op.drop_column('user_taste_aggregate', 'contributions')
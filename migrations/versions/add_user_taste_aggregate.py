@@ -0,0 +1,37 @@
+"""add_user_taste_aggregate
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-17 00:00:00.000000
+
+Per-user sums over liked restaurants for build_taste_profile, maintained
+incrementally by /save_preferences. Existing users are backfilled with
+`flask rebuild-taste-aggregates` (until then they fall back to aggregating
+their likes per request).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_taste_aggregate',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), primary_key=True),
+        sa.Column('like_count', sa.Integer(), nullable=False),
+        sa.Column('price_level_counts', sa.JSON(), nullable=False),
+        sa.Column('primary_type_counts', sa.JSON(), nullable=False),
+        sa.Column('bool_counts', sa.JSON(), nullable=False),
+        sa.Column('rating_sum', sa.Float(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('user_taste_aggregate')
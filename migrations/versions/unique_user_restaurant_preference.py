@@ -0,0 +1,35 @@
+"""unique_user_restaurant_preference
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-17 00:00:00.000000
+
+One preference row per (user_id, restaurant_id), the conflict target of the
+bulk upsert in preferences.py. Duplicates left by the old per-row save path
+are collapsed to the most recent row first.
+"""
+from alembic import op
+
+
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM user_restaurant_preference
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM user_restaurant_preference GROUP BY user_id, restaurant_id
+        )
+    """)
+    with op.batch_alter_table('user_restaurant_preference') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_user_restaurant_preference_user_restaurant', ['user_id', 'restaurant_id']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user_restaurant_preference') as batch_op:
+        batch_op.drop_constraint('uq_user_restaurant_preference_user_restaurant', type_='unique')
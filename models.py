@@ -34,6 +34,9 @@ class Restaurant(db.Model):
     reservable         = db.Column(db.Boolean, nullable=True)
     last_enriched_at   = db.Column(db.DateTime, nullable=True)
     city_hint          = db.Column(db.String(100), nullable=True)
+    latitude           = db.Column(db.Float, nullable=True)
+    longitude          = db.Column(db.Float, nullable=True)
+    geohash            = db.Column(db.String(12), nullable=True)   # geo.encode(latitude, longitude)
 
     preferences = db.relationship('UserRestaurantPreference', back_populates='restaurant')
     # Can't have two relationships with the same back_populates.
@@ -42,6 +45,8 @@ class Restaurant(db.Model):
     __table_args__ = (
         db.UniqueConstraint("provider", "place_id", name="uq_restaurant_provider_place"),
         db.UniqueConstraint("slug", name="uq_restaurant_slug"),
+        # Prefix range scans for local nearby searches (see local_places.py)
+        db.Index("ix_restaurant_geohash", "geohash"),
     )
 
     def __repr__(self):
@@ -67,6 +72,25 @@ class UserRestaurantPreference(db.Model):
     user = db.relationship('User', back_populates='preferences')
     restaurant = db.relationship('Restaurant', back_populates='preferences')
 
+    __table_args__ = (
+        db.Index("ix_user_restaurant_preference_user_preference", "user_id", "preference"),
+        # One rating per user and restaurant; the ON CONFLICT target for bulk saves
+        db.UniqueConstraint("user_id", "restaurant_id", name="uq_user_restaurant_preference_user_restaurant"),
+    )
+
+# Feature sums over a user's liked restaurants, kept current by /save_preferences (see taste.py)
+class UserTasteAggregate(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+    price_level_counts = db.Column(db.JSON, nullable=False, default=dict)   # price_level -> likes
+    primary_type_counts = db.Column(db.JSON, nullable=False, default=dict)  # primary_type -> likes
+    bool_counts = db.Column(db.JSON, nullable=False, default=dict)          # attribute -> [true, known]
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    # restaurant_id -> values counted in; O(#likes), so only loaded when a like is removed (see taste.py)
+    contributions = db.deferred(db.Column(db.JSON, nullable=False, default=dict))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class UserRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -74,6 +98,10 @@ class UserRequest(db.Model):
     city = db.Column(db.String(100))
     restaurants = db.relationship('RequestRestaurant', backref='user_request', lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_user_request_user_city", "user_id", "city"),
+    )
+
 class Recommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_request_id = db.Column(db.Integer, db.ForeignKey('user_request.id'), nullable=False)
@@ -87,6 +115,11 @@ class RequestRestaurant(db.Model):
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     type = db.Column(db.Enum(RequestType), nullable=False)
 
+    # Covers the history join: request → (type filter) → restaurant without touching the table
+    __table_args__ = (
+        db.Index("ix_request_restaurant_request_type_restaurant", "user_request_id", "type", "restaurant_id"),
+    )
+
 class FeedbackSuggestion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -98,6 +131,11 @@ class FeedbackSuggestion(db.Model):
     author = db.relationship('User', backref='suggestions')
     votes = db.relationship('FeedbackVote', backref='suggestion', lazy=True, cascade="all, delete-orphan")
 
+    # Backs the leaderboard read: ORDER BY score DESC, id LIMIT n
+    __table_args__ = (
+        db.Index("ix_feedback_suggestion_score", score.desc(), id),
+    )
+
 class FeedbackVote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -1,27 +1,63 @@
 import os
-from openai import OpenAI
-import anthropic
 import re
+import json
+import hashlib
 import logging
 from pathlib import Path
 from collections import Counter
 
+from services.cache import TTLCache
+from services.singleflight import SingleFlight, SingleFlightTimeout
+from taste import TasteAggregate
+
 # Constants
 NUM_RECOMMENDATIONS = 3
 RANK_MODEL = "claude-haiku-4-5-20251001"
 
+# Ranked results are memoized on a fingerprint of everything that shapes the
+# prompt, so a re-submit or two users with identical inputs skip the LLM call.
+# RANK_CACHE_TTL=0 disables the cache.
+RANK_CACHE_TTL = int(os.getenv("RANK_CACHE_TTL", 60 * 60))
+RANK_CACHE_MAX_ENTRIES = int(os.getenv("RANK_CACHE_MAX_ENTRIES", 1024))
+rank_cache = TTLCache("rank", ttl=RANK_CACHE_TTL, max_entries=RANK_CACHE_MAX_ENTRIES)
+# Identical rank calls in flight at the same time (same fingerprint) share one LLM call
+rank_flight = SingleFlight("rank")
+
+# Prompt instructions per input_weight (alpha) and revisit_weight bucket
+ALPHA_INSTRUCTIONS = {
+    "session": "The user's current session inputs should heavily influence your selection.\n\n",
+    "history": "Draw primarily from the user's historical taste profile.\n\n",
+    "balanced": "",
+}
+REVISIT_INSTRUCTIONS = {
+    "revisit": "Some candidates are marked [previously recommended] — it is fine to re-recommend them; the user wants to revisit great picks.\n\n",
+    "new_only": "Prefer candidates the user has not seen before.\n\n",
+    "mixed": "",
+}
+
+# The SDKs are imported on first use: together they add ~2s to every cold start
+
 def get_openai_client():
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is not set.")
+    from openai import OpenAI
     return OpenAI(api_key=api_key)
 
 def get_anthropic_client():
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY environment variable is not set.")
+    import anthropic
     return anthropic.Anthropic(api_key=api_key)
 
+def get_async_anthropic_client():
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY environment variable is not set.")
+    import anthropic
+    return anthropic.AsyncAnthropic(api_key=api_key)
+
 def load_prompt_template():
     prompt_path = Path(__file__).parent / 'prompt.txt'
     with open(prompt_path, 'r') as file:
@@ -134,76 +170,54 @@ def get_similar_restaurants(liked_restaurants, disliked_restaurants, city, neigh
         return []
 
 
-def _weighted_counter(history_items, input_items, alpha, key_fn):
-    """Weighted voting for categorical features. Returns a Counter with fractional weights."""
-    h_valid = [key_fn(r) for r in history_items if key_fn(r)]
-    i_valid = [key_fn(r) for r in input_items if key_fn(r)]
-
-    if not h_valid and not i_valid:
-        return Counter()
-
-    if h_valid and i_valid:
-        h_w = (1 - alpha) / len(h_valid)
-        i_w = alpha / len(i_valid)
-    elif h_valid:
-        h_w = 1.0 / len(h_valid)
-        i_w = 0.0
-    else:
-        h_w = 0.0
-        i_w = 1.0 / len(i_valid)
+def _blend_weights(h_n, i_n, alpha):
+    """Per-item weights for history and inputs; each side with items gets its share, a lone side gets all of it."""
+    if h_n and i_n:
+        return (1 - alpha) / h_n, alpha / i_n
+    if h_n:
+        return 1.0 / h_n, 0.0
+    return 0.0, (1.0 / i_n if i_n else 0.0)
 
+
+def _weighted_counter(history_counts, input_counts, alpha):
+    """Weighted voting for categorical features. Returns a Counter with fractional weights."""
+    h_w, i_w = _blend_weights(sum(history_counts.values()), sum(input_counts.values()), alpha)
     counts = Counter()
-    for v in h_valid:
-        counts[v] += h_w
-    for v in i_valid:
-        counts[v] += i_w
+    for v, n in history_counts.items():
+        counts[v] += h_w * n
+    for v, n in input_counts.items():
+        counts[v] += i_w * n
     return counts
 
 
-def _weighted_bool(history_items, input_items, alpha, key_fn):
+def _weighted_bool(history: TasteAggregate, inputs: TasteAggregate, alpha, name):
     """Weighted boolean preference. Returns True/False/None."""
-    h_vals = [1.0 if key_fn(r) else 0.0 for r in history_items if key_fn(r) is not None]
-    i_vals = [1.0 if key_fn(r) else 0.0 for r in input_items if key_fn(r) is not None]
-
-    if not h_vals and not i_vals:
+    h_n, i_n = history.bool_known[name], inputs.bool_known[name]
+    if not h_n and not i_n:
         return None
+    h_w, i_w = _blend_weights(h_n, i_n, alpha)
+    return h_w * history.bool_true[name] + i_w * inputs.bool_true[name] >= 0.5
 
-    if h_vals and i_vals:
-        h_w = (1 - alpha) / len(h_vals)
-        i_w = alpha / len(i_vals)
-    elif h_vals:
-        h_w = 1.0 / len(h_vals)
-        i_w = 0.0
-    else:
-        h_w = 0.0
-        i_w = 1.0 / len(i_vals)
-
-    weighted_sum = sum(h_w * v for v in h_vals) + sum(i_w * v for v in i_vals)
-    return weighted_sum >= 0.5
 
-
-def build_taste_profile(history_objs: list, input_objs: list, alpha: float = 0.7) -> dict:
+def build_taste_profile(history, input_objs: list, alpha: float = 0.7) -> dict:
     """
     Derive a weighted taste profile from history and current session inputs.
+    `history` is the user's stored TasteAggregate or their liked restaurants.
     alpha=1.0 means inputs fully control; alpha=0.0 means history fully controls.
     Returns a dict with aggregated preferences. Returns empty dict if no signal available.
     """
-    if not history_objs and not input_objs:
+    if not isinstance(history, TasteAggregate):
+        history = TasteAggregate.from_restaurants(history)
+    if not history.like_count and not input_objs:
         return {}
+    inputs = TasteAggregate.from_restaurants(input_objs)
+
+    price_counter = _weighted_counter(history.price_levels, inputs.price_levels, alpha)
+    type_counter = _weighted_counter(history.primary_types, inputs.primary_types, alpha)
 
-    price_counter = _weighted_counter(history_objs, input_objs, alpha, lambda r: r.price_level)
-    type_counter = _weighted_counter(history_objs, input_objs, alpha, lambda r: r.primary_type)
-
-    h_ratings = [r.rating for r in history_objs if r.rating is not None]
-    i_ratings = [r.rating for r in input_objs if r.rating is not None]
-    if h_ratings and i_ratings:
-        h_w = (1 - alpha) / len(h_ratings)
-        i_w = alpha / len(i_ratings)
-        avg_rating = sum(h_w * v for v in h_ratings) + sum(i_w * v for v in i_ratings)
-    elif h_ratings:
-        avg_rating = sum(h_ratings) / len(h_ratings)
-    elif i_ratings:
-        avg_rating = sum(i_ratings) / len(i_ratings)
+    if history.rating_count or inputs.rating_count:
+        h_w, i_w = _blend_weights(history.rating_count, inputs.rating_count, alpha)
+        avg_rating = h_w * history.rating_sum + i_w * inputs.rating_sum
     else:
         avg_rating = None
 
@@ -218,22 +232,103 @@ def build_taste_profile(history_objs: list, input_objs: list, alpha: float = 0.7
     if type_counter:
         profile['top_cuisine_types'] = [t for t, _ in type_counter.most_common(3)]
 
-    dine_in = _weighted_bool(history_objs, input_objs, alpha, lambda r: r.serves_dine_in)
+    dine_in = _weighted_bool(history, inputs, alpha, 'serves_dine_in')
     if dine_in is not None:
         profile['prefers_dine_in'] = dine_in
 
-    takeout = _weighted_bool(history_objs, input_objs, alpha, lambda r: r.serves_takeout)
+    takeout = _weighted_bool(history, inputs, alpha, 'serves_takeout')
     if takeout is not None:
         profile['prefers_takeout'] = takeout
 
-    reservable = _weighted_bool(history_objs, input_objs, alpha, lambda r: r.reservable)
+    reservable = _weighted_bool(history, inputs, alpha, 'reservable')
     if reservable is not None:
         profile['prefers_reservable'] = reservable
 
     return profile
 
 
-def rank_candidates(
+def alpha_bucket(alpha: float) -> str:
+    if alpha >= 0.7:
+        return "session"
+    if alpha <= 0.3:
+        return "history"
+    return "balanced"
+
+
+def revisit_bucket(revisit_weight: float) -> str:
+    if revisit_weight >= 0.7:
+        return "revisit"
+    if revisit_weight == 0.0:
+        return "new_only"
+    return "mixed"
+
+
+def rank_cache_key(
+    taste_profile: dict,
+    candidates: list,
+    liked_names: list,
+    disliked_names: list,
+    neighborhood: str = None,
+    restaurant_types: list = None,
+    num_recommendations: int = NUM_RECOMMENDATIONS,
+    liked_restaurant_objs: list = None,
+    input_restaurant_objs: list = None,
+    alpha: float = 0.7,
+    revisit_weight: float = 0.0,
+) -> str:
+    """
+    sha256 fingerprint of the rank inputs, canonicalized so that anything which
+    doesn't change the prompt doesn't change the key: candidate order is kept
+    (it is the numbering the model sees), name lists and types are sorted, and
+    alpha/revisit_weight are reduced to the instruction bucket they select.
+    """
+    canonical = {
+        "model": RANK_MODEL,
+        "n": num_recommendations,
+        "candidates": [[c.get("place_id"), bool(c.get("_is_revisit"))] for c in candidates],
+        "profile": taste_profile,
+        "liked": sorted(liked_names or []),
+        "disliked": sorted(disliked_names or []),
+        "session": [r.place_id for r in (input_restaurant_objs or [])],
+        "history": [r.place_id for r in (liked_restaurant_objs or [])],
+        "alpha": alpha_bucket(alpha),
+        "revisit": revisit_bucket(revisit_weight),
+        "neighborhood": neighborhood or "",
+        "types": sorted(restaurant_types or []),
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _copy_ranked(ranked: list) -> list:
+    # Callers may annotate the dicts; keep the cached list pristine
+    return [dict(r) for r in ranked]
+
+
+def _prepare_rank(taste_profile, candidates, liked_names, disliked_names, city, **options):
+    """
+    Shared first half of the rank entry points: (cache_key, cached, prompt,
+    candidate_index). On a cache hit, cached is the stored list and the prompt
+    is not built (prompt and candidate_index are None).
+    """
+    cache_key = rank_cache_key(taste_profile, candidates, liked_names, disliked_names, **options)
+    cached = rank_cache.get(cache_key)
+    if cached is not None:
+        logging.debug(f"Rank cache hit {cache_key[:12]}")
+        return cache_key, cached, None, None
+    prompt, candidate_index = build_rank_prompt(
+        taste_profile, candidates, liked_names, disliked_names, city, **options
+    )
+    return cache_key, None, prompt, candidate_index
+
+
+def _store_rank(cache_key: str, ranked: list) -> None:
+    """Cache a complete, non-empty rank result under cache_key."""
+    if ranked:
+        rank_cache.set(cache_key, _copy_ranked(ranked))
+
+
+def build_rank_prompt(
     taste_profile: dict,
     candidates: list,
     liked_names: list,
@@ -246,15 +341,12 @@ def rank_candidates(
     input_restaurant_objs: list = None,
     alpha: float = 0.7,
     revisit_weight: float = 0.0
-) -> list:
+) -> tuple:
     """
-    Use Claude to rank real candidate restaurants and return the top num_recommendations.
-    Returns a list of dicts with place_id, name, description, reason, address, rating, price_level.
+    Build the rank prompt for candidates.
+    Returns (prompt, candidate_index), where candidate_index maps the number
+    shown to the model back to the candidate dict.
     """
-    if not candidates:
-        logging.warning("rank_candidates called with empty candidate list")
-        return []
-
     prompt_template = load_rank_prompt_template()
 
     # Build numbered candidate lines and index for lookup
@@ -311,19 +403,8 @@ def rank_candidates(
         lines = _format_profile_lines(liked_restaurant_objs)
         history_section = "**Past preferences (use for broader taste context):**\n" + "\n".join(lines) + "\n\n"
 
-    if alpha >= 0.7:
-        alpha_instruction = "The user's current session inputs should heavily influence your selection.\n\n"
-    elif alpha <= 0.3:
-        alpha_instruction = "Draw primarily from the user's historical taste profile.\n\n"
-    else:
-        alpha_instruction = ""
-
-    if revisit_weight >= 0.7:
-        revisit_instruction = "Some candidates are marked [previously recommended] — it is fine to re-recommend them; the user wants to revisit great picks.\n\n"
-    elif revisit_weight == 0.0:
-        revisit_instruction = "Prefer candidates the user has not seen before.\n\n"
-    else:
-        revisit_instruction = ""
+    alpha_instruction = ALPHA_INSTRUCTIONS[alpha_bucket(alpha)]
+    revisit_instruction = REVISIT_INSTRUCTIONS[revisit_bucket(revisit_weight)]
 
     neighborhood_section = ""
     if neighborhood:
@@ -351,73 +432,269 @@ def rank_candidates(
         candidates_numbered=candidates_numbered
     )
 
+    return prompt, candidate_index
+
+
+def parse_rank_line(line: str, candidate_index: dict):
+    """
+    Parse one `N. Name - reason - description` line from the model.
+    Returns a recommendation dict, or None for blank/unnumbered lines and unknown numbers.
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    # Extract leading number
+    num_match = re.match(r'^(\d+)[\.\)]\s*', line)
+    if not num_match:
+        return None
+
+    candidate_num = int(num_match.group(1))
+    rest = line[num_match.end():]
+
+    # Normalize em-dashes and en-dashes to hyphens — Haiku mirrors the
+    # candidate list format (which uses —) in its output, but our delimiter is ' - '
+    rest = rest.replace(' \u2014 ', ' - ').replace(' \u2013 ', ' - ')
+    parts = rest.split(' - ')
+    name = parts[0].strip() if parts else ""
+    reason = ""
+    description = ""
+
+    if len(parts) >= 3:
+        raw_reason = parts[1].strip()
+        if raw_reason and raw_reason != "-" and len(raw_reason) > 5:
+            reason = raw_reason
+        description = re.sub(r'^[\s\u002D\u2013\u2014]+', '', " - ".join(parts[2:])).strip()
+    elif len(parts) == 2:
+        description = parts[1].strip()
+
+    # Resolve via candidate_index — no API call needed
+    candidate = candidate_index.get(candidate_num)
+    if not candidate:
+        logging.warning(f"Claude referenced unknown candidate number {candidate_num}")
+        return None
+
+    return {
+        "place_id": candidate["place_id"],
+        "name": candidate["name"],  # Use official Google name
+        "description": description,
+        "reason": reason,
+        "address": candidate.get("address", ""),
+        "rating": candidate.get("rating"),
+        "price_level": candidate.get("price_level"),
+    }
+
+
+def parse_rank_response(content: str, candidate_index: dict, num_recommendations: int = NUM_RECOMMENDATIONS) -> list:
+    """Parse the model's numbered lines into recommendation dicts, resolving numbers via candidate_index."""
+    results = []
+    for line in content.strip().split('\n'):
+        result = parse_rank_line(line, candidate_index)
+        if result:
+            results.append(result)
+    return results[:num_recommendations]
+
+
+def rank_candidates(
+    taste_profile: dict,
+    candidates: list,
+    liked_names: list,
+    disliked_names: list,
+    city: str,
+    neighborhood: str = None,
+    restaurant_types: list = None,
+    num_recommendations: int = NUM_RECOMMENDATIONS,
+    liked_restaurant_objs: list = None,
+    input_restaurant_objs: list = None,
+    alpha: float = 0.7,
+    revisit_weight: float = 0.0
+) -> list:
+    """
+    Use Claude to rank real candidate restaurants and return the top num_recommendations.
+    Returns a list of dicts with place_id, name, description, reason, address, rating, price_level.
+    """
+    if not candidates:
+        logging.warning("rank_candidates called with empty candidate list")
+        return []
+
+    cache_key, cached, prompt, candidate_index = _prepare_rank(
+        taste_profile, candidates, liked_names, disliked_names, city,
+        neighborhood=neighborhood,
+        restaurant_types=restaurant_types,
+        num_recommendations=num_recommendations,
+        liked_restaurant_objs=liked_restaurant_objs,
+        input_restaurant_objs=input_restaurant_objs,
+        alpha=alpha,
+        revisit_weight=revisit_weight,
+    )
+    if cached is not None:
+        return _copy_ranked(cached)
+
+    def _rank():
+        try:
+            logging.debug(f"Sending rank prompt to {RANK_MODEL}:\n{prompt}")
+            client = get_anthropic_client()
+            response = client.messages.create(
+                model=RANK_MODEL,
+                max_tokens=300,
+                messages=[{"role": "user", "content": prompt}]
+            )
+
+            content = response.content[0].text
+            if not content:
+                logging.warning("Received empty content from Claude rank call.")
+                return []
+
+            logging.debug(f"Claude rank response:\n{content}")
+            ranked = parse_rank_response(content, candidate_index, num_recommendations)
+            _store_rank(cache_key, ranked)
+            return ranked
+
+        except Exception as e:
+            logging.error(f"Error with Claude rank call: {e}")
+            return []
+
     try:
-        logging.debug(f"Sending rank prompt to {RANK_MODEL}:\n{prompt}")
+        return _copy_ranked(rank_flight.do(cache_key, _rank))
+    except SingleFlightTimeout as e:
+        logging.error(f"Error with Claude rank call: {e}")
+        return []
+
+
+async def rank_candidates_async(
+    taste_profile: dict,
+    candidates: list,
+    liked_names: list,
+    disliked_names: list,
+    city: str,
+    neighborhood: str = None,
+    restaurant_types: list = None,
+    num_recommendations: int = NUM_RECOMMENDATIONS,
+    liked_restaurant_objs: list = None,
+    input_restaurant_objs: list = None,
+    alpha: float = 0.7,
+    revisit_weight: float = 0.0
+) -> list:
+    """Awaitable rank_candidates for the async pipeline, using the async Anthropic client."""
+    if not candidates:
+        logging.warning("rank_candidates_async called with empty candidate list")
+        return []
+
+    cache_key, cached, prompt, candidate_index = _prepare_rank(
+        taste_profile, candidates, liked_names, disliked_names, city,
+        neighborhood=neighborhood,
+        restaurant_types=restaurant_types,
+        num_recommendations=num_recommendations,
+        liked_restaurant_objs=liked_restaurant_objs,
+        input_restaurant_objs=input_restaurant_objs,
+        alpha=alpha,
+        revisit_weight=revisit_weight,
+    )
+    if cached is not None:
+        return _copy_ranked(cached)
+
+    async def _rank():
+        try:
+            logging.debug(f"Sending rank prompt to {RANK_MODEL} (async):\n{prompt}")
+            async with get_async_anthropic_client() as client:
+                response = await client.messages.create(
+                    model=RANK_MODEL,
+                    max_tokens=300,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+
+            content = response.content[0].text
+            if not content:
+                logging.warning("Received empty content from Claude rank call.")
+                return []
+
+            logging.debug(f"Claude rank response:\n{content}")
+            ranked = parse_rank_response(content, candidate_index, num_recommendations)
+            _store_rank(cache_key, ranked)
+            return ranked
+
+        except Exception as e:
+            logging.error(f"Error with Claude rank call: {e}")
+            return []
+
+    try:
+        return _copy_ranked(await rank_flight.do_async(cache_key, _rank))
+    except SingleFlightTimeout as e:
+        logging.error(f"Error with Claude rank call: {e}")
+        return []
+
+
+def stream_rank_candidates(
+    taste_profile: dict,
+    candidates: list,
+    liked_names: list,
+    disliked_names: list,
+    city: str,
+    neighborhood: str = None,
+    restaurant_types: list = None,
+    num_recommendations: int = NUM_RECOMMENDATIONS,
+    liked_restaurant_objs: list = None,
+    input_restaurant_objs: list = None,
+    alpha: float = 0.7,
+    revisit_weight: float = 0.0
+):
+    """
+    Streaming rank_candidates: a generator that yields each recommendation dict
+    as soon as its line is complete in the Anthropic stream, instead of after
+    the whole response. Yields nothing on error. Complete results are written
+    to the same rank cache, and a cache hit yields the stored list at once.
+    """
+    if not candidates:
+        logging.warning("stream_rank_candidates called with empty candidate list")
+        return
+
+    cache_key, cached, prompt, candidate_index = _prepare_rank(
+        taste_profile, candidates, liked_names, disliked_names, city,
+        neighborhood=neighborhood,
+        restaurant_types=restaurant_types,
+        num_recommendations=num_recommendations,
+        liked_restaurant_objs=liked_restaurant_objs,
+        input_restaurant_objs=input_restaurant_objs,
+        alpha=alpha,
+        revisit_weight=revisit_weight,
+    )
+    if cached is not None:
+        yield from _copy_ranked(cached)
+        return
+
+    ranked = []
+    try:
+        logging.debug(f"Streaming rank prompt to {RANK_MODEL}:\n{prompt}")
         client = get_anthropic_client()
-        response = client.messages.create(
+        with client.messages.stream(
             model=RANK_MODEL,
             max_tokens=300,
             messages=[{"role": "user", "content": prompt}]
-        )
-
-        content = response.content[0].text
-        if not content:
-            logging.warning("Received empty content from Claude rank call.")
-            return []
-
-        logging.debug(f"Claude rank response:\n{content}")
-
-        results = []
-        for line in content.strip().split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            # Extract leading number
-            num_match = re.match(r'^(\d+)[\.\)]\s*', line)
-            if not num_match:
-                continue
-
-            candidate_num = int(num_match.group(1))
-            rest = line[num_match.end():]
-
-            # Normalize em-dashes and en-dashes to hyphens — Haiku mirrors the
-            # candidate list format (which uses —) in its output, but our delimiter is ' - '
-            rest = rest.replace(' \u2014 ', ' - ').replace(' \u2013 ', ' - ')
-            parts = rest.split(' - ')
-            name = parts[0].strip() if parts else ""
-            reason = ""
-            description = ""
-
-            if len(parts) >= 3:
-                raw_reason = parts[1].strip()
-                if raw_reason and raw_reason != "-" and len(raw_reason) > 5:
-                    reason = raw_reason
-                description = re.sub(r'^[\s\u002D\u2013\u2014]+', '', " - ".join(parts[2:])).strip()
-            elif len(parts) == 2:
-                description = parts[1].strip()
-
-            # Resolve via candidate_index — no API call needed
-            candidate = candidate_index.get(candidate_num)
-            if not candidate:
-                logging.warning(f"Claude referenced unknown candidate number {candidate_num}")
-                continue
-
-            results.append({
-                "place_id": candidate["place_id"],
-                "name": candidate["name"],  # Use official Google name
-                "description": description,
-                "reason": reason,
-                "address": candidate.get("address", ""),
-                "rating": candidate.get("rating"),
-                "price_level": candidate.get("price_level"),
-            })
-
-        return results[:num_recommendations]
+        ) as stream:
+            buffer = ""
+            for text in stream.text_stream:
+                buffer += text
+                # Everything before the last newline is a finished line
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    result = parse_rank_line(line, candidate_index)
+                    if result and len(ranked) < num_recommendations:
+                        ranked.append(result)
+                        yield dict(result)
+                if len(ranked) >= num_recommendations:
+                    break
+
+        # The last line has no trailing newline
+        result = parse_rank_line(buffer, candidate_index) if len(ranked) < num_recommendations else None
+        if result:
+            ranked.append(result)
+            yield dict(result)
 
     except Exception as e:
-        logging.error(f"Error with Claude rank call: {e}")
-        return []
+        logging.error(f"Error with Claude rank stream: {e}")
+        return
+
+    _store_rank(cache_key, ranked)
 
 
 def check_api_key():
@@ -0,0 +1,467 @@
+"""
+Local place-details store backed by the Restaurant table.
+
+Every place we see from the provider (searchNearby results, get_details
+lookups) is written here with `last_enriched_at`, and details reads go through
+this store first so a known, fresh place never costs a Places Details call.
+"""
+
+import os
+import asyncio
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+import geo
+from models import db, Restaurant
+from services.candidate import Candidate
+from services import places_service
+from utils import conflict_insert, generate_slug
+
+# How long each stored field stays trustworthy. A row is served from the DB
+# only if every field the caller needs is younger than its max age; the row
+# has a single last_enriched_at, so the effective TTL is the shortest one.
+FIELD_MAX_AGE = {
+    "name":              timedelta(days=180),
+    "address":           timedelta(days=180),
+    "categories":        timedelta(days=180),
+    "primary_type":      timedelta(days=180),
+    "editorial_summary": timedelta(days=90),
+    "price_level":       timedelta(days=60),
+    "serves_dine_in":    timedelta(days=60),
+    "serves_takeout":    timedelta(days=60),
+    "serves_delivery":   timedelta(days=60),
+    "reservable":        timedelta(days=60),
+    "rating":            timedelta(days=30),
+    "user_rating_count": timedelta(days=30),
+}
+DETAIL_FIELDS = tuple(FIELD_MAX_AGE)
+
+# Rows refreshed more recently than this are not rewritten by bulk upserts,
+# so a cached searchNearby pool does not turn into 20 UPDATEs per request.
+UPSERT_MIN_INTERVAL = timedelta(hours=int(os.getenv("PLACE_STORE_UPSERT_INTERVAL_HOURS", 24)))
+
+# Concurrent get_details fan-out for resolve_many(): pool size and the overall
+# wait (seconds) before unfinished lookups are abandoned.
+RESOLVE_MAX_WORKERS = int(os.getenv("PLACES_RESOLVE_MAX_WORKERS", 5))
+RESOLVE_DEADLINE = float(os.getenv("PLACES_RESOLVE_DEADLINE", 8.0))
+
+
+def default_provider() -> str:
+    return os.getenv("PLACES_PROVIDER", "google")
+
+
+def is_fresh(restaurant: Restaurant, fields: Iterable[str] = DETAIL_FIELDS, now: Optional[datetime] = None) -> bool:
+    """True if every requested field on the row is within its FIELD_MAX_AGE."""
+    if not restaurant.last_enriched_at or not restaurant.name:
+        return False
+    age = (now or datetime.utcnow()) - restaurant.last_enriched_at
+    return all(age <= FIELD_MAX_AGE[field] for field in fields)
+
+
+def details_from_restaurant(restaurant: Restaurant) -> Dict:
+    """Render a Restaurant row in the same shape as PlacesService.get_details()."""
+    return {
+        "name": restaurant.name,
+        "place_id": restaurant.place_id,
+        "address": restaurant.location,
+        "phone": None,
+        "website": None,
+        "categories": [c for c in (restaurant.cuisine_type or "").split(", ") if c],
+        "price_level": restaurant.price_level,
+        "rating": restaurant.rating,
+        "user_rating_count": restaurant.user_rating_count,
+        "editorial_summary": restaurant.editorial_summary,
+        "primary_type": restaurant.primary_type,
+        "serves_dine_in": restaurant.serves_dine_in,
+        "serves_takeout": restaurant.serves_takeout,
+        "serves_delivery": restaurant.serves_delivery,
+        "reservable": restaurant.reservable,
+        "latitude": restaurant.latitude,
+        "longitude": restaurant.longitude,
+    }
+
+
+def get_restaurant(
+    place_id: str,
+    city: str,
+    provider: Optional[str] = None,
+    fields: Iterable[str] = DETAIL_FIELDS,
+) -> Optional[Restaurant]:
+    """
+    Read-through lookup: return the stored Restaurant if fresh for `fields`,
+    otherwise fetch details from the provider and insert/refresh the row.
+    A stale row is still returned if the provider call fails.
+    """
+    resolved = resolve_many([place_id], city, provider=provider, fields=fields)
+    return resolved[0] if resolved else None
+
+
+def get_details(place_id: str, city: Optional[str] = None, fields: Iterable[str] = DETAIL_FIELDS) -> Optional[Dict]:
+    """Read-through replacement for places_service.get_details() returning the same dict shape."""
+    restaurant = get_restaurant(place_id, city or "", fields=fields)
+    return details_from_restaurant(restaurant) if restaurant else None
+
+
+def resolve_many(
+    place_ids: List[str],
+    city: str,
+    provider: Optional[str] = None,
+    fields: Iterable[str] = DETAIL_FIELDS,
+    deadline: Optional[float] = None,
+) -> List[Restaurant]:
+    """
+    Batched read-through resolution of several place_ids.
+
+    Known rows are loaded with one IN query. Missing or stale places are
+    fetched concurrently on a bounded thread pool, so the wait is the slowest
+    single get_details call (capped at `deadline` seconds), not the sum. All
+    fetched rows are written in one flush. Returns Restaurants in input order,
+    de-duplicated, skipping places that could not be resolved.
+    """
+    plan = plan_resolve(place_ids, provider=provider, fields=fields)
+    fetched = {}
+    if plan.misses:
+        fetched = _fetch_details_concurrently(plan.misses, RESOLVE_DEADLINE if deadline is None else deadline)
+    return finish_resolve(plan, fetched, city)
+
+
+class ResolvePlan:
+    """DB half of resolve_many(): the ordered ids, rows already stored, and ids that need a details call."""
+
+    def __init__(self, ordered_ids: List[str], known: Dict[str, Restaurant], misses: List[str], provider: str):
+        self.ordered_ids = ordered_ids
+        self.known = known
+        self.misses = misses
+        self.provider = provider
+
+
+def plan_resolve(
+    place_ids: List[str],
+    provider: Optional[str] = None,
+    fields: Iterable[str] = DETAIL_FIELDS,
+) -> ResolvePlan:
+    """Load stored rows for place_ids with one IN query and work out which need fetching."""
+    provider = provider or default_provider()
+    fields = tuple(fields)
+    ordered_ids = list(dict.fromkeys(pid for pid in place_ids if pid))
+    if not ordered_ids:
+        return ResolvePlan([], {}, [], provider)
+
+    known = {
+        r.place_id: r for r in Restaurant.query.filter(
+            Restaurant.provider == provider,
+            Restaurant.place_id.in_(ordered_ids)
+        ).all()
+    }
+    misses = [pid for pid in ordered_ids if pid not in known or not is_fresh(known[pid], fields)]
+    return ResolvePlan(ordered_ids, known, misses, provider)
+
+
+def finish_resolve(plan: ResolvePlan, fetched: Dict[str, Dict], city: str) -> List[Restaurant]:
+    """Write fetched details for a plan and return its Restaurants in input order."""
+    known = dict(plan.known)
+    if fetched:
+        known.update(_write_places(fetched, known, city, plan.provider, refresh_all=True))
+    return [known[pid] for pid in plan.ordered_ids if pid in known]
+
+
+async def fetch_details_async(place_ids: List[str], places, deadline: Optional[float] = None) -> Dict[str, Dict]:
+    """
+    Async counterpart of the thread-pool fan-out: await places.get_details for
+    every id at once on an AsyncPlacesService, dropping failures and anything
+    still running at the deadline.
+    """
+    deadline = RESOLVE_DEADLINE if deadline is None else deadline
+    tasks = {asyncio.ensure_future(places.get_details(pid)): pid for pid in place_ids}
+    if not tasks:
+        return {}
+    done, not_done = await asyncio.wait(tasks, timeout=deadline)
+    for task in not_done:
+        task.cancel()
+        logging.warning(f"get_details for place_id {tasks[task]} missed the {deadline}s deadline")
+
+    fetched = {}
+    for task in done:
+        place_id = tasks[task]
+        try:
+            details = task.result()
+        except Exception as e:
+            logging.warning(f"get_details raised for place_id {place_id}: {e}")
+            continue
+        if _valid_details(place_id, details):
+            fetched[place_id] = details
+    return fetched
+
+
+def upsert_places(places: List[Dict], city: str, provider: Optional[str] = None) -> Dict[str, Restaurant]:
+    """
+    Bulk insert-or-refresh provider place dicts (searchNearby / get_details shape).
+
+    One SELECT resolves existing rows and one SELECT checks slug collisions;
+    everything is written in a single flush inside a savepoint, so a failure
+    here (e.g. a concurrent insert of the same place) never aborts the caller's
+    transaction. Rows enriched within UPSERT_MIN_INTERVAL are left untouched.
+    Returns {place_id: Restaurant} for every place passed in.
+    """
+    provider = provider or default_provider()
+    by_place_id = {}
+    for place in places:
+        place_id = place.get("place_id")
+        if place_id and place.get("name") and place_id not in by_place_id:
+            by_place_id[place_id] = place
+    if not by_place_id:
+        return {}
+
+    existing = {
+        r.place_id: r for r in Restaurant.query.filter(
+            Restaurant.provider == provider,
+            Restaurant.place_id.in_(list(by_place_id))
+        ).all()
+    }
+    return _write_places(by_place_id, existing, city, provider, refresh_all=False)
+
+
+def ensure_places(places: List[Dict], city: str, provider: Optional[str] = None) -> Dict:
+    """
+    Insert-if-missing for place dicts (rank results, searchNearby / get_details
+    shape); existing rows are referenced as they are, never refreshed.
+
+    A fixed number of round trips whatever the batch size: one SELECT for known
+    place_ids, one for slug collisions and one INSERT ... ON CONFLICT DO NOTHING
+    RETURNING for the rest. Rows skipped by the insert (a concurrent request
+    stored the same place) are picked up with one more SELECT.
+    Returns {place_id: row} with `id`, `name` and `location` for every place stored.
+    """
+    provider = provider or default_provider()
+    by_place_id = {}
+    for place in places:
+        place_id = place.get("place_id")
+        if place_id and place.get("name") and place_id not in by_place_id:
+            by_place_id[place_id] = place
+    if not by_place_id:
+        return {}
+
+    rows = _select_rows(provider, list(by_place_id))
+    missing = {pid: p for pid, p in by_place_id.items() if pid not in rows}
+    if missing:
+        rows.update(_insert_missing(missing, city, provider))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Internals
+# ---------------------------------------------------------------------------
+
+def _fetch_details_concurrently(place_ids: List[str], deadline: float) -> Dict[str, Dict]:
+    """Call places_service.get_details for each id in parallel; drop failures and anything past the deadline."""
+    executor = ThreadPoolExecutor(max_workers=min(RESOLVE_MAX_WORKERS, len(place_ids)))
+    futures = {executor.submit(places_service.get_details, pid): pid for pid in place_ids}
+    done, not_done = wait(futures, timeout=deadline)
+    # Don't block the request on stragglers; their results are discarded
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    fetched = {}
+    for future in done:
+        place_id = futures[future]
+        try:
+            details = future.result()
+        except Exception as e:
+            logging.warning(f"get_details raised for place_id {place_id}: {e}")
+            continue
+        if _valid_details(place_id, details):
+            fetched[place_id] = details
+    for future in not_done:
+        logging.warning(f"get_details for place_id {futures[future]} missed the {deadline}s deadline")
+    return fetched
+
+
+def _valid_details(place_id: str, details: Optional[Dict]) -> bool:
+    if not details or 'name' not in details:
+        logging.warning(f"Could not fetch valid details for place_id: {place_id}")
+        return False
+    return True
+
+
+def _write_places(
+    by_place_id: Dict[str, Dict],
+    existing: Dict[str, Restaurant],
+    city: str,
+    provider: str,
+    refresh_all: bool,
+) -> Dict[str, Restaurant]:
+    """Refresh existing rows and insert new ones in a single savepoint-guarded flush."""
+    now = datetime.utcnow()
+    written = {}
+    try:
+        with db.session.begin_nested():
+            refreshed = 0
+            for place_id, place in by_place_id.items():
+                restaurant = existing.get(place_id)
+                if restaurant is None:
+                    continue
+                written[place_id] = restaurant
+                fetched = _fetched_at(place, now)
+                if not refresh_all and restaurant.last_enriched_at and now - restaurant.last_enriched_at < UPSERT_MIN_INTERVAL:
+                    continue
+                if restaurant.last_enriched_at and restaurant.last_enriched_at >= fetched:
+                    continue  # the row is already as new as this data (e.g. a cached or stored pool)
+                _apply_details(restaurant, place)
+                restaurant.last_enriched_at = fetched
+                refreshed += 1
+
+            new_places = {pid: p for pid, p in by_place_id.items() if pid not in existing}
+            taken_slugs = _taken_slugs(generate_slug(p["name"], city) for p in new_places.values())
+            for place_id, place in new_places.items():
+                restaurant = _new_restaurant(place_id, place, city, provider, _unique_slug(place["name"], city, taken_slugs))
+                restaurant.last_enriched_at = _fetched_at(place, now)
+                db.session.add(restaurant)
+                written[place_id] = restaurant
+
+        logging.debug(f"place_store: {len(new_places)} inserted, {refreshed} refreshed for {city}")
+        return written
+    except Exception as e:
+        logging.warning(f"place_store write failed for {city}, continuing without store update: {e}")
+        return {}
+
+
+def _select_rows(provider: str, place_ids: List[str]) -> Dict:
+    result = db.session.execute(
+        select(Restaurant.id, Restaurant.place_id, Restaurant.name, Restaurant.location).where(
+            Restaurant.provider == provider,
+            Restaurant.place_id.in_(place_ids)
+        )
+    )
+    return {row.place_id: row for row in result}
+
+
+def _insert_missing(missing: Dict[str, Dict], city: str, provider: str) -> Dict:
+    insert = conflict_insert(db.session)
+    if insert is None:
+        # No ON CONFLICT on this backend: the ORM path, one flush for the batch
+        written = _write_places(missing, {}, city, provider, refresh_all=False)
+        db.session.flush()
+        return {pid: r for pid, r in written.items() if r.id is not None}
+
+    now = datetime.utcnow()
+    taken_slugs = _taken_slugs(generate_slug(p["name"], city) for p in missing.values())
+    values = [
+        _insert_values(pid, place, city, provider, _unique_slug(place["name"], city, taken_slugs), now)
+        for pid, place in missing.items()
+    ]
+    stmt = insert(Restaurant.__table__).on_conflict_do_nothing().returning(
+        Restaurant.id, Restaurant.place_id, Restaurant.name, Restaurant.location
+    )
+    inserted = {row.place_id: row for row in db.session.execute(stmt, values)}
+
+    skipped = [pid for pid in missing if pid not in inserted]
+    if skipped:
+        inserted.update(_select_rows(provider, skipped))
+        lost = [pid for pid in skipped if pid not in inserted]
+        if lost:
+            # Only a slug taken between our collision check and the insert gets here
+            logging.warning(f"place_store: could not insert {len(lost)} places for {city}: {lost}")
+    logging.debug(f"place_store: {len(inserted)} of {len(missing)} new places stored for {city}")
+    return inserted
+
+
+def _insert_values(place_id: str, details: Dict, city: str, provider: str, slug: str, now: datetime) -> Dict:
+    """Column values for a new row; the same mapping as _new_restaurant(), as a plain dict for executemany."""
+    return {
+        "provider": provider,
+        "place_id": place_id,
+        "slug": slug,
+        "name": _truncate(details["name"], Restaurant.name),
+        "location": _truncate(details.get("address") or city, Restaurant.location),
+        "cuisine_type": ", ".join(details.get("categories") or []),
+        "price_level": _truncate(details.get("price_level"), Restaurant.price_level),
+        "rating": details.get("rating"),
+        "user_rating_count": details.get("user_rating_count"),
+        "editorial_summary": details.get("editorial_summary"),
+        "primary_type": _truncate(details.get("primary_type"), Restaurant.primary_type),
+        "serves_dine_in": details.get("serves_dine_in"),
+        "serves_takeout": details.get("serves_takeout"),
+        "serves_delivery": details.get("serves_delivery"),
+        "reservable": details.get("reservable"),
+        "last_enriched_at": _fetched_at(details, now),
+        "city_hint": city,
+        **_coordinates(details),
+    }
+
+
+def _fetched_at(place, now: datetime) -> datetime:
+    """
+    When the provider returned this place's data: a Candidate's fetched_at, or
+    `now` for a plain details dict. last_enriched_at is stamped with this, so a
+    pool served from a cache or snapshot never makes a row look fresher than its data.
+    """
+    fetched = place.fetched_datetime() if isinstance(place, Candidate) else None
+    return min(fetched, now) if fetched else now
+
+
+def _truncate(value, column):
+    length = getattr(column.type, "length", None)
+    if value and length and len(value) > length:
+        return value[:length]
+    return value
+
+
+def _apply_details(restaurant: Restaurant, details: Dict) -> None:
+    restaurant.name = _truncate(details.get('name') or restaurant.name, Restaurant.name)
+    restaurant.location = _truncate(details.get('address') or restaurant.location or '', Restaurant.location)
+    if details.get('categories'):
+        restaurant.cuisine_type = ", ".join(details['categories'])
+    restaurant.price_level = _truncate(details.get('price_level'), Restaurant.price_level)
+    restaurant.rating = details.get('rating')
+    restaurant.user_rating_count = details.get('user_rating_count')
+    restaurant.editorial_summary = details.get('editorial_summary')
+    restaurant.primary_type = _truncate(details.get('primary_type'), Restaurant.primary_type)
+    restaurant.serves_dine_in = details.get('serves_dine_in')
+    restaurant.serves_takeout = details.get('serves_takeout')
+    restaurant.serves_delivery = details.get('serves_delivery')
+    restaurant.reservable = details.get('reservable')
+    for column, value in _coordinates(details).items():
+        if value is not None:
+            setattr(restaurant, column, value)
+
+
+def _coordinates(details: Dict) -> Dict:
+    """latitude/longitude/geohash column values for details (all None without a location)."""
+    lat, lng = details.get("latitude"), details.get("longitude")
+    if lat is None or lng is None:
+        return {"latitude": None, "longitude": None, "geohash": None}
+    return {"latitude": lat, "longitude": lng, "geohash": geo.encode(lat, lng)}
+
+
+def _new_restaurant(place_id: str, details: Dict, city: str, provider: str, slug: str) -> Restaurant:
+    restaurant = Restaurant(
+        provider=provider,
+        place_id=place_id,
+        slug=slug,
+        cuisine_type="",
+        last_enriched_at=datetime.utcnow(),
+        city_hint=city,
+    )
+    _apply_details(restaurant, details)
+    return restaurant
+
+
+def _taken_slugs(candidates: Iterable[str]) -> set:
+    candidates = list(set(candidates))
+    if not candidates:
+        return set()
+    rows = db.session.query(Restaurant.slug).filter(Restaurant.slug.in_(candidates)).all()
+    return {row[0] for row in rows}
+
+
+def _unique_slug(name: str, city: str, taken: set) -> str:
+    """Generate a slug, suffixing on collision with `taken` (existing DB slugs plus this batch; updated in place)."""
+    slug = generate_slug(name, city)
+    if slug in taken:
+        slug = f"{slug}-{uuid.uuid4().hex[:6]}"
+    taken.add(slug)
+    return slug
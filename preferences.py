@@ -0,0 +1,143 @@
+"""
+Bulk preference saving for /save_preferences.
+
+A payload of {restaurant_id, preference} ratings is applied as a diff:
+
+    1. one query reads the payload's restaurants LEFT JOINed to the user's
+       current preference for each, which validates every restaurant_id and
+       gives the current state in a single round trip
+    2. the diff sorts each rating into insert, update or unchanged in memory;
+       unchanged rows are not written, so their timestamp keeps the time the
+       rating was actually made
+    3. inserts and updates go out as one INSERT ... ON CONFLICT (user_id,
+       restaurant_id) DO UPDATE
+
+The (old, new) pairs for changed rows also move the user's taste aggregate.
+Later entries for the same restaurant_id win, so a client can send its whole
+edit log.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, insert, select, update
+
+from models import db, Restaurant, UserRestaurantPreference, PreferenceType
+import taste
+from utils import conflict_insert
+
+
+class InvalidPreferences(ValueError):
+    """The payload has an unknown preference type or restaurant_id; nothing was written."""
+
+
+@dataclass
+class PreferenceDiff:
+    inserts: Dict[int, PreferenceType] = field(default_factory=dict)
+    updates: Dict[int, PreferenceType] = field(default_factory=dict)
+    unchanged: List[int] = field(default_factory=list)
+    # restaurant_id -> (old value or None, new value), for taste.apply_preference_changes
+    changes: Dict[int, Tuple[Optional[str], str]] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> Dict[int, PreferenceType]:
+        return {**self.inserts, **self.updates}
+
+
+def parse_payload(preferences: list) -> Dict[int, PreferenceType]:
+    """[{restaurant_id, preference}, ...] -> {restaurant_id: PreferenceType}, last entry per id winning."""
+    wanted = {}
+    for pref in preferences:
+        try:
+            restaurant_id = int(pref['restaurant_id'])
+        except (TypeError, ValueError):
+            raise InvalidPreferences(f"Invalid restaurant_id: {pref['restaurant_id']!r}")
+        preference_type = str(pref['preference']).lower()
+        try:
+            wanted[restaurant_id] = PreferenceType[preference_type]
+        except KeyError:
+            raise InvalidPreferences(f"Invalid preference type: {preference_type}")
+    return wanted
+
+
+def diff_preferences(current: Dict[int, Optional[PreferenceType]], wanted: Dict[int, PreferenceType]) -> PreferenceDiff:
+    """Sort wanted ratings against current ones (None = no row yet)."""
+    diff = PreferenceDiff()
+    for restaurant_id, preference in wanted.items():
+        old = current.get(restaurant_id)
+        if old is None:
+            diff.inserts[restaurant_id] = preference
+        elif old != preference:
+            diff.updates[restaurant_id] = preference
+        else:
+            diff.unchanged.append(restaurant_id)
+            continue
+        diff.changes[restaurant_id] = (old.value if old else None, preference.value)
+    return diff
+
+
+def load_current(user_id: int, restaurant_ids) -> Dict[int, Optional[PreferenceType]]:
+    """
+    {restaurant_id: the user's current preference or None} for every id that
+    names a restaurant. Ids missing from the result don't exist.
+    """
+    rows = db.session.execute(
+        select(Restaurant.id, UserRestaurantPreference.preference)
+        .outerjoin(UserRestaurantPreference, and_(
+            UserRestaurantPreference.restaurant_id == Restaurant.id,
+            UserRestaurantPreference.user_id == user_id,
+        ))
+        .where(Restaurant.id.in_(list(restaurant_ids)))
+    )
+    return {restaurant_id: preference for restaurant_id, preference in rows}
+
+
+def save_preferences(user_id: int, preferences: list) -> PreferenceDiff:
+    """
+    Apply a /save_preferences payload in the current transaction; the caller
+    commits. Raises InvalidPreferences before writing anything.
+    """
+    wanted = parse_payload(preferences)
+    if not wanted:
+        return PreferenceDiff()
+
+    current = load_current(user_id, wanted)
+    unknown = sorted(set(wanted) - set(current))
+    if unknown:
+        raise InvalidPreferences(f"Unknown restaurant_id(s): {unknown}")
+
+    diff = diff_preferences(current, wanted)
+    if diff.changed:
+        _write(user_id, diff)
+        taste.apply_preference_changes(user_id, diff.changes)
+    return diff
+
+
+def _write(user_id: int, diff: PreferenceDiff) -> None:
+    now = datetime.utcnow()
+    table = UserRestaurantPreference.__table__
+    dialect_insert = conflict_insert(db.session)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values([
+            {"user_id": user_id, "restaurant_id": restaurant_id, "preference": preference, "timestamp": now}
+            for restaurant_id, preference in diff.changed.items()
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.restaurant_id],
+            set_={"preference": stmt.excluded.preference, "timestamp": stmt.excluded.timestamp},
+        ))
+        return
+
+    if diff.inserts:
+        db.session.execute(insert(table), [
+            {"user_id": user_id, "restaurant_id": restaurant_id, "preference": preference, "timestamp": now}
+            for restaurant_id, preference in diff.inserts.items()
+        ])
+    if diff.updates:
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.restaurant_id == bindparam("rid"))
+            .values(preference=bindparam("pref"), timestamp=now),
+            [{"rid": restaurant_id, "pref": preference} for restaurant_id, preference in diff.updates.items()],
+        )
@@ -0,0 +1,203 @@
+"""
+Deterministic local pre-ranker for recommendation candidates.
+
+Scores every candidate against the build_taste_profile() output before the LLM
+sees the list. Only the top PRERANK_TOP_K go into the rank prompt, which keeps
+prompt tokens (and Haiku latency) flat as the pool grows. The same scores
+back fallback_rank(), an LLM-free ranker used when the Anthropic call fails.
+
+Features are computed column-wise into array('d') buffers, one value per
+candidate, and combined with PRERANK_WEIGHTS:
+
+    price      1 - |candidate price - preferred price| / 4
+    cuisine    primary_type in top_cuisine_types (earlier = stronger), or a category overlap
+    service    dine-in / reservable agreement with the profile
+    quality    Bayesian-smoothed rating, so 5.0 from 3 reviews doesn't beat 4.7 from 3000
+    revisit    revisit_weight for [previously recommended] candidates
+
+Unknown values score 0.5 so missing data neither helps nor hurts.
+"""
+
+import os
+from array import array
+from typing import Dict, List, Optional
+
+from services.candidate import Candidate
+
+PRERANK_TOP_K = int(os.getenv("PRERANK_TOP_K", 12))
+# Serve pre-ranked picks when the LLM rank call fails or returns nothing
+PRERANK_FALLBACK = os.getenv("PRERANK_FALLBACK", "1") == "1"
+
+PRERANK_WEIGHTS = {
+    "price": 1.0,
+    "cuisine": 1.5,
+    "service": 0.5,
+    "quality": 2.0,
+    "revisit": 1.0,
+}
+
+PRICE_LEVELS = {
+    "PRICE_LEVEL_FREE": 0,
+    "PRICE_LEVEL_INEXPENSIVE": 1,
+    "PRICE_LEVEL_MODERATE": 2,
+    "PRICE_LEVEL_EXPENSIVE": 3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
+
+# Bayesian rating prior: behaves as if every place had this many extra reviews at this mean
+RATING_PRIOR_MEAN = 4.0
+RATING_PRIOR_COUNT = 50
+NEUTRAL = 0.5
+
+
+def score_candidates(candidates: List[Dict], taste_profile: Dict, revisit_weight: float = 0.0) -> Dict[str, array]:
+    """
+    Per-feature score columns plus their weighted sum under "total".
+    Each column is an array('d') aligned with `candidates`.
+    """
+    profile = taste_profile or {}
+    # Columns read attributes; a no-op for Candidates, a one-off conversion for dicts
+    candidates = [Candidate.coerce(c) for c in candidates]
+    columns = {
+        "price": _price_column(candidates, profile.get("preferred_price_level")),
+        "cuisine": _cuisine_column(candidates, profile.get("top_cuisine_types") or []),
+        "service": _service_column(candidates, profile),
+        "quality": _quality_column(candidates),
+        "revisit": array("d", (revisit_weight if c.is_revisit else 0.0 for c in candidates)),
+    }
+
+    total = array("d", bytes(8 * len(candidates)))
+    for feature, column in columns.items():
+        weight = PRERANK_WEIGHTS[feature]
+        for i, value in enumerate(column):
+            total[i] += weight * value
+    columns["total"] = total
+    return columns
+
+
+def top_k(candidates: List[Dict], taste_profile: Dict, k: int = PRERANK_TOP_K, revisit_weight: float = 0.0) -> List[Dict]:
+    """Candidates ordered by pre-rank score (ties keep their incoming order), cut to k."""
+    if not candidates:
+        return []
+    total = score_candidates(candidates, taste_profile, revisit_weight)["total"]
+    order = sorted(range(len(candidates)), key=lambda i: -total[i])
+    return [candidates[i] for i in order[:k]]
+
+
+def fallback_rank(
+    candidates: List[Dict],
+    taste_profile: Dict,
+    num_recommendations: int,
+    revisit_weight: float = 0.0,
+) -> List[Dict]:
+    """
+    LLM-free replacement for rank_candidates(): the top-scoring candidates in
+    the same result shape, with a reason built from each pick's strongest feature.
+    """
+    if not candidates:
+        return []
+    columns = score_candidates(candidates, taste_profile, revisit_weight)
+    total = columns["total"]
+    order = sorted(range(len(candidates)), key=lambda i: -total[i])[:num_recommendations]
+
+    results = []
+    for i in order:
+        c = candidates[i]
+        results.append({
+            "place_id": c["place_id"],
+            "name": c["name"],
+            "description": c.get("editorial_summary") or _describe(c),
+            "reason": _reason(c, columns, i, taste_profile or {}),
+            "address": c.get("address", ""),
+            "rating": c.get("rating"),
+            "price_level": c.get("price_level"),
+        })
+    return results
+
+
+# ----------------------------------------------------------------------
+# Feature columns
+# ----------------------------------------------------------------------
+
+def _price_column(candidates: List[Candidate], preferred: Optional[str]) -> array:
+    target = PRICE_LEVELS.get(preferred)
+    column = array("d")
+    for c in candidates:
+        level = PRICE_LEVELS.get(c.price_level)
+        if target is None or level is None:
+            column.append(NEUTRAL)
+        else:
+            column.append(1.0 - abs(level - target) / 4.0)
+    return column
+
+
+def _cuisine_column(candidates: List[Candidate], top_types: List[str]) -> array:
+    if not top_types:
+        return array("d", (NEUTRAL for _ in candidates))
+    # First preferred type scores 1.0, then 0.8, 0.6, ...
+    type_scores = {t: 1.0 - 0.2 * rank for rank, t in enumerate(top_types)}
+    column = array("d")
+    for c in candidates:
+        score = type_scores.get(c.primary_type, 0.0)
+        if not score:
+            overlap = [type_scores[t] for t in c.categories if t in type_scores]
+            score = 0.5 * max(overlap) if overlap else 0.0
+        column.append(score)
+    return column
+
+
+def _service_column(candidates: List[Candidate], profile: Dict) -> array:
+    wanted = [
+        (field, profile[pref])
+        for field, pref in (("serves_dine_in", "prefers_dine_in"), ("reservable", "prefers_reservable"))
+        if profile.get(pref) is not None
+    ]
+    if not wanted:
+        return array("d", (NEUTRAL for _ in candidates))
+    column = array("d")
+    for c in candidates:
+        total = 0.0
+        for field, preferred in wanted:
+            value = getattr(c, field)
+            total += NEUTRAL if value is None else float(bool(value) == preferred)
+        column.append(total / len(wanted))
+    return column
+
+
+def _quality_column(candidates: List[Candidate]) -> array:
+    column = array("d")
+    for c in candidates:
+        rating = c.rating
+        if rating is None:
+            column.append(0.0)
+            continue
+        count = c.user_rating_count or 0
+        smoothed = (rating * count + RATING_PRIOR_MEAN * RATING_PRIOR_COUNT) / (count + RATING_PRIOR_COUNT)
+        # 3.5 (the rating floor) → 0, 5.0 → 1
+        column.append(min(1.0, max(0.0, (smoothed - 3.5) / 1.5)))
+    return column
+
+
+# ----------------------------------------------------------------------
+# Fallback text
+# ----------------------------------------------------------------------
+
+def _readable(place_type: Optional[str]) -> str:
+    return (place_type or "restaurant").replace("_", " ")
+
+
+def _describe(candidate: Dict) -> str:
+    kind = _readable(candidate.get("primary_type"))
+    if candidate.get("rating") is not None:
+        return f"{kind.capitalize()} rated {candidate['rating']} on Google"
+    return kind.capitalize()
+
+
+def _reason(candidate: Dict, columns: Dict[str, array], i: int, profile: Dict) -> str:
+    if columns["revisit"][i] > 0:
+        return "One of your past recommendations worth a revisit"
+    if columns["cuisine"][i] >= 0.6 and candidate.get("primary_type") in (profile.get("top_cuisine_types") or []):
+        return f"Matches your taste for {_readable(candidate['primary_type'])}"
+    if columns["price"][i] == 1.0 and profile.get("preferred_price_level"):
+        return "Right in your usual price range"
+    return "Highly rated and well reviewed nearby"
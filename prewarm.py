@@ -0,0 +1,230 @@
+"""
+Background pre-warming of searchNearby candidate pools.
+
+Nearly all traffic searches one of the areas configured in
+services/google_service.py: a city centre or a neighbourhood, with either the
+default "restaurant" type set (plus the PREWARM_CUISINES cuisine searches) or
+the Bar set. prewarm_all() searches each of
+those areas and stores the result as a versioned CandidatePoolSnapshot in
+services.candidate_pools. The request path serves configured areas from the
+snapshot and never waits on Google for them.
+
+Each snapshot carries its own enrichment: before it is published, its places
+are written to the place store (place_store.upsert_places). The request path's
+upsert of the pool then finds every row fresh and writes nothing. A refresh
+that returns nothing keeps the previous version.
+
+Run it either way:
+
+    flask --app app prewarm-pools             # once, e.g. from cron
+    flask --app app prewarm-pools --loop      # every PREWARM_INTERVAL seconds
+    PREWARM_INTERVAL=1800                     # background thread in each serving worker
+
+Across the workers on a host, only the one holding the lock file refreshes.
+The others read the shared snapshot file.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from models import db
+import place_store
+from services import places_service
+from services.candidate import Candidate
+from services.candidate_pools import CandidatePoolSnapshot, candidate_pools, try_lock
+from services.google_service import (
+    CITY_COORDINATES, NEIGHBORHOOD_COORDINATES, GooglePlacesService, nearby_cache_key, nearby_searches, search_area,
+)
+
+# Seconds between refreshes for the background thread and --loop; 0 disables the thread
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 0))
+PREWARM_LOCK_PATH = os.getenv("PREWARM_LOCK_PATH", "/tmp/campfire/prewarm.lock")
+# The process whose background thread is running (a forked worker starts its own)
+_background_pid = None
+_background_lock = threading.Lock()
+
+# restaurant_types selections that map to distinct searchNearby type sets (see search_area)
+TYPE_SELECTIONS = (None, ("Bar",))
+# Cuisine searches (see nearby_searches) warmed alongside each area's restaurant
+# pool. Each one is an extra searchNearby call per area per refresh.
+PREWARM_CUISINES = tuple(
+    c.strip() for c in os.getenv(
+        "PREWARM_CUISINES", "italian_restaurant,mexican_restaurant,japanese_restaurant,chinese_restaurant"
+    ).split(",") if c.strip()
+)
+# search_nearby_candidates' defaults
+RADIUS = 8000
+MAX_RESULTS = 20
+
+
+@dataclass(frozen=True)
+class PrewarmTarget:
+    city: str
+    neighborhood: Optional[str]
+    restaurant_types: Optional[Tuple[str, ...]]
+
+    def __str__(self) -> str:
+        area = f"{self.city} / {self.neighborhood}" if self.neighborhood else self.city
+        return f"{area} ({', '.join(self.restaurant_types or ('restaurants',))})"
+
+
+def prewarm_targets() -> List[PrewarmTarget]:
+    """Every configured (area, type set): each city centre and each neighbourhood, under its nearest city."""
+    areas = [(city, None) for city in CITY_COORDINATES]
+    areas += [(_nearest_city(nb), name) for name, nb in NEIGHBORHOOD_COORDINATES.items()]
+    return [PrewarmTarget(city, neighborhood, types) for city, neighborhood in areas for types in TYPE_SELECTIONS]
+
+
+def refresh_pool(target: PrewarmTarget, service=None, enrich: bool = True) -> Optional[CandidatePoolSnapshot]:
+    """
+    Search one target, enrich and publish it as the next snapshot version.
+    Tiled targets (see nearby_searches) publish one snapshot per sub-circle,
+    and restaurant targets one per PREWARM_CUISINES search.
+    Returns the whole-circle snapshot, or None if that search failed (the old
+    one stays). Enrichment writes through db.session and commits, so it needs
+    an app context.
+    """
+    service = service or places_service
+    area = _target_area(target)
+    if area is None:
+        return None
+    searches = nearby_searches(*area, PREWARM_CUISINES, max_cuisines=len(PREWARM_CUISINES))
+    snapshots = [_refresh_search(target, service, *search, enrich=enrich) for search in searches]
+    return snapshots[0]
+
+
+def _refresh_search(target, service, centre, radius, included_types, enrich: bool) -> Optional[CandidatePoolSnapshot]:
+    key = nearby_cache_key(centre, radius, included_types, MAX_RESULTS)
+    # Also keeps the searchNearby cache warm, for callers that bypass the snapshot
+    candidates = service.prefetch_nearby(target.city, centre, radius, included_types, MAX_RESULTS)
+    if not candidates:
+        logging.warning(f"prewarm: no candidates for {target} ({key}), keeping the previous snapshot")
+        return None
+
+    enriched_at = None
+    if enrich:
+        place_store.upsert_places(candidates, target.city)
+        db.session.commit()
+        enriched_at = time.time()
+
+    snapshot = CandidatePoolSnapshot(
+        key=key,
+        city=target.city,
+        neighborhood=target.neighborhood,
+        included_types=tuple(included_types),
+        version=candidate_pools.next_version(key),
+        fetched_at=time.time(),
+        enriched_at=enriched_at,
+        candidates=tuple(Candidate.coerce(c) for c in candidates),
+    )
+    candidate_pools.put(snapshot)
+    return snapshot
+
+
+def prewarm_all(service=None, enrich: bool = True, min_age: float = 0) -> dict:
+    """
+    Refresh every target whose snapshot is at least min_age seconds old (or
+    missing). Returns {"refreshed": n, "skipped": n, "failed": n, "seconds": s,
+    "targets": [(target, outcome), ...]}, outcome being a short description.
+    """
+    service = service or places_service
+    if not isinstance(service, GooglePlacesService):
+        logging.info("prewarm: the configured places provider has no searchNearby pools to warm")
+        return {"refreshed": 0, "skipped": 0, "failed": 0, "seconds": 0.0, "targets": []}
+
+    started = time.perf_counter()
+    refreshed = skipped = failed = 0
+    outcomes = []
+    for target in prewarm_targets():
+        current = candidate_pools.peek(target_key(target))
+        if min_age and current is not None and current.age() < min_age:
+            skipped += 1
+            outcomes.append((target, f"still fresh (v{current.version})"))
+            continue
+        try:
+            snapshot = refresh_pool(target, service, enrich=enrich)
+        except Exception as e:
+            logging.error(f"prewarm: refreshing {target} failed: {e}")
+            db.session.rollback()
+            snapshot = None
+        if snapshot is None:
+            failed += 1
+            outcomes.append((target, "failed, previous snapshot kept"))
+        else:
+            refreshed += 1
+            outcomes.append((target, f"refreshed v{snapshot.version}, {len(snapshot.candidates)} candidates"))
+    seconds = time.perf_counter() - started
+    logging.info(f"prewarm: refreshed {refreshed} pools ({skipped} still fresh, {failed} failed) in {seconds:.1f}s")
+    return {"refreshed": refreshed, "skipped": skipped, "failed": failed, "seconds": seconds, "targets": outcomes}
+
+
+def run_locked(app, min_age: float = 0) -> Optional[dict]:
+    """
+    prewarm_all() if no other process on the host is running it; None if the
+    lock is held. With min_age, pools another worker refreshed recently are left alone.
+    """
+    lock = try_lock(PREWARM_LOCK_PATH)
+    if lock is None:
+        logging.debug("prewarm: another worker holds the lock, skipping")
+        return None
+    try:
+        with app.app_context():
+            return prewarm_all(min_age=min_age)
+    finally:
+        lock.close()
+
+
+def run_forever(app, interval: float) -> None:
+    while True:
+        try:
+            # Every worker's thread wakes up each interval; only stale pools are refetched
+            run_locked(app, min_age=interval / 2)
+        except Exception as e:
+            logging.error(f"prewarm: run failed: {e}")
+        time.sleep(interval)
+
+
+def start_background(app, interval: Optional[float] = None) -> Optional[threading.Thread]:
+    """
+    Start the refresh loop on a daemon thread when interval (default
+    PREWARM_INTERVAL) > 0, at most once per process. app.py calls it from its
+    first request, so CLI runs (`flask db upgrade`, `verify-schema`) never start it.
+    """
+    global _background_pid
+    interval = PREWARM_INTERVAL if interval is None else interval
+    if interval <= 0 or _background_pid == os.getpid():
+        return None
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return None
+        _background_pid = os.getpid()
+    thread = threading.Thread(target=run_forever, args=(app, interval), name="prewarm", daemon=True)
+    thread.start()
+    logging.info(f"prewarm: refreshing candidate pools every {interval:.0f}s")
+    return thread
+
+
+def target_key(target: PrewarmTarget) -> Optional[str]:
+    """The nearby_cache_key the request path computes for this target."""
+    area = _target_area(target)
+    return nearby_cache_key(*area, MAX_RESULTS) if area else None
+
+
+def _target_area(target: PrewarmTarget):
+    # Same defaults as search_nearby_candidates, so the keys match the request path
+    return search_area(target.city, target.neighborhood, list(target.restaurant_types or []), RADIUS)
+
+
+def _nearest_city(neighborhood: dict) -> str:
+    return min(
+        CITY_COORDINATES,
+        key=lambda city: math.hypot(
+            CITY_COORDINATES[city]["latitude"] - neighborhood["latitude"],
+            CITY_COORDINATES[city]["longitude"] - neighborhood["longitude"],
+        ),
+    )
@@ -0,0 +1,99 @@
+"""
+Request history rows (UserRequest + RequestRestaurant links), written behind
+the response.
+
+Nothing a recommendation response returns depends on these rows, so the
+endpoints collect them into a RequestLogEvent and hand it to the app's
+write-behind queue once the request's own commit (user, restaurants) is done.
+The worker batches events into one UserRequest insert and one link
+executemany per batch. When the queue refuses an event (write-behind off,
+shutting down, or full) the request writes it inline with write_events().
+
+History reads (history.load_snapshot) see a request's rows once the worker
+has flushed them, normally well under REQUEST_LOG_FLUSH_INTERVAL.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from models import db, UserRequest, RequestRestaurant, RequestType
+from write_behind import WriteBehindQueue
+
+# Off by default on Vercel, where an instance can be frozen right after the response
+REQUEST_LOG_WRITE_BEHIND = os.getenv("REQUEST_LOG_WRITE_BEHIND", "0" if os.getenv("VERCEL") else "1") == "1"
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", 1000))
+REQUEST_LOG_BATCH_SIZE = int(os.getenv("REQUEST_LOG_BATCH_SIZE", 100))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.getenv("REQUEST_LOG_FLUSH_INTERVAL", 0.5))
+# Seconds a request waits for queue space before writing its own rows
+REQUEST_LOG_ENQUEUE_TIMEOUT = float(os.getenv("REQUEST_LOG_ENQUEUE_TIMEOUT", 0.05))
+# Durable spool for queued events (unset = memory only; lost on a crash)
+REQUEST_LOG_SPOOL_DIR = os.getenv("REQUEST_LOG_SPOOL_DIR")
+
+
+@dataclass
+class RequestLogEvent:
+    """One recommendation request: who asked, where, and which restaurants went in and came out."""
+    user_id: int
+    city: Optional[str]
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    input_ids: List[int] = field(default_factory=list)
+    recommendation_ids: List[int] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, line: str) -> "RequestLogEvent":
+        data = json.loads(line)
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+        return cls(**data)
+
+
+def write_events(events: List[RequestLogEvent]) -> None:
+    """Insert the UserRequest rows and links for events in the current session; the caller commits."""
+    if not events:
+        return
+    table = UserRequest.__table__
+    result = db.session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        [{"user_id": e.user_id, "city": e.city, "timestamp": e.timestamp} for e in events],
+    )
+    links = []
+    for request_id, event in zip(result.scalars(), events):
+        links.extend(
+            {"user_request_id": request_id, "restaurant_id": restaurant_id, "type": request_type}
+            for request_type, ids in ((RequestType.input, event.input_ids),
+                                      (RequestType.recommendation, event.recommendation_ids))
+            for restaurant_id in ids
+        )
+    if links:
+        db.session.execute(RequestRestaurant.__table__.insert(), links)
+
+
+def make_request_log(app) -> WriteBehindQueue:
+    """The app's request-log queue; its worker writes each batch in its own app context."""
+
+    def write_batch(events):
+        with app.app_context():
+            write_events(events)
+            db.session.commit()
+
+    return WriteBehindQueue(
+        "request_log",
+        write_batch,
+        encode=RequestLogEvent.to_json,
+        decode=RequestLogEvent.from_json,
+        maxsize=REQUEST_LOG_QUEUE_SIZE,
+        batch_size=REQUEST_LOG_BATCH_SIZE,
+        flush_interval=REQUEST_LOG_FLUSH_INTERVAL,
+        enqueue_timeout=REQUEST_LOG_ENQUEUE_TIMEOUT,
+        spool_dir=REQUEST_LOG_SPOOL_DIR,
+        enabled=REQUEST_LOG_WRITE_BEHIND,
+    )
@@ -0,0 +1,128 @@
+"""
+In-memory prefix index over stored Restaurant names.
+
+Used as the first tier for /autocomplete: restaurants already in our DB for a
+city are matched locally (word-prefix on the name) before asking the provider.
+Each worker builds the index for a city on first use and rebuilds it after
+AUTOCOMPLETE_LOCAL_INDEX_TTL seconds, so newly stored places show up shortly.
+The rebuild runs on a background thread while requests keep getting the old
+index, like a stale TTLCache hit.
+"""
+
+import os
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from flask import current_app
+
+from models import db, Restaurant
+from services.autocomplete_cache import normalize_query
+
+AUTOCOMPLETE_LOCAL_INDEX_TTL = int(os.getenv("AUTOCOMPLETE_LOCAL_INDEX_TTL", 300))
+
+
+class RestaurantPrefixIndex:
+    def __init__(self, ttl: int = AUTOCOMPLETE_LOCAL_INDEX_TTL):
+        self.ttl = ttl
+        self._indexes = {}  # (city, provider) -> (built_at, sorted [(token, entry_idx)], entries)
+        self._lock = threading.Lock()
+        self._rebuilding = set()
+
+    def search(self, query: str, city: str, provider: str, limit: int = 5) -> List[Dict]:
+        """Return up to `limit` {name, place_id, address} dicts whose name has `query` as a word prefix."""
+        normalized = normalize_query(query)
+        if not normalized:
+            return []
+
+        tokens, entries = self._index_for(city, provider)
+        first_word = normalized.split(" ")[0]
+        start = bisect.bisect_left(tokens, (first_word,))
+
+        matched = set()
+        for token, entry_idx in tokens[start:]:
+            if not token.startswith(first_word):
+                break
+            if entry_idx in matched:
+                continue
+            normalized_name = entries[entry_idx]["_normalized_name"]
+            if normalized_name.startswith(normalized) or f" {normalized}" in normalized_name:
+                matched.add(entry_idx)
+
+        # Most-reviewed first, so the best-known match wins the limited slots
+        ranked = sorted(matched, key=lambda i: entries[i]["_popularity"], reverse=True)[:limit]
+        return [
+            {"name": entries[i]["name"], "place_id": entries[i]["place_id"], "address": entries[i]["address"]}
+            for i in ranked
+        ]
+
+    def invalidate(self, city: str = None) -> None:
+        with self._lock:
+            if city is None:
+                self._indexes.clear()
+            else:
+                for key in [k for k in self._indexes if k[0] == city]:
+                    del self._indexes[key]
+
+    def _index_for(self, city: str, provider: str):
+        key = (city, provider)
+        with self._lock:
+            cached = self._indexes.get(key)
+            expired = cached is not None and time.monotonic() - cached[0] >= self.ttl
+            rebuild = expired and key not in self._rebuilding
+            if rebuild:
+                self._rebuilding.add(key)
+
+        if cached is None:
+            return self._build(key)
+        if rebuild:
+            self._rebuild_in_background(key)
+        return cached[1], cached[2]
+
+    def _rebuild_in_background(self, key):
+        """Rebuild an expired index on a daemon thread; at most one rebuild per key at a time."""
+        app = current_app._get_current_object()
+
+        def _rebuild():
+            try:
+                with app.app_context():
+                    self._build(key)
+            except Exception as e:
+                logging.warning(f"Autocomplete prefix index rebuild failed for {key[0]}: {e}")
+            finally:
+                with self._lock:
+                    self._rebuilding.discard(key)
+
+        threading.Thread(target=_rebuild, name="prefix-index-rebuild", daemon=True).start()
+
+    def _build(self, key):
+        city, provider = key
+        rows = db.session.query(
+            Restaurant.name, Restaurant.place_id, Restaurant.location, Restaurant.user_rating_count
+        ).filter(
+            Restaurant.city_hint == city,
+            Restaurant.provider == provider
+        ).all()
+
+        entries = []
+        tokens = []
+        for name, place_id, location, user_rating_count in rows:
+            normalized_name = normalize_query(name)
+            entry_idx = len(entries)
+            entries.append({
+                "name": name,
+                "place_id": place_id,
+                "address": location,
+                "_normalized_name": normalized_name,
+                "_popularity": user_rating_count or 0,
+            })
+            for token in set(normalized_name.split(" ")):
+                tokens.append((token, entry_idx))
+        tokens.sort()
+
+        with self._lock:
+            self._indexes[key] = (time.monotonic(), tokens, entries)
+        logging.debug(f"Built autocomplete prefix index for {city}: {len(entries)} restaurants")
+        return tokens, entries
@@ -0,0 +1,162 @@
+"""
+Production schema verification.
+
+verify_schema() checks the tables and alembic_version and, for databases
+that predate Alembic, records the initial state. A database is only current
+at latest_migration_id(), the head of migrations/versions as Alembic reads
+it; anything older has pending migrations, so the check
+warns and writes no marker (and `verify-schema` fails). That costs several
+Postgres round trips, so it is no longer run on every import of app.py.
+It is a release step instead:
+
+    flask --app app verify-schema
+
+SCHEMA_CHECK controls what production startup still does:
+
+    marker   (default) run once per host: skipped while the marker file for
+             latest_migration_id() exists in the instance folder; `verify-schema`
+             and a successful startup check write it
+    startup  run on every cold start (the old behaviour)
+    off      (default on Vercel) never at startup; rely on the release step
+
+On Vercel the instance folder is a per-instance /tmp, so a marker would not
+outlive the cold start it was meant to save.
+
+A new migration changes the head, so a stale marker never skips it.
+"""
+
+import functools
+import logging
+import os
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from models import db
+
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "off" if os.getenv("VERCEL") else "marker")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+INITIAL_MIGRATION_ID = 'c9e344f09bd8'  # from our initial migration file
+CUISINE_TYPE_MIGRATION_ID = '2024_03_14_01'  # from increase_cuisine_type_length.py
+PREFERENCE_UNIQUE_MIGRATION_ID = 'f6a7b8c9d0e1'  # unique_user_restaurant_preference
+
+
+@functools.lru_cache(maxsize=None)
+def _script_revisions():
+    """(head, all revision ids) of migrations/versions, read once per process."""
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    script = ScriptDirectory.from_config(config)
+    return script.get_current_head(), frozenset(rev.revision for rev in script.walk_revisions())
+
+
+def latest_migration_id() -> str:
+    return _script_revisions()[0]
+
+
+def alembic_ids() -> frozenset:
+    """Revisions Alembic has recorded; older than latest_migration_id() means pending migrations."""
+    return _script_revisions()[1] - {INITIAL_MIGRATION_ID}
+
+
+def marker_path(app) -> str:
+    return os.path.join(app.instance_path, f"schema_verified.{latest_migration_id()}")
+
+
+def write_marker(app) -> None:
+    try:
+        os.makedirs(app.instance_path, exist_ok=True)
+        with open(marker_path(app), "w") as f:
+            f.write(latest_migration_id())
+    except OSError as e:
+        logging.warning(f"Could not write schema marker {marker_path(app)}: {e}")
+
+
+def check_on_startup(app) -> None:
+    """Production startup hook; what it does depends on SCHEMA_CHECK."""
+    if SCHEMA_CHECK == "off":
+        return
+    if SCHEMA_CHECK == "marker" and os.path.exists(marker_path(app)):
+        logging.debug(f"Schema verified for {latest_migration_id()}, skipping startup check")
+        return
+    if verify_schema(app) and SCHEMA_CHECK == "marker":
+        write_marker(app)
+
+
+def verify_schema(app) -> bool:
+    """
+    Check tables and alembic_version; record the initial state on pre-Alembic
+    databases. Returns whether alembic_version is latest_migration_id(). Raises on failure.
+    """
+    version = None
+    try:
+        logging.info("Running database migrations...")
+        with app.app_context():
+            # Check if tables exist first
+            inspector = inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+            logging.info(f"Found existing tables: {existing_tables}")
+
+            has_alembic = 'alembic_version' in existing_tables
+            should_run_migrations = True
+
+            if has_alembic:
+                # Check if our migrations are recorded
+                with db.engine.connect() as conn:
+                    result = version = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+                    logging.info(f"Current migration version: {result}")
+                    if result in alembic_ids():
+                        logging.info("Migrations recorded by Alembic, skipping initial setup")
+                        should_run_migrations = False
+                    elif result == INITIAL_MIGRATION_ID:
+                        logging.info("Need to apply cuisine_type length migration")
+                    else:
+                        logging.info(f"Unknown migration state: {result}")
+
+            if should_run_migrations:
+                if not existing_tables:
+                    # Only create tables if none exist
+                    logging.info("No tables found. Creating initial schema...")
+                    db.create_all()
+
+                    # Record our initial migration
+                    if not has_alembic:
+                        version = _record_initial_migration()
+                    logging.info("Recorded initial migration")
+                else:
+                    logging.info("Tables exist but migrations not recorded. Recording initial state...")
+                    if not has_alembic:
+                        version = _record_initial_migration()
+
+                    # Ensure cuisine_type column is the right length
+                    with db.engine.connect() as conn:
+                        conn.execute(text("ALTER TABLE restaurant ALTER COLUMN cuisine_type TYPE TEXT"))
+                        conn.commit()
+                        logging.info("Updated cuisine_type column to TEXT")
+
+            # Final table state, for debugging deploys
+            if 'restaurant' in existing_tables:
+                for col in inspector.get_columns('restaurant'):
+                    logging.debug(f"Column: {col['name']}, Type: {col['type']}, Nullable: {col['nullable']}")
+
+    except Exception as e:
+        logging.error(f"Database migration failed: {str(e)}")
+        raise
+
+    if version != latest_migration_id():
+        logging.warning(
+            f"Database is at migration {version}, expected {latest_migration_id()}: run `flask db upgrade`"
+        )
+        return False
+    return True
+
+
+def _record_initial_migration() -> str:
+    with db.engine.connect() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        conn.execute(text(f"INSERT INTO alembic_version (version_num) VALUES ('{CUISINE_TYPE_MIGRATION_ID}')"))
+        conn.commit()
+    return CUISINE_TYPE_MIGRATION_ID
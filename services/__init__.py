@@ -1,6 +1,7 @@
 import os
-from .google_service import GooglePlacesService
+from .google_service import GooglePlacesService, AsyncGooglePlacesService
 from .yelp_service import YelpService
+from .places import AsyncPlacesService, ThreadedAsyncPlacesService
 # Import other services like GoogleService here
 
 def get_places_service():
@@ -17,4 +18,15 @@ def get_places_service():
         raise ValueError(f"Unsupported places provider: {provider}")
 
 # Make it easily importable
-places_service = get_places_service() 
\ No newline at end of file
+places_service = get_places_service() 
+
+
+def get_async_places_service() -> AsyncPlacesService:
+    """
+    Async counterpart of places_service for the async pipeline. Returns a new
+    instance per call (use it with `async with`); caches and circuit breakers
+    are shared with places_service.
+    """
+    if isinstance(places_service, GooglePlacesService):
+        return AsyncGooglePlacesService(places_service)
+    return ThreadedAsyncPlacesService(places_service)
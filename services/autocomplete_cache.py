@@ -0,0 +1,117 @@
+# services/autocomplete_cache.py
+
+import os
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+
+from .cache import TTLCache
+
+AUTOCOMPLETE_CACHE_TTL = int(os.getenv("AUTOCOMPLETE_CACHE_TTL", 6 * 60 * 60))
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = int(os.getenv("AUTOCOMPLETE_CACHE_MAX_ENTRIES", 5000))
+# Optional shared backend (e.g. redis://host:6379/0) so all workers share one cache
+AUTOCOMPLETE_CACHE_URL = os.getenv("AUTOCOMPLETE_CACHE_URL", "")
+# Google's autocomplete returns at most this many suggestions; a shorter
+# answer means the result set for that prefix is complete.
+AUTOCOMPLETE_PAGE_SIZE = 5
+# Shortest cached prefix we will filter down from
+AUTOCOMPLETE_MIN_PREFIX = 2
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case and collapse whitespace so 'Au  Cheval ' and 'au cheval' share a key."""
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip()
+
+
+def suggestion_matches(suggestion: Dict, normalized_query: str) -> bool:
+    """True if the query is a word-boundary prefix of the suggestion's name or address."""
+    text = normalize_query(f"{suggestion.get('name') or ''} {suggestion.get('address') or ''}")
+    return text.startswith(normalized_query) or f" {normalized_query}" in text
+
+
+class AutocompleteCache:
+    """
+    Autocomplete response cache keyed on (normalized prefix, city).
+
+    Each entry records whether its result set was complete (fewer than a full
+    page). A longer prefix with no entry of its own is answered by filtering the
+    longest complete shorter-prefix entry, so once "au" is cached with 3
+    results, "au c" and "au ch" never reach Google.
+    """
+
+    def __init__(self, ttl: int = AUTOCOMPLETE_CACHE_TTL, max_entries: int = AUTOCOMPLETE_CACHE_MAX_ENTRIES, shared_url: str = AUTOCOMPLETE_CACHE_URL):
+        self.local = TTLCache("autocomplete", ttl=ttl, max_entries=max_entries)
+        self.shared = _RedisBackend(shared_url, ttl) if shared_url else None
+
+    @staticmethod
+    def key(normalized_query: str, city: str) -> str:
+        return f"ac:{normalize_query(city)}:{normalized_query}"
+
+    def lookup(self, query: str, city: str) -> Optional[List[Dict]]:
+        normalized = normalize_query(query)
+        entry = self._get(self.key(normalized, city))
+        if entry is not None:
+            return entry["results"]
+
+        for length in range(len(normalized) - 1, AUTOCOMPLETE_MIN_PREFIX - 1, -1):
+            entry = self._get(self.key(normalized[:length], city))
+            if entry is None:
+                continue
+            if not entry["complete"]:
+                # A full page for a shorter prefix may be missing matches for this one
+                return None
+            results = [s for s in entry["results"] if suggestion_matches(s, normalized)]
+            logging.debug(f"Autocomplete '{normalized}' answered from cached prefix '{normalized[:length]}'")
+            return results
+        return None
+
+    def store(self, query: str, city: str, results: List[Dict]) -> None:
+        entry = {"results": results, "complete": len(results) < AUTOCOMPLETE_PAGE_SIZE}
+        key = self.key(normalize_query(query), city)
+        self.local.set(key, entry)
+        if self.shared:
+            self.shared.set(key, entry)
+
+    def _get(self, key: str) -> Optional[Dict]:
+        entry = self.local.get(key)
+        if entry is None and self.shared:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+        return entry
+
+
+class _RedisBackend:
+    """Best-effort shared cache. Any error (including redis not being installed) disables it."""
+
+    def __init__(self, url: str, ttl: int):
+        self.ttl = ttl
+        self.client = None
+        try:
+            import redis
+            self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        except ImportError:
+            logging.warning("AUTOCOMPLETE_CACHE_URL is set but the redis package is not installed; using in-process cache only")
+        except Exception as e:
+            logging.warning(f"Could not configure shared autocomplete cache: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.client:
+            return None
+        try:
+            raw = self.client.get(key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logging.debug(f"Shared autocomplete cache get failed: {e}")
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        if not self.client:
+            return
+        try:
+            self.client.setex(key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logging.debug(f"Shared autocomplete cache set failed: {e}")
@@ -0,0 +1,235 @@
+# services/cache.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with per-entry TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` seconds are fresh. Entries older than `ttl` but
+    younger than `ttl + stale_ttl` are still served, while a background thread
+    refreshes them. Anything older is a miss. Once `max_entries` is reached the
+    least recently used entry is evicted.
+
+    If `persist_path` is set, entries are loaded from a JSON file on start, so a
+    restarted worker starts warm. Writes are batched: a change schedules one
+    background flush() `save_delay` seconds later (and one at exit), so a burst
+    of set() calls costs a single file write. Keys must be strings, and values
+    JSON-serialisable once passed through `encode`; `decode` turns the stored
+    JSON back into a value on load.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0,
+        max_entries: int = 256,
+        persist_path: Optional[str] = None,
+        save_delay: float = 5.0,
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self.encode = encode
+        self.decode = decode
+
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        # One file write at a time; _save_timer is the pending flush, if any
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self.saves = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        if self.persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key if fresh or stale, else None. Never refreshes."""
+        value, _ = self.lookup(key)
+        return value
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_stale); value is None on a miss. Callers decide whether to refresh()."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            stored_at, value = entry
+            age = now - stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, False
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, True
+
+            del self._entries[key]
+            self.misses += 1
+            return None, False
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._save()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        self._save()
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        cacheable: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        A stale hit is returned immediately and loader() is re-run in the
+        background. Results for which cacheable(result) is False (by default:
+        empty or None, which the providers use to signal errors) are returned
+        but not stored.
+        """
+        value, is_stale = self.lookup(key)
+        if value is not None:
+            if is_stale:
+                self.refresh(key, loader, cacheable)
+            return value
+
+        value = loader()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+    def flush(self) -> None:
+        """Write the entries to persist_path now, replacing any pending background write."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        self._write()
+
+    def refresh(self, key: str, loader: Callable[[], Any], cacheable: Callable[[Any], bool] = bool) -> None:
+        """Re-run loader() for key on a background thread; at most one refresh per key at a time."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                value = loader()
+                if cacheable(value):
+                    self.set(key, value)
+            except Exception as e:
+                logging.warning(f"{self.name} cache: background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"{self.name} cache: could not read {self.persist_path}: {e}")
+            return
+
+        cutoff = time.time() - (self.ttl + self.stale_ttl)
+        entries = sorted(
+            ((stored_at, key, value) for key, (stored_at, value) in raw.items() if stored_at >= cutoff),
+            key=lambda e: e[0],
+        )
+        for stored_at, key, value in entries[-self.max_entries:]:
+            try:
+                self._entries[key] = (stored_at, self.decode(value) if self.decode else value)
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"{self.name} cache: skipping unreadable entry {key}: {e}")
+        logging.debug(f"{self.name} cache: loaded {len(self._entries)} entries from {self.persist_path}")
+
+    def _save(self):
+        """Schedule a flush() in save_delay seconds unless one is already pending."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._flush_pending)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _flush_pending(self):
+        with self._lock:
+            self._save_timer = None
+        self._write()
+
+    def _write(self):
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.items())
+            try:
+                encode = self.encode or (lambda value: value)
+                snapshot = {key: [stored_at, encode(value)] for key, (stored_at, value) in entries}
+                os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+                tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.persist_path)
+                self.saves += 1
+            except (OSError, TypeError, ValueError) as e:
+                logging.warning(f"{self.name} cache: could not write {self.persist_path}: {e}")
@@ -0,0 +1,189 @@
+# services/candidate.py
+
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+# Candidate fields, in the key order of the provider's candidate dicts
+FIELDS = (
+    "name", "place_id", "address", "phone", "website", "categories",
+    "price_level", "rating", "user_rating_count", "editorial_summary", "primary_type",
+    "serves_dine_in", "serves_takeout", "serves_delivery", "reservable",
+    "latitude", "longitude",
+)
+# The revisit flag is `is_revisit` on the record and "_is_revisit" in dict form
+REVISIT_KEY = "_is_revisit"
+# When the provider returned this data (epoch seconds); None if unknown
+FETCHED_AT_KEY = "fetched_at"
+_KEYS = frozenset(FIELDS + (REVISIT_KEY, FETCHED_AT_KEY))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Price levels and place types come from small fixed vocabularies, so every
+    # candidate shares one string per value and comparisons are pointer checks
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Candidate:
+    """
+    One restaurant candidate for a recommendation request.
+
+    A slotted record instead of a 17-key dict: parse_nearby() builds one per
+    searchNearby result and the caches hold them, so a cached pool reaches the
+    filters without any per-request conversion. price_level, primary_type and
+    categories are interned. It also reads like the dict it replaces
+    (c["name"], c.get("rating"), "name" in c, dict(c)), so code written against
+    candidate dicts keeps working; hot loops should use the attributes.
+
+    Candidates are read-only: cached pools and single-flight callers share the
+    same instances across requests. Item assignment and update() raise; do not
+    assign attributes either. To change a candidate, build a new one, e.g.
+    Candidate.from_place({**c.to_dict(), "rating": 4.5}), or work on dict(c).
+    """
+
+    __slots__ = FIELDS + ("is_revisit", "fetched_at")
+
+    def __init__(self, name: Optional[str] = None, place_id: Optional[str] = None, address: Optional[str] = None,
+                 phone: Optional[str] = None, website: Optional[str] = None, categories=(),
+                 price_level: Optional[str] = None, rating: Optional[float] = None,
+                 user_rating_count: Optional[int] = None, editorial_summary: Optional[str] = None,
+                 primary_type: Optional[str] = None, serves_dine_in: Optional[bool] = None,
+                 serves_takeout: Optional[bool] = None, serves_delivery: Optional[bool] = None,
+                 reservable: Optional[bool] = None, latitude: Optional[float] = None,
+                 longitude: Optional[float] = None, is_revisit: bool = False,
+                 fetched_at: Optional[float] = None):
+        self.name = name
+        self.place_id = place_id
+        self.address = address
+        self.phone = phone
+        self.website = website
+        self.categories: Tuple[str, ...] = tuple(_intern(t) for t in categories or ())
+        self.price_level = _intern(price_level)
+        self.rating = rating
+        self.user_rating_count = user_rating_count
+        self.editorial_summary = editorial_summary
+        self.primary_type = _intern(primary_type)
+        self.serves_dine_in = serves_dine_in
+        self.serves_takeout = serves_takeout
+        self.serves_delivery = serves_delivery
+        self.reservable = reservable
+        self.latitude = latitude
+        self.longitude = longitude
+        self.is_revisit = is_revisit
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_place(cls, place: Mapping, fetched_at: Optional[float] = None) -> "Candidate":
+        """From a provider candidate/details dict (parse_place() shape, optionally with "_is_revisit")."""
+        return cls(
+            is_revisit=bool(place.get(REVISIT_KEY, False)),
+            fetched_at=fetched_at if fetched_at is not None else place.get(FETCHED_AT_KEY),
+            **{field: place.get(field) for field in FIELDS},
+        )
+
+    @classmethod
+    def from_restaurant(cls, restaurant, is_revisit: bool = False) -> "Candidate":
+        """From a Restaurant row or history RestaurantRecord; fetched_at is the row's last_enriched_at."""
+        enriched_at = getattr(restaurant, "last_enriched_at", None)
+        return cls(
+            name=restaurant.name,
+            place_id=restaurant.place_id,
+            address=restaurant.location,
+            categories=[c for c in (restaurant.cuisine_type or "").split(", ") if c],
+            price_level=restaurant.price_level,
+            rating=restaurant.rating,
+            user_rating_count=restaurant.user_rating_count,
+            editorial_summary=restaurant.editorial_summary,
+            primary_type=restaurant.primary_type,
+            serves_dine_in=restaurant.serves_dine_in,
+            serves_takeout=restaurant.serves_takeout,
+            serves_delivery=restaurant.serves_delivery,
+            reservable=restaurant.reservable,
+            latitude=getattr(restaurant, "latitude", None),
+            longitude=getattr(restaurant, "longitude", None),
+            is_revisit=is_revisit,
+            fetched_at=enriched_at.replace(tzinfo=timezone.utc).timestamp() if enriched_at else None,
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "Candidate":
+        """value itself if it is already a Candidate, else Candidate.from_place(value)."""
+        return value if isinstance(value, cls) else cls.from_place(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The candidate dict this record stands for (JSON-serialisable)."""
+        data = {field: getattr(self, field) for field in FIELDS}
+        data["categories"] = list(self.categories)
+        data[REVISIT_KEY] = self.is_revisit
+        data[FETCHED_AT_KEY] = self.fetched_at
+        return data
+
+    # ------------------------------------------------------------------
+    # Read-only mapping interface, for code written against candidate dicts
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key not in _KEYS:
+            raise KeyError(key)
+        return self.is_revisit if key == REVISIT_KEY else getattr(self, key)
+
+    def get(self, key: str, default=None):
+        if key not in _KEYS:
+            return default
+        return self.is_revisit if key == REVISIT_KEY else getattr(self, key)
+
+    def __setitem__(self, key, value):
+        raise TypeError("Candidate is read-only; copy it with dict(c) or c.to_dict()")
+
+    def __delitem__(self, key):
+        raise TypeError("Candidate is read-only; copy it with dict(c) or c.to_dict()")
+
+    def update(self, *args, **kwargs):
+        raise TypeError("Candidate is read-only; copy it with dict(c) or c.to_dict()")
+
+    def fetched_datetime(self) -> Optional[datetime]:
+        """fetched_at as a naive UTC datetime, the convention of Restaurant.last_enriched_at."""
+        if self.fetched_at is None:
+            return None
+        return datetime.fromtimestamp(self.fetched_at, timezone.utc).replace(tzinfo=None)
+
+    def __contains__(self, key) -> bool:
+        return key in _KEYS
+
+    def keys(self):
+        return FIELDS + (REVISIT_KEY, FETCHED_AT_KEY)
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(_KEYS)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Candidate):
+            # Same place data; when it was fetched does not matter
+            return self.is_revisit == other.is_revisit and all(
+                getattr(self, field) == getattr(other, field) for field in FIELDS
+            )
+        if isinstance(other, Mapping):
+            # Equal to a candidate dict describing the same record; absent keys count as unset
+            return set(other) <= _KEYS and self == Candidate.from_place(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"<Candidate {self.place_id} {self.name!r}>"
+
+
+def candidates_to_json(candidates) -> list:
+    """A list of candidates (records or dicts) as JSON-serialisable dicts, for stores that persist pools."""
+    return [Candidate.coerce(c).to_dict() for c in candidates]
+
+
+def candidates_from_json(data) -> list:
+    """The inverse of candidates_to_json()."""
+    return [Candidate.from_place(c) for c in data]
@@ -0,0 +1,181 @@
+# services/candidate_pools.py
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Tuple
+
+from .candidate import Candidate, candidates_from_json, candidates_to_json
+
+# Pre-warmed searchNearby pools (see prewarm.py). Shared between the worker
+# processes on a host through this file; "" keeps them in memory only.
+CANDIDATE_POOL_PATH = os.getenv("CANDIDATE_POOL_PATH", "/tmp/campfire/candidate_pools.json")
+# Snapshots older than this are ignored, so a stopped scheduler degrades to live searches
+CANDIDATE_POOL_MAX_AGE = float(os.getenv("CANDIDATE_POOL_MAX_AGE", 24 * 60 * 60))
+# How often readers check the file for a newer set of snapshots
+CANDIDATE_POOL_RELOAD_INTERVAL = float(os.getenv("CANDIDATE_POOL_RELOAD_INTERVAL", 5))
+
+
+@dataclass(frozen=True)
+class CandidatePoolSnapshot:
+    """One searchNearby result for a configured area, as fetched by the pre-warmer."""
+    key: str                        # nearby_cache_key of the search
+    city: str
+    neighborhood: Optional[str]
+    included_types: Tuple[str, ...]
+    version: int                    # increases by one per successful refresh of this key
+    fetched_at: float
+    enriched_at: Optional[float]    # when its places were written to the place store
+    candidates: Tuple[Candidate, ...]
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+    def to_json(self) -> dict:
+        data = {field.name: getattr(self, field.name) for field in fields(self)}
+        data["candidates"] = candidates_to_json(self.candidates)
+        return data
+
+    @classmethod
+    def from_json(cls, raw: dict) -> "CandidatePoolSnapshot":
+        return cls(**{
+            **raw,
+            "included_types": tuple(raw["included_types"]),
+            "candidates": tuple(candidates_from_json(raw["candidates"])),
+        })
+
+
+class CandidatePoolStore:
+    """
+    Latest CandidatePoolSnapshot per search key.
+
+    Snapshots are immutable and replaced whole, so a reader holding one never
+    sees a half-written pool. With a `path`, put() rewrites the file
+    atomically and other processes pick it up within `reload_interval`.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = CANDIDATE_POOL_MAX_AGE,
+                 reload_interval: float = CANDIDATE_POOL_RELOAD_INTERVAL):
+        self.path = path
+        self.max_age = max_age
+        self.reload_interval = reload_interval
+        self._snapshots: Dict[str, CandidatePoolSnapshot] = {}
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CandidatePoolSnapshot]:
+        """The current snapshot for key, or None if there is none or it is older than max_age."""
+        self._maybe_reload()
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.age() > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return snapshot
+
+    def peek(self, key: str) -> Optional[CandidatePoolSnapshot]:
+        """The stored snapshot for key whatever its age, without counting a hit or miss."""
+        self._maybe_reload()
+        return self._snapshots.get(key)
+
+    def put(self, snapshot: CandidatePoolSnapshot) -> None:
+        with self._lock:
+            self._snapshots[snapshot.key] = snapshot
+        self._save()
+
+    def next_version(self, key: str) -> int:
+        self._maybe_reload(force=True)
+        current = self._snapshots.get(key)
+        return current.version + 1 if current else 1
+
+    def snapshots(self) -> List[CandidatePoolSnapshot]:
+        self._maybe_reload()
+        return list(self._snapshots.values())
+
+    def stats(self) -> dict:
+        return {"snapshots": len(self._snapshots), "hits": self.hits, "misses": self.misses}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        now = time.time()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            snapshots = {key: CandidatePoolSnapshot.from_json(value) for key, value in raw.items()}
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"candidate pools: could not read {self.path}: {e}")
+            return
+        with self._lock:
+            self._snapshots = snapshots
+            self._loaded_mtime = mtime
+        logging.debug(f"candidate pools: loaded {len(snapshots)} snapshots from {self.path}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = {key: snapshot.to_json() for key, snapshot in self._snapshots.items()}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"candidate pools: could not write {self.path}: {e}")
+
+
+def try_lock(path: str):
+    """An exclusive non-blocking lock on path (an open file to close when done), or None if it is held."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a")
+    try:
+        _lock_file(handle)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _lock_file(handle) -> None:
+    """Non-blocking exclusive lock on an open file; raises OSError if it is held."""
+    # Imported here so the module (and app) still import where fcntl is missing
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return
+    try:
+        import msvcrt
+    except ImportError:
+        logging.debug(f"No file locking on this platform, not locking {handle.name}")
+        return
+    handle.seek(0)
+    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+candidate_pools = CandidatePoolStore(CANDIDATE_POOL_PATH or None)
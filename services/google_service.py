@@ -1,13 +1,50 @@
 # services/google_service.py
 
 import os
+import asyncio
+import math
+import time
+import httpx
 import requests
-from typing import List, Dict, Optional
-from .places import PlacesService
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from .places import PlacesService, AsyncPlacesService
+from .cache import TTLCache
+from .http import (
+    get_transport, AsyncRetryTransport, CircuitOpenError, RETRY_STATUSES,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE,
+)
+from .autocomplete_cache import AutocompleteCache
+from .singleflight import SingleFlight, SingleFlightTimeout
+from .candidate_pools import candidate_pools
+from .candidate import Candidate, candidates_from_json, candidates_to_json
 
 import logging
 import uuid
 
+# searchNearby result cache. Results for a given (centre, radius, types) are
+# stable over hours, so repeat city/neighbourhood queries skip Google entirely.
+NEARBY_CACHE_TTL = int(os.getenv("NEARBY_CACHE_TTL", 6 * 60 * 60))
+NEARBY_CACHE_STALE_TTL = int(os.getenv("NEARBY_CACHE_STALE_TTL", 18 * 60 * 60))
+NEARBY_CACHE_MAX_ENTRIES = int(os.getenv("NEARBY_CACHE_MAX_ENTRIES", 512))
+# Opt-in: a JSON file the cache is reloaded from on start and flushed to in the background
+NEARBY_CACHE_PATH = os.getenv("NEARBY_CACHE_PATH", "")
+# 3 decimal places ≈ 110m, so centres that differ only by float noise share a cell
+NEARBY_CACHE_COORD_PRECISION = 3
+
+# Wide retrieval (see nearby_searches): searches with a radius of at least
+# NEARBY_TILE_MIN_RADIUS metres are split into 7 overlapping sub-circles, and up
+# to NEARBY_CUISINE_QUERIES cuisine-specific searches are added for the
+# session's cuisines. Each search is capped at max_results by Google, so this
+# is what widens the pool. Tiling multiplies billed calls on a cold cache, so it
+# is opt-in; the default concurrency runs every search of a request in one wave.
+NEARBY_TILING = os.getenv("NEARBY_TILING", "0") != "0"
+NEARBY_TILE_MIN_RADIUS = int(os.getenv("NEARBY_TILE_MIN_RADIUS", 4000))
+NEARBY_CUISINE_QUERIES = int(os.getenv("NEARBY_CUISINE_QUERIES", 3))
+NEARBY_MAX_CONCURRENCY = int(os.getenv("NEARBY_MAX_CONCURRENCY", 7 + NEARBY_CUISINE_QUERIES))
+# Sub-circle radius as a fraction of the searched radius; 0.5 just covers the circle
+NEARBY_TILE_SCALE = 0.55
+
 # City coordinates for location biasing
 CITY_COORDINATES = {
     "Chicago": {"latitude": 41.8781, "longitude": -87.6298},
@@ -37,6 +74,11 @@ NEIGHBORHOOD_COORDINATES = {
     "Upper East Side": {"latitude": 40.7736, "longitude": -73.9566, "radius": 2000},
 }
 
+# Fields are camelCase in v1. The FieldMask is required for billing control.
+DETAILS_FIELD_MASK = "id,displayName,formattedAddress,nationalPhoneNumber,websiteUri,types,priceLevel,rating,userRatingCount,editorialSummary,primaryType,dineIn,takeout,delivery,reservable,location"
+NEARBY_FIELD_MASK = "places.id,places.displayName,places.formattedAddress,places.types,places.priceLevel,places.rating,places.userRatingCount,places.editorialSummary,places.primaryType,places.dineIn,places.takeout,places.delivery,places.reservable,places.location"
+
+
 class GooglePlacesService(PlacesService):
     """
     Google Places API (New) implementation of the PlacesService.
@@ -45,12 +87,39 @@ class GooglePlacesService(PlacesService):
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         self.base_url = "https://places.googleapis.com/v1"
+        self.http = get_transport()
+        self._nearby_cache = TTLCache(
+            "searchNearby",
+            ttl=NEARBY_CACHE_TTL,
+            stale_ttl=NEARBY_CACHE_STALE_TTL,
+            max_entries=NEARBY_CACHE_MAX_ENTRIES,
+            persist_path=NEARBY_CACHE_PATH or None,
+            encode=candidates_to_json,
+            decode=candidates_from_json,
+        )
+        self._autocomplete_cache = AutocompleteCache()
+        # Concurrent identical searchNearby/details calls share one upstream request
+        self._flight = SingleFlight("places")
+        # Pre-warmed pools for the configured areas, refreshed by prewarm.py
+        self._pools = candidate_pools
 
     def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> Optional[List[Dict]]:
         if not self.api_key:
             logging.error("GOOGLE_API_KEY is not set.")
             return None
 
+        cached = self._autocomplete_cache.lookup(query, city)
+        if cached is not None:
+            return cached
+
+        results = self._fetch_autocomplete(query, city, session_token)
+        if results is not None:
+            self._autocomplete_cache.store(query, city, results)
+        return results
+
+    def _autocomplete_request(self, query: str, city: str, session_token: Optional[str] = None):
+        """(url, headers, body) for a places:autocomplete call."""
+
         # Headers for the New API
         headers = {
             "Content-Type": "application/json",
@@ -77,54 +146,28 @@ class GooglePlacesService(PlacesService):
                 }
             }
 
+        return f"{self.base_url}/places:autocomplete", headers, body
+
+    def _fetch_autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> Optional[List[Dict]]:
+        """Uncached places:autocomplete call. Returns None on any error."""
+        url, headers, body = self._autocomplete_request(query, city, session_token)
         try:
             logging.debug(f"Calling Google Places Autocomplete (New) with body: {body}")
-            response = requests.post(f"{self.base_url}/places:autocomplete", headers=headers, json=body)
+            response = self.http.post(url, headers=headers, json=body)
             
             # Handle specific New API errors
             if response.status_code != 200:
                  logging.error(f"Google API Error ({response.status_code}): {response.text}")
                  return None
                  
-            data = response.json()
-            suggestions = data.get("suggestions", [])
-            logging.debug(f"Google Autocomplete found {len(suggestions)} results")
-            
-            results = []
-            for s in suggestions:
-                place_prediction = s.get("placePrediction", {})
-                
-                # The New API returns 'placeId' directly, or 'place' as resource name.
-                place_id = place_prediction.get("placeId")
-                if not place_id:
-                    resource_name = place_prediction.get("place", "")
-                    place_id = resource_name.replace("places/", "") if resource_name.startswith("places/") else resource_name
-                
-                text_obj = place_prediction.get("text", {})
-                main_text = text_obj.get("text", "")
-                
-                # structuredFormat contains mainText and secondaryText (address)
-                structured = place_prediction.get("structuredFormat", {})
-                main_text_struct = structured.get("mainText", {}).get("text", main_text)
-                secondary_text = structured.get("secondaryText", {}).get("text", "")
-
-                results.append({
-                    "name": main_text_struct,
-                    "place_id": place_id,
-                    "address": secondary_text,
-                })
-                
-            return results
+            return parse_autocomplete(response.json())
 
         except requests.RequestException as e:
             logging.error(f"Error calling Google Places API: {e}")
             return None
 
-    def get_details(self, place_id: str, session_token: Optional[str] = None) -> Optional[Dict]:
-        if not self.api_key:
-            logging.error("GOOGLE_API_KEY is not set.")
-            return None
-        
+    def _details_request(self, place_id: str, session_token: Optional[str] = None):
+        """(url, headers, params) for a place details call."""
         # Ensure place_id is in the format "places/..." for the URL if strictly required,
         # but v1 endpoint usually is /v1/places/{id}. 
         # Documentation says resource name: "places/{PLACE_ID}".
@@ -132,50 +175,39 @@ class GooglePlacesService(PlacesService):
         
         headers = {
             "X-Goog-Api-Key": self.api_key,
-            # Specify fields to return (FieldMask is required/recommended for billing control)
-            # Fields are camelCase in v1.
-            "X-Goog-FieldMask": "id,displayName,formattedAddress,nationalPhoneNumber,websiteUri,types,priceLevel,rating,userRatingCount,editorialSummary,primaryType,dineIn,takeout,delivery,reservable"
+            "X-Goog-FieldMask": DETAILS_FIELD_MASK,
         }
 
         params = {}
         if session_token:
             params["sessionToken"] = session_token
-        
+
+        return f"{self.base_url}/{resource_name}", headers, params
+
+    def get_details(self, place_id: str, session_token: Optional[str] = None) -> Optional[Dict]:
+        if not self.api_key:
+            logging.error("GOOGLE_API_KEY is not set.")
+            return None
+
+        # Keyed on the place alone: a joining caller's session token is not sent
         try:
-            response = requests.get(f"{self.base_url}/{resource_name}", headers=headers, params=params)
+            details = self._flight.do(details_flight_key(place_id), lambda: self._fetch_details(place_id, session_token))
+        except SingleFlightTimeout as e:
+            logging.error(f"Error calling Google Places API: {e}")
+            return None
+        # Copy so one caller's changes don't reach the others sharing the result
+        return dict(details) if details is not None else None
+
+    def _fetch_details(self, place_id: str, session_token: Optional[str] = None) -> Optional[Dict]:
+        """Uncoalesced place details call. Returns None on any error."""
+        url, headers, params = self._details_request(place_id, session_token)
+        try:
+            response = self.http.get(url, headers=headers, params=params)
             if response.status_code != 200:
                 logging.error(f"Google API Error ({response.status_code}): {response.text}")
                 return None
                 
-            place = response.json()
-
-            # Map v1 response back to our internal schema
-            # v1 returns types as snake_case values in a list, e.g. ["restaurant", "food"]
-            
-            # Extract ID without prefix
-            raw_id = place.get("id", "")
-            if not raw_id:
-                # Fallback to parsing resource name
-                raw_id = place.get("name", "").replace("places/", "")
-            if not raw_id: raw_id = place_id # Ultimate fallback
-
-            return {
-                "name": place.get("displayName", {}).get("text"),
-                "place_id": raw_id,
-                "address": place.get("formattedAddress"),
-                "phone": place.get("nationalPhoneNumber"),
-                "website": place.get("websiteUri"),
-                "categories": place.get("types", []),
-                "price_level": place.get("priceLevel"),
-                "rating": place.get("rating"),
-                "user_rating_count": place.get("userRatingCount"),
-                "editorial_summary": place.get("editorialSummary", {}).get("text"),
-                "primary_type": place.get("primaryType"),
-                "serves_dine_in": place.get("dineIn"),
-                "serves_takeout": place.get("takeout"),
-                "serves_delivery": place.get("delivery"),
-                "reservable": place.get("reservable"),
-            }
+            return parse_place(response.json(), fallback_id=place_id)
         except requests.RequestException as e:
             logging.error(f"Error calling Google Places API: {e}")
             return None
@@ -186,41 +218,82 @@ class GooglePlacesService(PlacesService):
         neighborhood: Optional[str] = None,
         restaurant_types: Optional[List] = None,
         radius: int = 8000,
-        max_results: int = 20
+        max_results: int = 20,
+        cuisine_types: Optional[List[str]] = None,
     ) -> List[Dict]:
         if not self.api_key:
             logging.error("GOOGLE_API_KEY is not set.")
             return []
 
-        if city not in CITY_COORDINATES:
-            logging.warning(f"No coordinates configured for city: {city}")
+        area = search_area(city, neighborhood, restaurant_types, radius)
+        if area is None:
             return []
+        centre, search_radius, included_types = area
 
-        # Use neighbourhood coordinates + tighter radius if available
-        if neighborhood and neighborhood in NEIGHBORHOOD_COORDINATES:
-            nb = NEIGHBORHOOD_COORDINATES[neighborhood]
-            centre = {"latitude": nb["latitude"], "longitude": nb["longitude"]}
-            search_radius = nb["radius"]
-            logging.debug(f"Using neighbourhood coordinates for {neighborhood} (radius {search_radius}m)")
-        else:
-            centre = CITY_COORDINATES[city]
-            search_radius = radius
-            logging.debug(f"Using city coordinates for {city} (radius {search_radius}m)")
+        searches = nearby_searches(centre, search_radius, included_types, cuisine_types)
+        results: List[Optional[List[Dict]]] = [self._nearby_hit(city, *search, max_results) for search in searches]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) == 1:
+            results[misses[0]] = self._nearby_miss(city, *searches[misses[0]], max_results)
+        elif misses:
+            with ThreadPoolExecutor(max_workers=min(NEARBY_MAX_CONCURRENCY, len(misses))) as pool:
+                fetched = pool.map(lambda i: self._nearby_miss(city, *searches[i], max_results), misses)
+                for i, result in zip(misses, fetched):
+                    results[i] = result
+        return merge_candidates(results)
+
+    def _nearby_hit(self, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> Optional[List[Dict]]:
+        """One search from its pre-warmed snapshot or the cache (refreshing a stale entry in the background), or None."""
+        cache_key = nearby_cache_key(centre, search_radius, included_types, max_results)
+        snapshot = self._pools.get(cache_key)
+        if snapshot is not None:
+            return list(snapshot.candidates)
+
+        cached, is_stale = self._nearby_cache.lookup(cache_key)
+        if cached is None:
+            return None
+        if is_stale:
+            self._nearby_cache.refresh(cache_key, lambda: self._fetch_nearby_shared(
+                cache_key, city, centre, search_radius, included_types, max_results
+            ))
+        # Copy so callers can filter/sort without mutating the cached list
+        return list(cached)
 
+    def _nearby_miss(self, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> List[Dict]:
+        return list(self.prefetch_nearby(city, centre, search_radius, included_types, max_results))
+
+    def prefetch_nearby(self, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int = 20) -> List[Dict]:
+        """
+        One searchNearby call for an exact search (as planned by nearby_searches),
+        ignoring pre-warmed snapshots and cached results. A non-empty result
+        replaces the cache entry. Joins a concurrent identical call. Used on a
+        miss and by prewarm.py.
+        """
+        cache_key = nearby_cache_key(centre, search_radius, included_types, max_results)
+        results = self._fetch_nearby_shared(cache_key, city, centre, search_radius, included_types, max_results)
+        if results:
+            self._nearby_cache.set(cache_key, results)
+        return results
+
+    def _fetch_nearby_shared(self, cache_key: str, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> List[Dict]:
+        """_fetch_nearby, joined by concurrent cache misses for the same search."""
+        try:
+            return self._flight.do(
+                nearby_flight_key(cache_key),
+                lambda: self._fetch_nearby(city, centre, search_radius, included_types, max_results),
+            )
+        except SingleFlightTimeout as e:
+            logging.error(f"Error calling Google searchNearby API: {e}")
+            return []
+
+    def _nearby_request(self, centre: Dict, search_radius: int, included_types: List[str], max_results: int):
+        """(url, headers, body) for a places:searchNearby call."""
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress,places.types,places.priceLevel,places.rating,places.userRatingCount,places.editorialSummary,places.primaryType,places.dineIn,places.takeout,places.delivery,places.reservable"
+            "X-Goog-FieldMask": NEARBY_FIELD_MASK,
         }
 
-        # Map frontend type selections to Google Place types for Bar searches.
-        # Fine Dining and Casual stay broad ("restaurant") and are filtered post-fetch
-        # using price_level, since Google's fine_dining_restaurant type is inconsistent.
-        if restaurant_types and "Bar" in restaurant_types and len(restaurant_types) == 1:
-            included_types = ["bar", "cocktail_bar", "wine_bar", "pub"]
-        else:
-            included_types = ["restaurant"]
-
         body = {
             "includedTypes": included_types,
             "maxResultCount": max_results,
@@ -232,44 +305,350 @@ class GooglePlacesService(PlacesService):
             }
         }
 
+        return f"{self.base_url}/places:searchNearby", headers, body
+
+    def _fetch_nearby(self, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> List[Dict]:
+        """Uncached places:searchNearby call. Returns [] on any error."""
+        url, headers, body = self._nearby_request(centre, search_radius, included_types, max_results)
         try:
             logging.debug(f"Calling Google Places searchNearby for city: {city}")
-            response = requests.post(f"{self.base_url}/places:searchNearby", headers=headers, json=body)
+            response = self.http.post(url, headers=headers, json=body)
 
             if response.status_code != 200:
                 logging.error(f"Google searchNearby Error ({response.status_code}): {response.text}")
                 return []
 
-            data = response.json()
-            places = data.get("places", [])
-            logging.debug(f"searchNearby returned {len(places)} candidates for {city}")
-
-            results = []
-            for place in places:
-                raw_id = place.get("id", "")
-                if not raw_id:
-                    raw_id = place.get("name", "").replace("places/", "")
-
-                results.append({
-                    "name": place.get("displayName", {}).get("text"),
-                    "place_id": raw_id,
-                    "address": place.get("formattedAddress"),
-                    "phone": None,
-                    "website": None,
-                    "categories": place.get("types", []),
-                    "price_level": place.get("priceLevel"),
-                    "rating": place.get("rating"),
-                    "user_rating_count": place.get("userRatingCount"),
-                    "editorial_summary": place.get("editorialSummary", {}).get("text"),
-                    "primary_type": place.get("primaryType"),
-                    "serves_dine_in": place.get("dineIn"),
-                    "serves_takeout": place.get("takeout"),
-                    "serves_delivery": place.get("delivery"),
-                    "reservable": place.get("reservable"),
-                })
-
+            results = parse_nearby(response.json())
+            logging.debug(f"searchNearby returned {len(results)} candidates for {city}")
             return results
 
         except requests.RequestException as e:
             logging.error(f"Error calling Google searchNearby API: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+class AsyncGooglePlacesService(AsyncPlacesService):
+    """
+    asyncio twin of GooglePlacesService for the async recommendation pipeline.
+
+    Builds requests and parses responses exactly like the sync service and
+    shares its API key, searchNearby cache, autocomplete cache and per-host
+    circuit breakers, and retries like its transport (AsyncRetryTransport).
+    Calls go through an httpx.AsyncClient opened per `async with` block, since
+    an AsyncClient is bound to the event loop it was created on.
+    """
+
+    def __init__(self, sync_service: GooglePlacesService):
+        self.sync = sync_service
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE),
+            transport=AsyncRetryTransport(),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        breaker = self.sync.http.breaker_for(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {breaker.host}; skipping {method} {url}")
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> Optional[List[Dict]]:
+        if not self.sync.api_key:
+            logging.error("GOOGLE_API_KEY is not set.")
+            return None
+
+        cached = self.sync._autocomplete_cache.lookup(query, city)
+        if cached is not None:
+            return cached
+
+        url, headers, body = self.sync._autocomplete_request(query, city, session_token)
+        try:
+            response = await self._request("POST", url, headers=headers, json=body)
+            if response.status_code != 200:
+                logging.error(f"Google API Error ({response.status_code}): {response.text}")
+                return None
+            results = parse_autocomplete(response.json())
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logging.error(f"Error calling Google Places API: {e}")
+            return None
+
+        self.sync._autocomplete_cache.store(query, city, results)
+        return results
+
+    async def get_details(self, place_id: str, session_token: Optional[str] = None) -> Optional[Dict]:
+        if not self.sync.api_key:
+            logging.error("GOOGLE_API_KEY is not set.")
+            return None
+
+        try:
+            details = await self.sync._flight.do_async(
+                details_flight_key(place_id), lambda: self._fetch_details(place_id, session_token)
+            )
+        except SingleFlightTimeout as e:
+            logging.error(f"Error calling Google Places API: {e}")
+            return None
+        return dict(details) if details is not None else None
+
+    async def _fetch_details(self, place_id: str, session_token: Optional[str] = None) -> Optional[Dict]:
+        url, headers, params = self.sync._details_request(place_id, session_token)
+        try:
+            response = await self._request("GET", url, headers=headers, params=params)
+            if response.status_code != 200:
+                logging.error(f"Google API Error ({response.status_code}): {response.text}")
+                return None
+            return parse_place(response.json(), fallback_id=place_id)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logging.error(f"Error calling Google Places API: {e}")
+            return None
+
+    async def search_nearby_candidates(
+        self,
+        city: str,
+        neighborhood: Optional[str] = None,
+        restaurant_types: Optional[List] = None,
+        radius: int = 8000,
+        max_results: int = 20,
+        cuisine_types: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        if not self.sync.api_key:
+            logging.error("GOOGLE_API_KEY is not set.")
+            return []
+
+        area = search_area(city, neighborhood, restaurant_types, radius)
+        if area is None:
+            return []
+        centre, search_radius, included_types = area
+
+        searches = nearby_searches(centre, search_radius, included_types, cuisine_types)
+        results: List[Optional[List[Dict]]] = [self.sync._nearby_hit(city, *search, max_results) for search in searches]
+        misses = [i for i, result in enumerate(results) if result is None]
+        limit = asyncio.Semaphore(NEARBY_MAX_CONCURRENCY)
+
+        async def miss(i):
+            async with limit:
+                return await self._nearby_miss(city, *searches[i], max_results)
+
+        for i, result in zip(misses, await asyncio.gather(*(miss(i) for i in misses))):
+            results[i] = result
+        return merge_candidates(results)
+
+    async def _nearby_miss(self, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> List[Dict]:
+        cache_key = nearby_cache_key(centre, search_radius, included_types, max_results)
+        try:
+            results = await self.sync._flight.do_async(
+                nearby_flight_key(cache_key),
+                lambda: self._fetch_nearby(cache_key, city, centre, search_radius, included_types, max_results),
+            )
+        except SingleFlightTimeout as e:
+            logging.error(f"Error calling Google searchNearby API: {e}")
+            return []
+        return list(results)
+
+    async def _fetch_nearby(self, cache_key: str, city: str, centre: Dict, search_radius: int, included_types: List[str], max_results: int) -> List[Dict]:
+        """searchNearby over httpx; stores non-empty results in the shared cache. Returns [] on any error."""
+        url, headers, body = self.sync._nearby_request(centre, search_radius, included_types, max_results)
+        try:
+            logging.debug(f"Calling Google Places searchNearby (async) for city: {city}")
+            response = await self._request("POST", url, headers=headers, json=body)
+            if response.status_code != 200:
+                logging.error(f"Google searchNearby Error ({response.status_code}): {response.text}")
+                return []
+            results = parse_nearby(response.json())
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logging.error(f"Error calling Google searchNearby API: {e}")
+            return []
+
+        logging.debug(f"searchNearby returned {len(results)} candidates for {city}")
+        if results:
+            self.sync._nearby_cache.set(cache_key, results)
+        return results
+
+
+def search_area(city: str, neighborhood: Optional[str], restaurant_types: Optional[List], radius: int):
+    """
+    Resolve (centre, radius, included_types) for a searchNearby call, or None
+    if the city has no configured coordinates.
+    """
+    if city not in CITY_COORDINATES:
+        logging.warning(f"No coordinates configured for city: {city}")
+        return None
+
+    # Use neighbourhood coordinates + tighter radius if available
+    if neighborhood and neighborhood in NEIGHBORHOOD_COORDINATES:
+        nb = NEIGHBORHOOD_COORDINATES[neighborhood]
+        centre = {"latitude": nb["latitude"], "longitude": nb["longitude"]}
+        search_radius = nb["radius"]
+        logging.debug(f"Using neighbourhood coordinates for {neighborhood} (radius {search_radius}m)")
+    else:
+        centre = CITY_COORDINATES[city]
+        search_radius = radius
+        logging.debug(f"Using city coordinates for {city} (radius {search_radius}m)")
+
+    # Map frontend type selections to Google Place types for Bar searches.
+    # Fine Dining and Casual stay broad ("restaurant") and are filtered post-fetch
+    # using price_level, since Google's fine_dining_restaurant type is inconsistent.
+    if restaurant_types and "Bar" in restaurant_types and len(restaurant_types) == 1:
+        included_types = ["bar", "cocktail_bar", "wine_bar", "pub"]
+    else:
+        included_types = ["restaurant"]
+
+    return centre, search_radius, included_types
+
+
+def nearby_searches(
+    centre: Dict, radius: int, included_types: List[str], cuisine_types: Optional[List[str]] = None,
+    max_cuisines: Optional[int] = None,
+) -> List[Tuple[Dict, int, List[str]]]:
+    """
+    The (centre, radius, included_types) searchNearby calls that make up one
+    candidate search: the whole circle; with NEARBY_TILING and a radius of at
+    least NEARBY_TILE_MIN_RADIUS, six more overlapping sub-circles around it
+    (a hexagonal cover); and, for restaurant searches, one whole-circle search
+    per session cuisine (at most max_cuisines, default NEARBY_CUISINE_QUERIES),
+    e.g. ["italian_restaurant"].
+
+    Every search is a billed call on a cold cache: a city-wide restaurant
+    search is up to 7 + NEARBY_CUISINE_QUERIES calls, a neighbourhood search
+    (radius under NEARBY_TILE_MIN_RADIUS) 1 + NEARBY_CUISINE_QUERIES.
+    """
+    searches = [(centre, radius, included_types)]
+    if NEARBY_TILING and radius >= NEARBY_TILE_MIN_RADIUS:
+        tile_radius = int(radius * NEARBY_TILE_SCALE)
+        offset_m = radius * math.sqrt(3) / 2
+        for i in range(6):
+            angle = math.radians(60 * i)
+            tile_centre = {
+                "latitude": centre["latitude"] + offset_m * math.sin(angle) / 111_320,
+                "longitude": centre["longitude"] + offset_m * math.cos(angle) / (111_320 * math.cos(math.radians(centre["latitude"]))),
+            }
+            searches.append((tile_centre, tile_radius, included_types))
+    if included_types == ["restaurant"]:
+        for cuisine in session_cuisine_types(cuisine_types, max_cuisines):
+            searches.append((centre, radius, [cuisine]))
+    return searches
+
+
+def session_cuisine_types(primary_types: Optional[List[str]], limit: Optional[int] = None) -> List[str]:
+    """Distinct cuisine place types (e.g. "thai_restaurant") among primary_types, at most limit (default NEARBY_CUISINE_QUERIES)."""
+    cuisines = []
+    for place_type in primary_types or []:
+        if place_type and place_type.endswith("_restaurant") and place_type not in cuisines:
+            cuisines.append(place_type)
+    return cuisines[:NEARBY_CUISINE_QUERIES if limit is None else limit]
+
+
+def merge_candidates(results: List[List[Dict]]) -> List[Dict]:
+    """Concatenate per-search results in order, keeping the first candidate per place_id."""
+    if len(results) == 1:
+        return results[0]
+    merged, seen = [], set()
+    for result in results:
+        for candidate in result:
+            if candidate.get("place_id") not in seen:
+                seen.add(candidate.get("place_id"))
+                merged.append(candidate)
+    return merged
+
+
+def parse_autocomplete(data: Dict) -> List[Dict]:
+    """Map a places:autocomplete response to [{name, place_id, address}]."""
+    suggestions = data.get("suggestions", [])
+    logging.debug(f"Google Autocomplete found {len(suggestions)} results")
+
+    results = []
+    for s in suggestions:
+        place_prediction = s.get("placePrediction", {})
+
+        # The New API returns 'placeId' directly, or 'place' as resource name.
+        place_id = place_prediction.get("placeId")
+        if not place_id:
+            resource_name = place_prediction.get("place", "")
+            place_id = resource_name.replace("places/", "") if resource_name.startswith("places/") else resource_name
+
+        text_obj = place_prediction.get("text", {})
+        main_text = text_obj.get("text", "")
+
+        # structuredFormat contains mainText and secondaryText (address)
+        structured = place_prediction.get("structuredFormat", {})
+        main_text_struct = structured.get("mainText", {}).get("text", main_text)
+        secondary_text = structured.get("secondaryText", {}).get("text", "")
+
+        results.append({
+            "name": main_text_struct,
+            "place_id": place_id,
+            "address": secondary_text,
+        })
+
+    return results
+
+
+def parse_place(place: Dict, fallback_id: str = "") -> Dict:
+    """
+    Map a v1 Place resource back to our internal schema.
+    v1 returns types as snake_case values in a list, e.g. ["restaurant", "food"].
+    """
+    # Extract ID without prefix, falling back to the resource name
+    raw_id = place.get("id", "")
+    if not raw_id:
+        raw_id = place.get("name", "").replace("places/", "")
+    if not raw_id: raw_id = fallback_id # Ultimate fallback
+
+    return {
+        "name": place.get("displayName", {}).get("text"),
+        "place_id": raw_id,
+        "address": place.get("formattedAddress"),
+        "phone": place.get("nationalPhoneNumber"),
+        "website": place.get("websiteUri"),
+        "categories": place.get("types", []),
+        "price_level": place.get("priceLevel"),
+        "rating": place.get("rating"),
+        "user_rating_count": place.get("userRatingCount"),
+        "editorial_summary": place.get("editorialSummary", {}).get("text"),
+        "primary_type": place.get("primaryType"),
+        "serves_dine_in": place.get("dineIn"),
+        "serves_takeout": place.get("takeout"),
+        "serves_delivery": place.get("delivery"),
+        "reservable": place.get("reservable"),
+        "latitude": place.get("location", {}).get("latitude"),
+        "longitude": place.get("location", {}).get("longitude"),
+    }
+
+
+def parse_nearby(data: Dict) -> List[Candidate]:
+    """Map a places:searchNearby response to Candidates (no phone/website in the field mask)."""
+    fetched_at = time.time()
+    return [Candidate.from_place(parse_place(place), fetched_at=fetched_at) for place in data.get("places", [])]
+
+
+def nearby_cache_key(centre: Dict, radius: int, included_types: List[str], max_results: int) -> str:
+    """Cache key for a searchNearby call: rounded centre, radius, sorted type set and page size."""
+    lat = round(centre["latitude"], NEARBY_CACHE_COORD_PRECISION)
+    lng = round(centre["longitude"], NEARBY_CACHE_COORD_PRECISION)
+    types = ",".join(sorted(set(included_types)))
+    return f"{lat:.{NEARBY_CACHE_COORD_PRECISION}f},{lng:.{NEARBY_CACHE_COORD_PRECISION}f}|r={int(radius)}|t={types}|n={max_results}"
+
+
+def nearby_flight_key(cache_key: str) -> str:
+    return f"nearby|{cache_key}"
+
+
+def details_flight_key(place_id: str) -> str:
+    return f"details|{place_id.replace('places/', '', 1)}"
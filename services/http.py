@@ -0,0 +1,242 @@
+# services/http.py
+
+import os
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeouts (seconds). requests has no default, so without these one hung
+# upstream call pins a worker forever.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+
+# Retries on connection errors and retryable statuses, with exponential backoff plus jitter
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.3))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", 0.3))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Keep-alive pool: number of hosts cached, and connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", 10))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 20))
+
+# Circuit breaker: open after this many consecutive failures, probe again after the cooldown
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("HTTP_CIRCUIT_RESET_TIMEOUT", 30))
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a host whose circuit is open. Providers already catch RequestException."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one host.
+
+    closed    → requests flow; failures are counted
+    open      → requests fail fast with CircuitOpenError until reset_timeout passes
+    half-open → one probe request is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, host: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info(f"Circuit for {self.host} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Circuit for {self.host} opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+class HttpTransport:
+    """
+    Shared HTTP client for the places providers.
+
+    One requests.Session with keep-alive pools per host, default connect/read
+    timeouts, jittered retries on 429/5xx and connection errors, and a circuit
+    breaker per host. Responses come back as plain requests.Response objects,
+    so provider code only swaps `requests.post(...)` for `transport.post(...)`.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=_build_retry(max_retries),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host)
+            return breaker
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        breaker = self.breaker_for(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {breaker.host}; skipping {method} {url}")
+
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+
+        if response.status_code in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def _build_retry(max_retries: int) -> Retry:
+    # POST is included because the Places search/autocomplete POSTs are read-only
+    options = dict(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=HTTP_BACKOFF_JITTER, **options)
+    except TypeError:
+        # urllib3 < 2.0 has no backoff_jitter
+        return Retry(**options)
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport with HttpTransport's retry policy, for the async providers.
+
+    httpx's own `retries` only covers failed connects, so this wrapper retries
+    connection errors and RETRY_STATUSES responses up to max_retries times,
+    with the same jittered exponential backoff and Retry-After handling as
+    _build_retry(). Circuit breaking stays with the caller, which sees only
+    the final response, like HttpTransport's callers.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+    ):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            retries_left = attempt < self.max_retries
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if not retries_left:
+                    raise
+                logging.debug(f"Retrying {request.method} {request.url} after {e!r}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or not retries_left:
+                return response
+            delay = _retry_after(response)
+            await response.aclose()
+            logging.debug(f"Retrying {request.method} {request.url} after HTTP {response.status_code}")
+            await asyncio.sleep(self._backoff(attempt) if delay is None else delay)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        if not self.backoff_factor:
+            return 0.0
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-After in seconds, if the response sends it as a number."""
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Process-wide shared transport, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
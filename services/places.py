@@ -1,5 +1,6 @@
 # services/places.py
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional, List
 
@@ -40,13 +41,73 @@ class PlacesService(ABC):
     def search_nearby_candidates(
         self, city: str, neighborhood: Optional[str] = None,
         restaurant_types: Optional[List] = None, radius: int = 8000,
-        max_results: int = 20
+        max_results: int = 20, cuisine_types: Optional[List[str]] = None
     ) -> List[dict]:
         """
-        Return up to max_results real restaurant candidates near city.
+        Return real restaurant candidates near city: up to max_results per
+        underlying search. Providers that split a search (tiles, one search per
+        entry of cuisine_types, the session's primary types) merge and
+        de-duplicate the results by place_id.
 
         Each dict should have the same shape as get_details() plus rich fields:
         price_level, rating, user_rating_count, editorial_summary, primary_type,
         serves_dine_in, serves_takeout, serves_delivery, reservable.
         """
-        pass
\ No newline at end of file
+        pass
+
+class AsyncPlacesService(ABC):
+    """
+    asyncio variant of PlacesService, used by the async recommendation pipeline.
+
+    Same methods and return shapes as PlacesService, but awaitable. Use as an
+    async context manager so implementations can hold a connection pool for
+    the duration of one request.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    @abstractmethod
+    async def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def get_details(self, place_id: str, session_token: Optional[str] = None) -> dict:
+        pass
+
+    @abstractmethod
+    async def search_nearby_candidates(
+        self, city: str, neighborhood: Optional[str] = None,
+        restaurant_types: Optional[List] = None, radius: int = 8000,
+        max_results: int = 20, cuisine_types: Optional[List[str]] = None
+    ) -> List[dict]:
+        pass
+
+
+class ThreadedAsyncPlacesService(AsyncPlacesService):
+    """
+    AsyncPlacesService for providers without a native async client: each call
+    runs the sync provider method on a worker thread.
+    """
+
+    def __init__(self, sync_service: PlacesService):
+        self.sync = sync_service
+
+    async def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> list[dict]:
+        return await asyncio.to_thread(self.sync.autocomplete, query, city, session_token)
+
+    async def get_details(self, place_id: str, session_token: Optional[str] = None) -> dict:
+        return await asyncio.to_thread(self.sync.get_details, place_id, session_token)
+
+    async def search_nearby_candidates(
+        self, city: str, neighborhood: Optional[str] = None,
+        restaurant_types: Optional[List] = None, radius: int = 8000,
+        max_results: int = 20, cuisine_types: Optional[List[str]] = None
+    ) -> List[dict]:
+        return await asyncio.to_thread(
+            self.sync.search_nearby_candidates, city, neighborhood, restaurant_types, radius, max_results,
+            cuisine_types=cuisine_types,
+        )
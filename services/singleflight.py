@@ -0,0 +1,156 @@
+# services/singleflight.py
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# How long a caller waits on someone else's in-flight call before giving up
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", 30))
+
+
+class SingleFlightTimeout(TimeoutError):
+    """The in-flight call this caller joined did not finish within its timeout."""
+
+
+class _Abandoned(Exception):
+    """The leader was cancelled or interrupted; its followers start over."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.abandoned = False
+        self.waiters = 0
+
+    def wait(self, key: str, timeout: float) -> Any:
+        if not self.done.wait(timeout):
+            raise SingleFlightTimeout(f"in-flight call for {key} did not finish within {timeout}s")
+        if self.abandoned:
+            raise _Abandoned(key)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls within a process.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for it and get the same result object, or the
+    same exception. A leader that is cancelled or interrupted (CancelledError,
+    KeyboardInterrupt) abandons the call instead: that is its own caller's
+    business, so its followers join or lead a fresh call. Nothing is kept once the call finishes, so this sits in
+    front of an upstream call and behind any cache of its results.
+
+    do() and do_async() share one registry, so a thread and an event loop
+    asking for the same key coalesce too. An async follower waits on a worker
+    thread, since the leader may be running on another loop.
+
+    Followers give up with SingleFlightTimeout after `timeout` seconds (per
+    call or per instance); the leader's own call is bounded by its client.
+    Results are shared, not copied: callers that mutate them must copy.
+    """
+
+    def __init__(self, name: str, timeout: float = SINGLEFLIGHT_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        while True:
+            call, leader = self._join(key)
+            if not leader:
+                try:
+                    return self._follow(key, call, timeout)
+                except _Abandoned:
+                    continue
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                raise
+            except BaseException:
+                call.abandoned = True
+                raise
+            finally:
+                self._finish(key, call)
+            return call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        while True:
+            call, leader = self._join(key)
+            if not leader:
+                try:
+                    return await asyncio.to_thread(self._follow, key, call, timeout)
+                except _Abandoned:
+                    continue
+            try:
+                call.result = await fn()
+            except Exception as e:
+                call.error = e
+                raise
+            except BaseException:
+                call.abandoned = True
+                raise
+            finally:
+                self._finish(key, call)
+            return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "timeouts": self.timeouts,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _join(self, key: str):
+        """(call, is_leader): the in-flight call for key, or a new one this caller leads."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def _follow(self, key: str, call: _Call, timeout: Optional[float]) -> Any:
+        try:
+            return call.wait(key, self.timeout if timeout is None else timeout)
+        except _Abandoned:
+            logging.debug(f"{self.name} singleflight: leader for {key} was cancelled, retrying")
+            raise
+        except SingleFlightTimeout:
+            with self._lock:
+                self.timeouts += 1
+            logging.warning(f"{self.name} singleflight: gave up waiting on {key}")
+            raise
+
+    def _finish(self, key: str, call: _Call) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        if call.waiters:
+            logging.debug(f"{self.name} singleflight: {key} served {call.waiters} waiting callers")
+        call.done.set()
@@ -4,6 +4,7 @@ import os
 import requests
 from typing import Optional
 from .places import PlacesService
+from .http import get_transport
 
 class YelpService(PlacesService):
     """
@@ -12,6 +13,7 @@ class YelpService(PlacesService):
     def __init__(self):
         self.api_key = os.getenv("YELP_API_KEY")
         self.base_url = "https://api.yelp.com/v3"
+        self.http = get_transport()
 
     def autocomplete(self, query: str, city: str, session_token: Optional[str] = None) -> list[dict]:
         if not self.api_key:
@@ -26,7 +28,7 @@ class YelpService(PlacesService):
         }
         
         try:
-            response = requests.get(f"{self.base_url}/businesses/search", headers=headers, params=params)
+            response = self.http.get(f"{self.base_url}/businesses/search", headers=headers, params=params)
             response.raise_for_status()
             businesses = response.json().get("businesses", [])
             
@@ -42,7 +44,7 @@ class YelpService(PlacesService):
             print(f"Error calling Yelp API: {e}")
             return []
 
-    def search_nearby_candidates(self, city, neighborhood=None, restaurant_types=None, radius=8000, max_results=20):
+    def search_nearby_candidates(self, city, neighborhood=None, restaurant_types=None, radius=8000, max_results=20, cuisine_types=None):
         # Yelp is now paid; returning empty list to satisfy abstract interface
         return []
 
@@ -53,7 +55,7 @@ class YelpService(PlacesService):
         headers = {"Authorization": f"Bearer {self.api_key}"}
         
         try:
-            response = requests.get(f"{self.base_url}/businesses/{place_id}", headers=headers)
+            response = self.http.get(f"{self.base_url}/businesses/{place_id}", headers=headers)
             response.raise_for_status()
             business = response.json()
 
@@ -160,18 +160,8 @@ function initDropdowns() {
 }
 
 // --- Recommendations Logic ---
-function renderRecommendations(recommendations) {
-    const container = document.getElementById('recommendations-output');
-    
-    if (!recommendations || recommendations.length === 0) {
-        container.innerHTML = `
-            <div class="empty-state">
-                <p>No recommendations found. Try adjusting your inputs.</p>
-            </div>`;
-        return;
-    }
-
-    container.innerHTML = recommendations.map(rec => `
+function recommendationCardHtml(rec) {
+    return `
         <div class="recommendation-card">
             <h3 class="restaurant-name">${rec.name}</h3>
             ${rec.address ? `<p class="restaurant-address"><i class="bi bi-geo-alt"></i> ${rec.address}</p>` : ''}
@@ -188,10 +178,24 @@ function renderRecommendations(recommendations) {
                 </button>
             </div>
         </div>
-    `).join('');
+    `;
+}
+
+function renderRecommendations(recommendations) {
+    const container = document.getElementById('recommendations-output');
+    
+    if (!recommendations || recommendations.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <p>No recommendations found. Try adjusting your inputs.</p>
+            </div>`;
+        return;
+    }
+
+    container.innerHTML = recommendations.map(recommendationCardHtml).join('');
 
     // Attach listeners to new buttons
-    attachCardListeners();
+    attachCardListeners(container);
 
     // Mobile UX: Scroll to results
     if (window.innerWidth <= 768) {
@@ -199,8 +203,65 @@ function renderRecommendations(recommendations) {
     }
 }
 
-function attachCardListeners() {
-    document.querySelectorAll('.recommendation-card .action-btn').forEach(btn => {
+// Adds one card as it arrives from the stream; listeners go on the new card only
+function appendRecommendation(rec) {
+    const container = document.getElementById('recommendations-output');
+    const isFirst = !container.querySelector('.recommendation-card');
+    if (isFirst) container.innerHTML = '';
+
+    const wrapper = document.createElement('div');
+    wrapper.innerHTML = recommendationCardHtml(rec).trim();
+    const card = wrapper.firstElementChild;
+    container.appendChild(card);
+    attachCardListeners(card);
+
+    if (isFirst && window.innerWidth <= 768) {
+        container.scrollIntoView({ behavior: 'smooth', block: 'start' });
+    }
+}
+
+// POSTs to /get_recommendations_stream and calls onEvent(event, data) for each
+// server-sent event. Errors raised before the stream starts come back as JSON.
+function streamRecommendations(payload, onEvent) {
+    return fetch('/get_recommendations_stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    })
+    .then(res => {
+        const contentType = res.headers.get('Content-Type') || '';
+        if (!contentType.startsWith('text/event-stream')) {
+            return res.json().then(data => {
+                throw new Error(data.error || 'Failed to get recommendations');
+            });
+        }
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        const pump = () => reader.read().then(({ done, value }) => {
+            if (done) return;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop(); // last chunk may be a partial event
+            events.forEach(raw => {
+                let event = 'message';
+                let data = '';
+                raw.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                onEvent(event, data ? JSON.parse(data) : null);
+            });
+            return pump();
+        });
+        return pump();
+    });
+}
+
+function attachCardListeners(root = document) {
+    root.querySelectorAll('.action-btn').forEach(btn => {
         btn.addEventListener('click', function(e) {
             e.preventDefault(); // Prevent any form submission
             
@@ -323,36 +384,55 @@ function initForm() {
         const revisitWeightSlider = document.getElementById('revisit-weight-slider');
         const revisitWeight = revisitWeightSlider ? parseInt(revisitWeightSlider.value) / 100 : 0.0;
 
-        // API Call
-        fetch('/get_recommendations', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                user: name,
-                city: city,
-                neighborhood: neighborhood,
-                place_ids: placeIds,
-                input_restaurants: inputRestaurants,
-                restaurant_types: [...new Set(types)], // dedupe
-                input_weight: inputWeight,
-                revisit_weight: revisitWeight
-            })
-        })
-        .then(res => res.json())
-        .then(data => {
-            if (data.error) throw new Error(data.error);
-            renderRecommendations(data.recommendations);
-        })
-        .catch(err => {
-            console.error(err);
-            document.getElementById('recommendations-output').innerHTML = `
-                <div class="empty-state" style="border-color: #ff4444;">
-                    <p>Error: ${err.message || 'Failed to get recommendations'}</p>
-                </div>`;
-        })
-        .finally(() => {
-            loading.style.display = 'none';
-        });
+        // API Call — streamed, so each pick renders as soon as it is ranked
+        showStreamedRecommendations({
+            user: name,
+            city: city,
+            neighborhood: neighborhood,
+            place_ids: placeIds,
+            input_restaurants: inputRestaurants,
+            restaurant_types: [...new Set(types)], // dedupe
+            input_weight: inputWeight,
+            revisit_weight: revisitWeight
+        }, loading);
+    });
+}
+
+// Each submit replaces the previous results; events from an older, still-open
+// stream are ignored once a newer submission has started
+let currentSubmission = 0;
+
+function showStreamedRecommendations(payload, loading) {
+    const submission = ++currentSubmission;
+    const isCurrent = () => submission === currentSubmission;
+    const output = document.getElementById('recommendations-output');
+    output.innerHTML = '';
+    let received = 0;
+
+    return streamRecommendations(payload, (event, data) => {
+        if (!isCurrent()) return;
+        if (event === 'recommendation') {
+            if (received === 0) loading.style.display = 'none';
+            received++;
+            appendRecommendation(data);
+        } else if (event === 'error') {
+            throw new Error(data.error);
+        }
+    })
+    .then(() => {
+        if (isCurrent() && received === 0) renderRecommendations([]);
+    })
+    .catch(err => {
+        console.error(err);
+        // Keep any cards that already arrived
+        if (!isCurrent() || received > 0) return;
+        output.innerHTML = `
+            <div class="empty-state" style="border-color: #ff4444;">
+                <p>Error: ${err.message || 'Failed to get recommendations'}</p>
+            </div>`;
+    })
+    .finally(() => {
+        if (isCurrent()) loading.style.display = 'none';
     });
 }
 
@@ -0,0 +1,203 @@
+"""
+Per-user taste aggregates.
+
+build_taste_profile() only needs sums over a user's liked restaurants: how
+many likes have each price level and primary type, how many have each boolean
+attribute set (and how many have it known), and the rating sum and count.
+Those are kept in a UserTasteAggregate row per user. /save_preferences moves
+them incrementally as likes are added, switched or removed, so a request
+blends history with the session inputs in O(#features) instead of walking
+every liked restaurant.
+
+Restaurant attributes change after a like is counted (the place store
+refreshes ratings, types and so on), so the row also keeps the values each
+liked restaurant contributed, and an unlike subtracts those rather than the
+restaurant's current ones. That map grows with the likes, so it is a deferred
+column: load_aggregate() on the recommendation path reads only the sums.
+
+Users without a row (anyone who hasn't changed a preference since the table
+was added) fall back to aggregating their liked records on the fly. Their first
+preference change, or `flask rebuild-taste-aggregates`, creates the row.
+"""
+
+import logging
+from collections import Counter, namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+
+from models import db, Restaurant, UserRestaurantPreference, PreferenceType, UserTasteAggregate
+
+BOOL_FEATURES = ("serves_dine_in", "serves_takeout", "reservable")
+LIKE = PreferenceType.like.value
+
+# The attributes a restaurant adds to an aggregate, as they were when it was counted
+Contribution = namedtuple("Contribution", ("price_level", "primary_type") + BOOL_FEATURES + ("rating",))
+
+
+def contribution(r) -> Contribution:
+    return Contribution(r.price_level, r.primary_type, *(getattr(r, name) for name in BOOL_FEATURES), r.rating)
+
+
+@dataclass
+class TasteAggregate:
+    """Feature sums over a set of restaurants; add() and remove() keep it in step with the set."""
+    like_count: int = 0
+    price_levels: Counter = field(default_factory=Counter)
+    primary_types: Counter = field(default_factory=Counter)
+    bool_true: Counter = field(default_factory=Counter)    # feature -> restaurants with it True
+    bool_known: Counter = field(default_factory=Counter)   # feature -> restaurants with it not None
+    rating_sum: float = 0.0
+    rating_count: int = 0
+    # str(restaurant id) -> list(Contribution) for each counted restaurant with an id;
+    # bookkeeping for remove(), so not part of equality
+    contributions: Dict[str, list] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def from_restaurants(cls, restaurants: Iterable) -> "TasteAggregate":
+        aggregate = cls()
+        for r in restaurants:
+            aggregate.add(r)
+        return aggregate
+
+    def add(self, r) -> None:
+        """Count a restaurant (anything with Restaurant's attribute names) in, remembering what it added."""
+        restaurant_id = getattr(r, "id", None)
+        if restaurant_id is not None:
+            self.contributions[str(restaurant_id)] = list(contribution(r))
+        self._count(r, 1)
+
+    def remove(self, r) -> None:
+        """Count a restaurant out: what it added, or its current attributes if that is not recorded."""
+        counted = self.contributions.pop(str(getattr(r, "id", None)), None)
+        self._count(Contribution(*counted) if counted is not None else r, -1)
+        self._prune()
+
+    def counts(self, r) -> bool:
+        """Whether r's contribution is recorded, so remove(r) subtracts exactly what add(r) added."""
+        return str(getattr(r, "id", None)) in self.contributions
+
+    def _count(self, r, sign: int) -> None:
+        self.like_count += sign
+        if r.price_level:
+            self.price_levels[r.price_level] += sign
+        if r.primary_type:
+            self.primary_types[r.primary_type] += sign
+        for name in BOOL_FEATURES:
+            value = getattr(r, name)
+            if value is not None:
+                self.bool_known[name] += sign
+                if value:
+                    self.bool_true[name] += sign
+        if r.rating is not None:
+            self.rating_sum += sign * r.rating
+            self.rating_count += sign
+
+    def is_consistent(self) -> bool:
+        """False if a removal took something below zero, i.e. the row drifted from the likes (e.g. edited by hand)."""
+        counters = (self.price_levels, self.primary_types, self.bool_true, self.bool_known)
+        return min(self.like_count, self.rating_count, *(min(c.values(), default=0) for c in counters)) >= 0
+
+    def _prune(self) -> None:
+        for counter in (self.price_levels, self.primary_types, self.bool_true, self.bool_known):
+            for key in [k for k, v in counter.items() if v == 0]:
+                del counter[key]
+        if self.rating_count == 0:
+            self.rating_sum = 0.0
+
+    @classmethod
+    def from_row(cls, row: UserTasteAggregate, with_contributions: bool = False) -> "TasteAggregate":
+        """The row's sums; its contributions (a deferred column, O(#likes)) only if with_contributions."""
+        bool_counts = row.bool_counts or {}
+        return cls(
+            like_count=row.like_count,
+            price_levels=Counter(row.price_level_counts or {}),
+            primary_types=Counter(row.primary_type_counts or {}),
+            bool_true=Counter({name: true for name, (true, _) in bool_counts.items()}),
+            bool_known=Counter({name: known for name, (_, known) in bool_counts.items()}),
+            rating_sum=row.rating_sum,
+            rating_count=row.rating_count,
+            contributions=dict(row.contributions or {}) if with_contributions else {},
+        )
+
+    def store(self, row: UserTasteAggregate) -> None:
+        # Fresh dicts, so the JSON columns are seen as changed
+        row.like_count = self.like_count
+        row.price_level_counts = dict(self.price_levels)
+        row.primary_type_counts = dict(self.primary_types)
+        row.bool_counts = {name: [self.bool_true[name], known] for name, known in self.bool_known.items()}
+        row.rating_sum = self.rating_sum
+        row.rating_count = self.rating_count
+        row.contributions = dict(self.contributions)
+        row.updated_at = datetime.utcnow()
+
+
+def load_aggregate(user_id: Optional[int], with_contributions: bool = False) -> Optional[TasteAggregate]:
+    """
+    The stored aggregate for a user, or None if they have no row yet. The
+    recommendation path reads only the fixed-size sums; pass
+    with_contributions=True to also load what each like contributed.
+    """
+    if user_id is None:
+        return None
+    options = [undefer(UserTasteAggregate.contributions)] if with_contributions else []
+    row = db.session.get(UserTasteAggregate, user_id, options=options)
+    return TasteAggregate.from_row(row, with_contributions) if row is not None else None
+
+
+def rebuild_aggregate(user_id: int) -> TasteAggregate:
+    """Recompute a user's aggregate from their current likes and store it (the caller commits)."""
+    liked = db.session.execute(
+        select(Restaurant).join(UserRestaurantPreference, UserRestaurantPreference.restaurant_id == Restaurant.id)
+        .where(UserRestaurantPreference.user_id == user_id, UserRestaurantPreference.preference == PreferenceType.like)
+    ).scalars()
+    aggregate = TasteAggregate.from_restaurants(liked)
+    row = db.session.get(UserTasteAggregate, user_id) or UserTasteAggregate(user_id=user_id)
+    aggregate.store(row)
+    db.session.add(row)
+    return aggregate
+
+
+def apply_preference_changes(user_id: int, changes: Dict[int, Tuple[Optional[str], str]]) -> None:
+    """
+    Move the stored aggregate by {restaurant_id: (old_preference, new_preference)}
+    in the current transaction; the caller commits. Only transitions into or
+    out of "like" touch it.
+    """
+    added = [rid for rid, (old, new) in changes.items() if old != LIKE and new == LIKE]
+    removed = [rid for rid, (old, new) in changes.items() if old == LIKE and new != LIKE]
+    if not added and not removed:
+        return
+
+    row = db.session.get(
+        UserTasteAggregate, user_id, with_for_update=True, options=[undefer(UserTasteAggregate.contributions)]
+    )
+    if row is None:
+        # First change since the table was added: the pending preference rows are
+        # flushed by the rebuild's query, so it already reflects this change
+        rebuild_aggregate(user_id)
+        return
+
+    restaurants = {
+        r.id: r for r in db.session.execute(select(Restaurant).where(Restaurant.id.in_(added + removed))).scalars()
+    }
+    aggregate = TasteAggregate.from_row(row, with_contributions=True)
+    if not all(aggregate.counts(restaurants[rid]) for rid in removed if rid in restaurants):
+        # Counted before contributions were recorded: rebuild once instead of guessing
+        rebuild_aggregate(user_id)
+        return
+    for rid in added:
+        if rid in restaurants:
+            aggregate.add(restaurants[rid])
+    for rid in removed:
+        if rid in restaurants:
+            aggregate.remove(restaurants[rid])
+
+    if not aggregate.is_consistent():
+        logging.warning(f"Taste aggregate for user {user_id} drifted, rebuilding")
+        rebuild_aggregate(user_id)
+        return
+    aggregate.store(row)
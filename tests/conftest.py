@@ -18,10 +18,20 @@ os.environ.setdefault("DEV_DATABASE_URL", "sqlite:///:memory:")
 os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
 os.environ.setdefault("OPENAI_API_KEY", "test-key")
 os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+# History rows are written inline so tests can assert on them right after a request
+os.environ.setdefault("REQUEST_LOG_WRITE_BEHIND", "0")
+# No shared pre-warmed candidate pools: searches go through the (patched) providers
+os.environ.setdefault("CANDIDATE_POOL_PATH", "")
+# One searchNearby call per search; tiling is covered by tests/unit/test_nearby_tiles.py
+os.environ.setdefault("NEARBY_TILING", "0")
+# Pre-warming searches each area once; cuisine warming is covered by tests/integration/test_prewarm.py
+os.environ.setdefault("PREWARM_CUISINES", "")
 
 import app as flask_app_module
+import leaderboard
 from models import db as _db, User, Restaurant, UserRequest, RequestRestaurant, RequestType, UserRestaurantPreference, PreferenceType
 from datetime import datetime
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 
 
@@ -160,6 +170,11 @@ def clean_db(app):
     for table in reversed(_db.metadata.sorted_tables):
         _db.session.execute(table.delete())
     _db.session.commit()
+    # Bulk deletes leave the old objects in the identity map; SQLite reuses
+    # their primary keys, so drop them before the next test inserts new rows.
+    _db.session.expunge_all()
+    # Same for in-process snapshots of table contents
+    leaderboard.invalidate()
 
 
 # ---------------------------------------------------------------------------
@@ -230,3 +245,15 @@ def seed_prev_recommendation(user: User, restaurant: Restaurant, city="Chicago")
     _db.session.add(rr)
     _db.session.flush()
     return rr
+
+
+def count_statements(fn):
+    """Run fn() and return (result, [SQL statements it executed])."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(_db.engine, "before_cursor_execute", listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(_db.engine, "before_cursor_execute", listener)
+    return result, statements
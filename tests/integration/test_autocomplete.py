@@ -0,0 +1,99 @@
+"""
+Integration tests for GET /autocomplete — local prefix index first, provider second.
+"""
+
+import time
+from unittest.mock import patch
+
+import app as flask_app_module
+import place_store
+from models import db
+from restaurant_index import RestaurantPrefixIndex
+from tests.conftest import seed_restaurant
+
+AUTOCOMPLETE_TARGET = "services.places_service.autocomplete"
+
+
+def _get(client, query, city="Chicago"):
+    return client.get("/autocomplete", query_string={"query": query, "city": city, "session_token": "tok"})
+
+
+def _reset_index():
+    flask_app_module.restaurant_prefix_index.invalidate()
+
+
+class TestAutocompleteTiers:
+    def test_enough_local_matches_skip_provider(self, client, app):
+        for i in range(5):
+            seed_restaurant(f"Smoke Shack {i}", f"pid_smoke_{i}")
+        db.session.commit()
+        _reset_index()
+
+        with patch(AUTOCOMPLETE_TARGET) as mock_autocomplete:
+            resp = _get(client, "smoke")
+
+        assert resp.status_code == 200
+        assert len(resp.get_json()) == 5
+        mock_autocomplete.assert_not_called()
+
+    def test_local_matches_merged_ahead_of_provider(self, client, app):
+        seed_restaurant("Au Cheval", "pid_au_cheval")
+        db.session.commit()
+        _reset_index()
+
+        remote = [
+            {"name": "Au Cheval", "place_id": "pid_au_cheval", "address": "Chicago"},
+            {"name": "Aurora Cafe", "place_id": "pid_aurora", "address": "Chicago"},
+        ]
+        with patch(AUTOCOMPLETE_TARGET, return_value=remote):
+            resp = _get(client, "au")
+
+        names = [r["name"] for r in resp.get_json()]
+        assert names == ["Au Cheval", "Aurora Cafe"]
+
+    def test_local_results_served_when_provider_fails(self, client, app):
+        seed_restaurant("Kasama", "pid_kasama")
+        db.session.commit()
+        _reset_index()
+
+        with patch(AUTOCOMPLETE_TARGET, return_value=None):
+            resp = _get(client, "kas")
+
+        assert resp.status_code == 200
+        assert resp.get_json()[0]["place_id"] == "pid_kasama"
+
+    def test_provider_failure_without_local_results_is_500(self, client, app):
+        _reset_index()
+        with patch(AUTOCOMPLETE_TARGET, return_value=None):
+            resp = _get(client, "zzz")
+        assert resp.status_code == 500
+
+    def test_other_city_rows_not_matched(self, client, app):
+        seed_restaurant("Katz's Deli", "pid_katz", city="New York")
+        db.session.commit()
+        _reset_index()
+
+        with patch(AUTOCOMPLETE_TARGET, return_value=[]):
+            resp = _get(client, "katz", city="Chicago")
+        assert resp.get_json() == []
+
+
+class TestPrefixIndexRebuild:
+    def test_expired_index_is_served_while_rebuilt_in_background(self, app):
+        seed_restaurant("Girl & the Goat", "pid_goat")
+        db.session.commit()
+        index = RestaurantPrefixIndex(ttl=60)
+        provider = place_store.default_provider()
+        assert [r["place_id"] for r in index.search("goat", "Chicago", provider)] == ["pid_goat"]
+
+        seed_restaurant("Goat Cafe", "pid_goat_cafe")
+        db.session.commit()
+        built_at, tokens, entries = index._indexes[("Chicago", provider)]
+        index._indexes[("Chicago", provider)] = (built_at - 61, tokens, entries)
+
+        # The expired index answers immediately; the rebuild happens off the request
+        assert [r["place_id"] for r in index.search("goat", "Chicago", provider)] == ["pid_goat"]
+        deadline = time.monotonic() + 5
+        while index._rebuilding and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert {r["place_id"] for r in index.search("goat", "Chicago", provider)} == {"pid_goat", "pid_goat_cafe"}
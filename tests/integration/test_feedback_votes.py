@@ -0,0 +1,143 @@
+"""
+Integration tests for the feedback board: POST /vote_feedback and
+votes.cast_vote (vote transitions, in-database score update) and
+GET /get_feedback (cached leaderboard, ETag/304).
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import leaderboard
+import votes
+from models import db, FeedbackSuggestion, FeedbackVote
+from tests.conftest import count_statements, seed_user
+
+
+@pytest.fixture()
+def suggestion(app):
+    author = seed_user("author")
+    db.session.flush()
+    s = FeedbackSuggestion(user_id=author.id, content="Dark mode", score=0)
+    db.session.add(s)
+    db.session.commit()
+    return s
+
+
+def _vote(client, user, suggestion_id, vote_type):
+    return client.post("/vote_feedback", json={"user_name": user, "suggestion_id": suggestion_id, "vote_type": vote_type})
+
+
+class TestVoteFeedback:
+    def test_vote_toggle_and_switch(self, client, suggestion):
+        seed_user("voter")
+        db.session.commit()
+
+        assert _vote(client, "voter", suggestion.id, 1).get_json()["new_score"] == 1
+        assert _vote(client, "voter", suggestion.id, -1).get_json()["new_score"] == -1
+        assert _vote(client, "voter", suggestion.id, -1).get_json()["new_score"] == 0
+        assert FeedbackVote.query.count() == 0
+
+    def test_score_accumulates_across_voters(self, client, suggestion):
+        for i in range(3):
+            seed_user(f"voter{i}")
+        db.session.commit()
+
+        scores = [_vote(client, f"voter{i}", suggestion.id, 1).get_json()["new_score"] for i in range(3)]
+
+        assert scores == [1, 2, 3]
+        assert db.session.get(FeedbackSuggestion, suggestion.id).score == 3
+
+    def test_invalid_vote_type_is_400(self, client, suggestion):
+        seed_user("voter")
+        db.session.commit()
+        assert _vote(client, "voter", suggestion.id, 5).status_code == 400
+
+    def test_unknown_suggestion_is_404(self, client, suggestion):
+        seed_user("voter")
+        db.session.commit()
+        assert _vote(client, "voter", suggestion.id + 100, 1).status_code == 404
+
+
+class TestCastVote:
+    def test_lost_insert_race_is_retried(self, app, suggestion):
+        voter = seed_user("racer")
+        db.session.commit()
+        real_insert = votes._insert_vote
+
+        def racing_insert(user_id, suggestion_id, vote_type):
+            # The same user's parallel request stores the opposite vote first
+            real_insert(user_id, suggestion_id, -vote_type)
+            return False
+
+        with patch("votes._insert_vote", side_effect=racing_insert) as insert:
+            delta, new_score = votes.cast_vote(voter.id, suggestion.id, 1)
+
+        # The retry finds the racer's -1 and switches it; the racer's request applies its own -1
+        assert insert.call_count == 1
+        assert (delta, new_score) == (2, 2)
+        assert FeedbackVote.query.one().vote_type == 1
+
+    def test_rejects_unknown_vote_type(self, app, suggestion):
+        with pytest.raises(ValueError):
+            votes.cast_vote(1, suggestion.id, 0)
+
+
+class TestGetFeedback:
+    def _submit(self, client, content):
+        return client.post("/submit_feedback", json={"user_name": "author", "content": content}).get_json()["id"]
+
+    def test_board_is_ordered_with_callers_votes(self, client, suggestion):
+        seed_user("voter")
+        db.session.commit()
+        other = self._submit(client, "Offline mode")
+        _vote(client, "voter", other, 1)
+
+        body = client.get("/get_feedback?user_name=voter").get_json()
+
+        assert [(s["id"], s["score"], s["user_vote"]) for s in body["suggestions"]] == [
+            (other, 1, 1), (suggestion.id, 0, 0),
+        ]
+
+    def test_snapshot_is_cached_until_a_write(self, client, suggestion):
+        client.get("/get_feedback")
+        _, statements = count_statements(lambda: client.get("/get_feedback"))
+        assert statements == []
+
+        self._submit(client, "Offline mode")
+        assert len(client.get("/get_feedback").get_json()["suggestions"]) == 2
+
+    def test_vote_lookup_is_limited_to_shown_ids(self, client, suggestion, monkeypatch):
+        monkeypatch.setattr(leaderboard, "LEADERBOARD_SIZE", 1)
+        seed_user("voter")
+        db.session.commit()
+        hidden = self._submit(client, "Hidden idea")
+        _vote(client, "voter", hidden, -1)
+
+        body, statements = count_statements(lambda: client.get("/get_feedback?user_name=voter").get_json())
+
+        assert [s["id"] for s in body["suggestions"]] == [suggestion.id]
+        assert any("feedback_vote.suggestion_id IN" in sql for sql in statements)
+
+    def test_unchanged_board_is_304(self, client, suggestion):
+        first = client.get("/get_feedback")
+        etag = first.headers["ETag"]
+
+        assert client.get("/get_feedback", headers={"If-None-Match": etag}).status_code == 304
+
+        self._submit(client, "Offline mode")
+        changed = client.get("/get_feedback", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    def test_etag_covers_callers_votes(self, client, suggestion):
+        seed_user("voter")
+        db.session.commit()
+        anonymous = client.get("/get_feedback").headers["ETag"]
+        _vote(client, "voter", suggestion.id, 1)
+        _vote(client, "voter", suggestion.id, 1)  # toggled off again: same board, same score
+
+        assert client.get("/get_feedback?user_name=voter").headers["ETag"] == anonymous
+        _vote(client, "voter", suggestion.id, 1)
+        assert client.get("/get_feedback?user_name=voter").headers["ETag"] != anonymous
@@ -0,0 +1,68 @@
+"""
+Integration tests for GET /get_restaurants — keyset pages, filters, projection
+and the NDJSON export.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+import json
+
+from models import db
+from tests.conftest import seed_restaurant
+
+
+def _seed(n, city="Chicago", primary_type="restaurant", prefix="R"):
+    rows = [seed_restaurant(f"{prefix}{i}", f"pid_{prefix}{i}", city=city, primary_type=primary_type) for i in range(n)]
+    db.session.commit()
+    return rows
+
+
+class TestPages:
+    def test_default_page_is_id_and_name(self, client, app):
+        rows = _seed(3)
+        body = client.get("/get_restaurants").get_json()
+        assert body == {
+            "restaurants": [{"id": r.id, "name": r.name} for r in rows],
+            "next_cursor": None,
+        }
+
+    def test_cursor_walks_every_row_once(self, client, app):
+        rows = _seed(5)
+        seen, cursor = [], 0
+        while cursor is not None:
+            body = client.get(f"/get_restaurants?limit=2&cursor={cursor}").get_json()
+            assert len(body["restaurants"]) <= 2
+            seen += [r["id"] for r in body["restaurants"]]
+            cursor = body["next_cursor"]
+        assert seen == [r.id for r in rows]
+
+    def test_filters_and_projection(self, client, app):
+        _seed(2, city="Chicago", primary_type="pizza_restaurant", prefix="Pizza")
+        _seed(2, city="New York", primary_type="pizza_restaurant", prefix="NYPizza")
+        _seed(2, city="Chicago", primary_type="bar", prefix="Bar")
+
+        body = client.get("/get_restaurants?city=Chicago&primary_type=pizza_restaurant&fields=name,rating").get_json()
+
+        assert [r["name"] for r in body["restaurants"]] == ["Pizza0", "Pizza1"]
+        assert set(body["restaurants"][0]) == {"id", "name", "rating"}
+
+    def test_bad_arguments_are_400(self, client, app):
+        assert client.get("/get_restaurants?fields=password").status_code == 400
+        assert client.get("/get_restaurants?cursor=abc").status_code == 400
+        assert client.get("/get_restaurants?limit=0").status_code == 400
+        assert client.get("/get_restaurants?limit=100000").status_code == 400
+
+
+class TestNdjson:
+    def test_streams_every_matching_row(self, client, app):
+        rows = _seed(4)
+        resp = client.get("/get_restaurants?format=ndjson&fields=name,city_hint&cursor=" + str(rows[0].id))
+
+        assert resp.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+        assert lines == [{"id": r.id, "name": r.name, "city_hint": "Chicago"} for r in rows[1:]]
+
+    def test_limit_applies_when_given(self, client, app):
+        _seed(3)
+        resp = client.get("/get_restaurants?format=ndjson&limit=2")
+        assert len(resp.get_data(as_text=True).splitlines()) == 2
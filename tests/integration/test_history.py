@@ -0,0 +1,121 @@
+"""
+Integration tests for history.load_snapshot and the /get_user_preferences route it backs.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+import dataclasses
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+import app as flask_app_module
+
+from history import RestaurantRecord, load_snapshot, snapshot_query
+from models import db, PreferenceType, RequestRestaurant, RequestType, User, UserRequest
+from request_log import RequestLogEvent, write_events
+from tests.conftest import count_statements, seed_user, seed_restaurant, seed_preference, seed_prev_recommendation
+
+
+class TestLoadSnapshot:
+    def test_splits_likes_dislikes_and_recommendations(self, app):
+        user = seed_user()
+        liked = seed_restaurant("Liked", "pid_liked")
+        disliked = seed_restaurant("Disliked", "pid_disliked")
+        chicago = seed_restaurant("Chicago Rec", "pid_chi")
+        ny = seed_restaurant("NY Rec", "pid_ny", city="New York")
+        seed_preference(user, liked, PreferenceType.like)
+        seed_preference(user, disliked, PreferenceType.dislike)
+        seed_prev_recommendation(user, chicago, city="Chicago")
+        seed_prev_recommendation(user, chicago, city="Chicago")
+        seed_prev_recommendation(user, ny, city="New York")
+
+        snapshot, statements = count_statements(lambda: load_snapshot(user.id))
+
+        assert len(statements) == 1
+        assert [r.place_id for r in snapshot.liked] == ["pid_liked"]
+        assert [r.place_id for r in snapshot.disliked] == ["pid_disliked"]
+        assert [r.place_id for r in snapshot.recommended_in("Chicago")] == ["pid_chi"]
+        assert {r.place_id for r in snapshot.recommended_in()} == {"pid_chi", "pid_ny"}
+        assert snapshot.preference_map() == {liked.id: "like", disliked.id: "dislike"}
+
+    def test_records_are_immutable_copies(self, app):
+        user = seed_user()
+        restaurant = seed_restaurant("Liked", "pid_liked", rating=4.4)
+        seed_preference(user, restaurant, PreferenceType.like)
+
+        record = load_snapshot(user.id).liked[0]
+        assert record == RestaurantRecord.from_restaurant(restaurant)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            record.rating = 1.0
+
+    def test_unknown_user_is_empty_without_query(self, app):
+        snapshot, statements = count_statements(lambda: load_snapshot(None))
+        assert statements == []
+        assert snapshot.liked == () and snapshot.recommended_in() == ()
+
+
+    def test_query_plan_uses_history_indexes(self, app):
+        sql = str(snapshot_query(1).compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+        assert "ix_user_restaurant_preference_user_preference" in plan
+        assert "ix_user_request_user_city" in plan
+        assert "ix_request_restaurant_request_type_restaurant" in plan
+
+
+class TestGetUserPreferences:
+    def test_lists_rated_and_recommended(self, client, app):
+        user = seed_user("prefuser")
+        liked = seed_restaurant("Alpha", "pid_a")
+        seed_preference(user, liked, PreferenceType.like)
+        seed_prev_recommendation(user, seed_restaurant("Beta", "pid_b"))
+        seed_prev_recommendation(user, liked)
+        db.session.commit()
+
+        resp = client.get("/get_user_preferences?name=prefuser")
+
+        assert resp.status_code == 200
+        assert [(r["name"], r["preference"]) for r in resp.get_json()["restaurants"]] == [
+            ("Alpha", "like"), ("Beta", "neutral"),
+        ]
+
+    def test_unknown_user_is_404(self, client, app):
+        assert client.get("/get_user_preferences?name=nobody").status_code == 404
+
+
+class TestRequestLog:
+    def test_write_events_inserts_requests_and_links(self, app):
+        user = seed_user("logger")
+        a, b, c = (seed_restaurant(n, f"pid_{n}") for n in ("A", "B", "C"))
+        db.session.commit()
+
+        events = [
+            RequestLogEvent(user_id=user.id, city="Chicago", input_ids=[a.id], recommendation_ids=[b.id, c.id]),
+            RequestLogEvent(user_id=user.id, city="New York", recommendation_ids=[a.id]),
+        ]
+        _, statements = count_statements(lambda: write_events(events))
+        db.session.commit()
+
+        # UserRequest ids come back in event order (one statement per row on SQLite); links are one executemany
+        assert sum("INSERT INTO request_restaurant" in sql for sql in statements) == 1
+        assert [r.place_id for r in load_snapshot(user.id).recommended_in("Chicago")] == ["pid_B", "pid_C"]
+        assert [r.place_id for r in load_snapshot(user.id).recommended_in("New York")] == ["pid_A"]
+        assert RequestRestaurant.query.filter_by(type=RequestType.input).one().restaurant_id == a.id
+
+    def test_event_round_trips_through_json(self):
+        event = RequestLogEvent(user_id=1, city="Chicago", input_ids=[1], recommendation_ids=[2, 3])
+        assert RequestLogEvent.from_json(event.to_json()) == event
+
+    def test_queued_event_is_not_written_inline(self, client, app):
+        seed_user("queued")
+        db.session.commit()
+        event = RequestLogEvent(user_id=User.query.filter_by(name="queued").one().id, city="Chicago")
+
+        with patch.object(flask_app_module.request_log, "submit", return_value=True) as submit:
+            flask_app_module._record_request(event)
+
+        submit.assert_called_once_with(event)
+        assert UserRequest.query.count() == 0
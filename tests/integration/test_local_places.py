@@ -0,0 +1,151 @@
+"""
+Integration tests for local_places.py: nearby searches served from stored
+Restaurant rows through the geohash index, with the provider as fallback.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import app as app_module
+import geo
+import local_places
+import place_store
+from models import db, Restaurant
+from services.google_service import parse_place
+from services.candidate import Candidate
+from tests.conftest import make_candidate, rank_candidates_echo
+
+WEST_LOOP = (41.8827, -87.6480)  # radius 2000m
+
+
+def _store(n, prefix="local", offset=(0.0, 0.0), categories=("restaurant", "food")):
+    places = []
+    for i in range(n):
+        place = make_candidate(f"{prefix} {i}", f"pid_{prefix}_{i}")
+        place.update(
+            categories=list(categories),
+            user_rating_count=100 + i,
+            latitude=WEST_LOOP[0] + offset[0] + i * 0.0001,
+            longitude=WEST_LOOP[1] + offset[1],
+        )
+        places.append(place)
+    place_store.upsert_places(places, "Chicago")
+    db.session.commit()
+    return places
+
+
+def _service(min_candidates=3):
+    fallback = MagicMock()
+    fallback.search_nearby_candidates.return_value = [make_candidate("Google", "pid_google")]
+    return local_places.LocalPlacesService(fallback, min_candidates=min_candidates), fallback
+
+
+def test_rows_store_coordinates_and_geohash(app):
+    _store(1)
+    row = Restaurant.query.filter_by(place_id="pid_local_0").one()
+    assert (row.latitude, row.longitude) == WEST_LOOP
+    assert row.geohash == geo.encode(*WEST_LOOP)
+
+
+def test_parse_place_reads_location():
+    place = parse_place({"id": "p", "location": {"latitude": 1.5, "longitude": -2.5}})
+    assert (place["latitude"], place["longitude"]) == (1.5, -2.5)
+
+
+def test_covered_area_is_served_locally(app):
+    _store(4)
+    service, fallback = _service()
+    results = service.search_nearby_candidates("Chicago", "West Loop")
+    fallback.search_nearby_candidates.assert_not_called()
+    # Most-reviewed first, as Candidates
+    assert [r.place_id for r in results] == [f"pid_local_{i}" for i in (3, 2, 1, 0)]
+    assert results[0].categories == ("restaurant", "food")
+
+
+def test_thin_coverage_falls_back_to_provider(app):
+    _store(2)
+    service, fallback = _service()
+    assert service.search_nearby_candidates("Chicago", "West Loop")[0]["place_id"] == "pid_google"
+    fallback.search_nearby_candidates.assert_called_once_with("Chicago", "West Loop", None, 8000, 20, cuisine_types=None)
+
+
+def test_rows_outside_the_circle_or_type_set_do_not_count(app):
+    _store(2)
+    _store(2, prefix="far", offset=(0.03, 0.0))            # ~3.3km north, outside 2000m
+    _store(2, prefix="bar", categories=("bar", "pub"))     # not in the "restaurant" type set
+    assert local_places.search_local("Chicago", "West Loop", min_candidates=3) is None
+
+    bars = local_places.search_local("Chicago", "West Loop", ["Bar"], min_candidates=2)
+    assert {r["place_id"] for r in bars} == {"pid_bar_0", "pid_bar_1"}
+
+
+def test_session_cuisines_need_their_own_coverage(app):
+    _store(6)
+    _store(2, prefix="thai", categories=("thai_restaurant", "restaurant"))
+    assert local_places.search_local("Chicago", "West Loop", min_candidates=3, max_results=4) is not None
+    # Two Thai rows are too few to stand in for the provider's Thai search
+    assert local_places.search_local(
+        "Chicago", "West Loop", min_candidates=3, max_results=4, cuisine_types=["thai_restaurant"]
+    ) is None
+
+    _store(3, prefix="more_thai", categories=("thai_restaurant", "restaurant"))
+    results = local_places.search_local(
+        "Chicago", "West Loop", min_candidates=3, max_results=4, cuisine_types=["thai_restaurant"]
+    )
+    # The top 4 rows overall, then the top 4 Thai rows not already served
+    ids = [r.place_id for r in results]
+    assert len(ids) == len(set(ids)) == 8
+    thai = {r.place_id for r in results if "thai_restaurant" in r.categories}
+    assert len(thai) >= 4
+
+
+def test_stale_rows_are_not_served(app):
+    _store(3)
+    Restaurant.query.update({"last_enriched_at": datetime.utcnow() - local_places.LOCAL_MAX_AGE - timedelta(days=1)})
+    db.session.commit()
+    assert local_places.search_local("Chicago", "West Loop", min_candidates=3) is None
+
+
+def test_async_route_pool_comes_from_local_index(app):
+    _store(local_places.LOCAL_MIN_CANDIDATES)
+    pool = app_module._search_local("Chicago", "West Loop", None)
+    assert len(pool) == local_places.LOCAL_MIN_CANDIDATES
+    assert app_module._search_local("Chicago", "Wicker Park", None) is None
+
+
+def test_locally_served_pool_is_not_restamped(app, client):
+    _store(local_places.LOCAL_MIN_CANDIDATES)
+    enriched = datetime.utcnow() - timedelta(days=25)
+    Restaurant.query.update({"last_enriched_at": enriched})
+    db.session.commit()
+
+    with patch("services.places_service.search_nearby_candidates") as search, \
+         patch("app.rank_candidates", side_effect=rank_candidates_echo):
+        resp = client.post("/get_recommendations", data=json.dumps({
+            "user": "testuser", "city": "Chicago", "neighborhood": "West Loop", "place_ids": [],
+        }), content_type="application/json")
+
+    assert resp.status_code == 200
+    search.assert_not_called()
+    db.session.expire_all()
+    assert {r.last_enriched_at for r in Restaurant.query.all()} == {enriched}
+
+
+def test_upsert_stamps_the_provider_fetch_time(app):
+    fetched = datetime.utcnow() - timedelta(hours=30)
+    place = Candidate.from_place(make_candidate("Cached", "pid_cached"), fetched_at=(fetched - datetime(1970, 1, 1)).total_seconds())
+    place_store.upsert_places([place], "Chicago")
+    db.session.commit()
+    row = Restaurant.query.filter_by(place_id="pid_cached").one()
+    assert abs(row.last_enriched_at - fetched) < timedelta(seconds=1)
+
+    # The same cached data seen again later does not refresh the row
+    Restaurant.query.update({"last_enriched_at": fetched + timedelta(hours=1)})
+    db.session.commit()
+    place_store.upsert_places([place], "Chicago")
+    db.session.commit()
+    db.session.expire_all()
+    assert Restaurant.query.filter_by(place_id="pid_cached").one().last_enriched_at == fetched + timedelta(hours=1)
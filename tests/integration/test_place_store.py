@@ -0,0 +1,218 @@
+"""
+Integration tests for place_store — the Restaurant-backed read-through details store.
+
+Uses the same in-memory SQLite fixtures as the recommendation scenarios; only
+places_service.get_details is mocked.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import place_store
+from models import db, Restaurant
+from tests.conftest import count_statements, seed_restaurant, make_candidate, make_details
+
+DETAILS_TARGET = "services.places_service.get_details"
+
+
+class TestUpsertPlaces:
+    def test_inserts_every_new_place(self, app):
+        places = [make_candidate(f"Nearby {i}", f"pid_nearby_{i}") for i in range(3)]
+        written = place_store.upsert_places(places, "Chicago", provider="google")
+        db.session.commit()
+
+        assert set(written) == {"pid_nearby_0", "pid_nearby_1", "pid_nearby_2"}
+        row = Restaurant.query.filter_by(place_id="pid_nearby_0").one()
+        assert row.last_enriched_at is not None
+        assert row.city_hint == "Chicago"
+        assert row.rating == 4.2
+
+    def test_recently_enriched_rows_not_rewritten(self, app):
+        seed_restaurant("Known", "pid_known", rating=4.5)
+        db.session.commit()
+
+        place_store.upsert_places([make_candidate("Known", "pid_known", rating=3.0)], "Chicago", provider="google")
+        db.session.commit()
+        assert Restaurant.query.filter_by(place_id="pid_known").one().rating == 4.5
+
+    def test_stale_rows_refreshed(self, app):
+        row = seed_restaurant("Old", "pid_old", rating=4.5)
+        row.last_enriched_at = datetime.utcnow() - timedelta(days=10)
+        db.session.commit()
+
+        place_store.upsert_places([make_candidate("Old", "pid_old", rating=3.9)], "Chicago", provider="google")
+        db.session.commit()
+        assert Restaurant.query.filter_by(place_id="pid_old").one().rating == 3.9
+
+    def test_slug_collisions_resolved_in_batch(self, app):
+        seed_restaurant("Same Name", "pid_existing")
+        db.session.commit()
+
+        places = [make_candidate("Same Name", "pid_a"), make_candidate("Same Name", "pid_b")]
+        place_store.upsert_places(places, "Chicago", provider="google")
+        db.session.commit()
+
+        slugs = [r.slug for r in Restaurant.query.filter(Restaurant.name == "Same Name").all()]
+        assert len(slugs) == 3
+        assert len(set(slugs)) == 3
+
+
+def _rec(name, place_id, **overrides):
+    rec = {"place_id": place_id, "name": name, "address": f"{name} St", "rating": 4.4, "price_level": "PRICE_LEVEL_MODERATE"}
+    rec.update(overrides)
+    return rec
+
+
+class TestEnsurePlaces:
+    def test_known_rows_reused_and_new_rows_inserted(self, app):
+        known = seed_restaurant("Known", "pid_known", rating=4.9)
+        db.session.commit()
+
+        rows = place_store.ensure_places([_rec("Known", "pid_known", rating=1.0), _rec("Fresh", "pid_fresh")], "Chicago")
+        db.session.commit()
+
+        assert rows["pid_known"].id == known.id
+        assert Restaurant.query.filter_by(place_id="pid_known").one().rating == 4.9
+        fresh = Restaurant.query.filter_by(place_id="pid_fresh").one()
+        assert (rows["pid_fresh"].id, fresh.location, fresh.rating, fresh.city_hint) == (fresh.id, "Fresh St", 4.4, "Chicago")
+
+    def test_round_trips_do_not_grow_with_batch(self, app):
+        seed_restaurant("Dup", "pid_dup_existing")
+        db.session.commit()
+
+        def run(n, prefix):
+            recs = [_rec("Dup" if i == 0 else f"{prefix} {i}", f"pid_{prefix}_{i}") for i in range(n)]
+            return count_statements(lambda: place_store.ensure_places(recs, "Chicago"))
+
+        small, small_statements = run(2, "small")
+        large, large_statements = run(20, "large")
+
+        assert len(small) == 2 and len(large) == 20
+        assert len(small_statements) == len(large_statements) == 3
+
+    def test_concurrently_inserted_place_is_picked_up(self, app):
+        real_select = place_store._select_rows
+        calls = []
+
+        def racing_select(provider, place_ids):
+            calls.append(place_ids)
+            if len(calls) == 1:
+                # Another request stores the place between our SELECT and INSERT
+                seed_restaurant("Racer", "pid_race")
+                db.session.flush()
+                return {}
+            return real_select(provider, place_ids)
+
+        with patch("place_store._select_rows", side_effect=racing_select):
+            rows = place_store.ensure_places([_rec("Racer", "pid_race")], "Chicago")
+
+        assert calls == [["pid_race"], ["pid_race"]]
+        assert rows["pid_race"].id == Restaurant.query.filter_by(place_id="pid_race").one().id
+
+
+class TestGetRestaurant:
+    def test_fresh_row_served_without_provider_call(self, app):
+        seed_restaurant("Fresh", "pid_fresh")
+        db.session.commit()
+
+        with patch(DETAILS_TARGET) as mock_details:
+            row = place_store.get_restaurant("pid_fresh", "Chicago", provider="google")
+
+        assert row.name == "Fresh"
+        mock_details.assert_not_called()
+
+    def test_stale_field_triggers_refresh(self, app):
+        row = seed_restaurant("Stale", "pid_stale", rating=4.0)
+        row.last_enriched_at = datetime.utcnow() - timedelta(days=45)
+        db.session.commit()
+
+        with patch(DETAILS_TARGET, return_value=make_details("Stale", "pid_stale", rating=4.7)) as mock_details:
+            refreshed = place_store.get_restaurant("pid_stale", "Chicago", provider="google")
+
+        mock_details.assert_called_once_with("pid_stale")
+        assert refreshed.rating == 4.7
+
+    def test_narrower_field_set_extends_freshness(self, app):
+        row = seed_restaurant("Named", "pid_named")
+        row.last_enriched_at = datetime.utcnow() - timedelta(days=45)
+        db.session.commit()
+
+        with patch(DETAILS_TARGET) as mock_details:
+            place_store.get_restaurant("pid_named", "Chicago", provider="google", fields=("name", "address"))
+        mock_details.assert_not_called()
+
+    def test_stale_row_returned_when_provider_fails(self, app):
+        row = seed_restaurant("Fallback", "pid_fallback")
+        row.last_enriched_at = None
+        db.session.commit()
+
+        with patch(DETAILS_TARGET, return_value=None):
+            result = place_store.get_restaurant("pid_fallback", "Chicago", provider="google")
+        assert result.name == "Fallback"
+
+    def test_unknown_place_inserted(self, app):
+        with patch(DETAILS_TARGET, return_value=make_details("Brand New", "pid_brand_new")):
+            details = place_store.get_details("pid_brand_new", "Chicago")
+        db.session.commit()
+
+        assert details["name"] == "Brand New"
+        assert Restaurant.query.filter_by(place_id="pid_brand_new").count() == 1
+
+
+class TestResolveMany:
+    def test_known_and_new_resolved_in_input_order(self, app):
+        seed_restaurant("Known", "pid_known")
+        db.session.commit()
+
+        with patch(DETAILS_TARGET, return_value=make_details("New", "pid_new")) as mock_details:
+            rows = place_store.resolve_many(["pid_new", "pid_known", "pid_new"], "Chicago", provider="google")
+
+        assert [r.place_id for r in rows] == ["pid_new", "pid_known"]
+        mock_details.assert_called_once_with("pid_new")
+
+    def test_misses_fetched_concurrently(self, app):
+        in_flight = []
+        peak = [0]
+        lock = threading.Lock()
+
+        def slow_details(place_id):
+            with lock:
+                in_flight.append(place_id)
+                peak[0] = max(peak[0], len(in_flight))
+            time.sleep(0.1)
+            with lock:
+                in_flight.remove(place_id)
+            return make_details(f"Place {place_id}", place_id)
+
+        with patch(DETAILS_TARGET, side_effect=slow_details):
+            started = time.monotonic()
+            rows = place_store.resolve_many([f"pid_{i}" for i in range(5)], "Chicago", provider="google")
+            elapsed = time.monotonic() - started
+
+        assert len(rows) == 5
+        assert peak[0] > 1
+        assert elapsed < 0.4
+
+    def test_lookups_past_deadline_are_skipped(self, app):
+        def details(place_id):
+            if place_id == "pid_slow":
+                time.sleep(0.5)
+            return make_details(f"Place {place_id}", place_id)
+
+        with patch(DETAILS_TARGET, side_effect=details):
+            rows = place_store.resolve_many(["pid_fast", "pid_slow"], "Chicago", provider="google", deadline=0.1)
+
+        assert [r.place_id for r in rows] == ["pid_fast"]
+
+    def test_provider_exception_skips_place(self, app):
+        def details(place_id):
+            if place_id == "pid_boom":
+                raise RuntimeError("boom")
+            return make_details(f"Place {place_id}", place_id)
+
+        with patch(DETAILS_TARGET, side_effect=details):
+            rows = place_store.resolve_many(["pid_boom", "pid_ok"], "Chicago", provider="google")
+
+        assert [r.place_id for r in rows] == ["pid_ok"]
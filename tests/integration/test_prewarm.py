@@ -0,0 +1,178 @@
+"""
+Integration tests for prewarm.py and services.candidate_pools: which areas are
+warmed, snapshot versioning and enrichment, and the request path reading the
+snapshots instead of calling Google.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+import prewarm
+from models import Restaurant
+from services.cache import TTLCache
+from services.candidate_pools import CandidatePoolSnapshot, CandidatePoolStore, try_lock
+from services.google_service import GooglePlacesService, NEIGHBORHOOD_COORDINATES, CITY_COORDINATES
+from tests.conftest import make_candidate
+
+WEST_LOOP = prewarm.PrewarmTarget("Chicago", "West Loop", None)
+
+
+@pytest.fixture()
+def pools():
+    return CandidatePoolStore()
+
+
+@pytest.fixture()
+def service(pools):
+    service = GooglePlacesService()
+    service.api_key = "test-key"
+    service._nearby_cache = TTLCache("searchNearby", ttl=60)
+    service._pools = pools
+    with patch.object(prewarm, "candidate_pools", pools):
+        yield service
+
+
+def _pool(prefix, n=3):
+    return [make_candidate(f"{prefix} {i}", f"pid_{prefix}_{i}") for i in range(n)]
+
+
+class TestPrewarmTargets:
+    def test_every_area_and_type_set(self):
+        targets = prewarm.prewarm_targets()
+        areas = len(CITY_COORDINATES) + len(NEIGHBORHOOD_COORDINATES)
+        assert len(targets) == areas * len(prewarm.TYPE_SELECTIONS)
+        assert len({prewarm.target_key(t) for t in targets}) == len(targets)
+
+    def test_neighborhoods_sit_under_their_city(self):
+        cities = {t.neighborhood: t.city for t in prewarm.prewarm_targets() if t.neighborhood}
+        assert cities["West Loop"] == "Chicago"
+        assert cities["SoHo"] == "New York"
+
+
+class TestRefreshPool:
+    def test_publishes_enriched_versioned_snapshots(self, app, service, pools):
+        with patch.object(service, "_fetch_nearby", side_effect=[_pool("first"), _pool("second")]):
+            first = prewarm.refresh_pool(WEST_LOOP, service)
+            second = prewarm.refresh_pool(WEST_LOOP, service)
+
+        assert (first.version, second.version) == (1, 2)
+        assert pools.get(first.key) is second
+        assert second.enriched_at is not None
+        assert Restaurant.query.filter(Restaurant.place_id.like("pid_second_%")).count() == 3
+
+    def test_failed_refresh_keeps_previous_snapshot(self, app, service, pools):
+        with patch.object(service, "_fetch_nearby", side_effect=[_pool("first"), []]):
+            first = prewarm.refresh_pool(WEST_LOOP, service)
+            assert prewarm.refresh_pool(WEST_LOOP, service) is None
+        assert pools.get(first.key) is first
+
+    def test_min_age_skips_fresh_pools(self, app, service):
+        with patch.object(prewarm, "prewarm_targets", return_value=[WEST_LOOP]), \
+             patch.object(service, "_fetch_nearby", return_value=_pool("p")) as fetch:
+            assert prewarm.prewarm_all(service, min_age=60)["refreshed"] == 1
+            assert prewarm.prewarm_all(service, min_age=60)["skipped"] == 1
+        assert fetch.call_count == 1
+
+
+    def test_configured_cuisines_are_warmed(self, app, service, pools):
+        cuisines = ("thai_restaurant", "ramen_restaurant")
+        with patch.object(prewarm, "PREWARM_CUISINES", cuisines), \
+             patch.object(service, "_fetch_nearby", side_effect=lambda *args: _pool(args[3][0])) as fetch:
+            prewarm.refresh_pool(WEST_LOOP, service)
+        assert [call.args[3] for call in fetch.call_args_list] == [["restaurant"], ["thai_restaurant"], ["ramen_restaurant"]]
+
+        with patch.object(service, "_fetch_nearby") as fetch:
+            results = service.search_nearby_candidates("Chicago", "West Loop", cuisine_types=["thai_restaurant"])
+        fetch.assert_not_called()
+        assert {c["place_id"] for c in results} >= {"pid_thai_restaurant_0", "pid_restaurant_0"}
+
+    def test_bar_targets_skip_cuisines(self, app, service):
+        with patch.object(prewarm, "PREWARM_CUISINES", ("thai_restaurant",)), \
+             patch.object(service, "_fetch_nearby", return_value=_pool("bar")) as fetch:
+            prewarm.refresh_pool(prewarm.PrewarmTarget("Chicago", "West Loop", ("Bar",)), service)
+        fetch.assert_called_once()
+
+
+class TestCommandAndBackground:
+    def test_prewarm_pools_command_prints_a_summary(self, app, service):
+        with patch.object(prewarm, "prewarm_targets", return_value=[WEST_LOOP]), \
+             patch.object(prewarm, "places_service", service), \
+             patch.object(service, "_fetch_nearby", return_value=_pool("p")):
+            result = app.test_cli_runner().invoke(args=["prewarm-pools"])
+        assert result.exit_code == 0, result.output
+        assert "Chicago / West Loop (restaurants): refreshed v1, 3 candidates" in result.output
+        assert "1 refreshed, 0 still fresh, 0 failed" in result.output
+
+    def test_background_thread_starts_once_per_process_on_first_request(self, app, client):
+        with patch.object(prewarm, "PREWARM_INTERVAL", 60), patch.object(prewarm, "_background_pid", None), \
+             patch.object(prewarm, "run_forever") as run_forever:
+            client.get("/")
+            client.get("/")
+        assert run_forever.call_count == 1
+
+    def test_cli_does_not_start_background_thread(self, app):
+        with patch.object(prewarm, "PREWARM_INTERVAL", 60), patch.object(prewarm, "_background_pid", None), \
+             patch.object(prewarm, "run_forever") as run_forever:
+            result = app.test_cli_runner().invoke(args=["rebuild-taste-aggregates"])
+        assert result.exit_code == 0, result.output
+        run_forever.assert_not_called()
+
+
+class TestRequestPathReadsSnapshots:
+    def test_configured_area_never_calls_google(self, app, service):
+        with patch.object(service, "_fetch_nearby", return_value=_pool("warm")):
+            prewarm.refresh_pool(WEST_LOOP, service)
+        service._nearby_cache.invalidate()
+
+        with patch.object(service, "_fetch_nearby") as fetch:
+            results = service.search_nearby_candidates("Chicago", "West Loop")
+        fetch.assert_not_called()
+        assert [c["place_id"] for c in results] == [f"pid_warm_{i}" for i in range(3)]
+
+    def test_expired_snapshot_falls_back_to_search(self, service, pools):
+        key = prewarm.target_key(WEST_LOOP)
+        pools.put(CandidatePoolSnapshot(
+            key=key, city="Chicago", neighborhood="West Loop", included_types=("restaurant",), version=1,
+            fetched_at=time.time() - pools.max_age - 1, enriched_at=None, candidates=tuple(_pool("old")),
+        ))
+        with patch.object(service, "_fetch_nearby", return_value=_pool("live")) as fetch:
+            results = service.search_nearby_candidates("Chicago", "West Loop")
+        fetch.assert_called_once()
+        assert results[0]["place_id"] == "pid_live_0"
+
+
+class TestCandidatePoolStoreFile:
+    def test_other_process_sees_snapshots_and_versions_continue(self, tmp_path):
+        path = str(tmp_path / "pools.json")
+        writer = CandidatePoolStore(path)
+        writer.put(CandidatePoolSnapshot(
+            key="k", city="Chicago", neighborhood=None, included_types=("restaurant",), version=1,
+            fetched_at=time.time(), enriched_at=None, candidates=tuple(_pool("a")),
+        ))
+
+        reader = CandidatePoolStore(path, reload_interval=0)
+        assert reader.get("k").candidates[0]["place_id"] == "pid_a_0"
+        assert reader.next_version("k") == 2
+
+
+class TestTryLock:
+    def test_second_lock_is_refused_until_released(self, tmp_path):
+        path = str(tmp_path / "prewarm.lock")
+        held = try_lock(path)
+        assert held is not None
+        assert try_lock(path) is None
+        held.close()
+        again = try_lock(path)
+        assert again is not None
+        again.close()
+
+    def test_without_fcntl_or_msvcrt_locks_nothing(self, tmp_path):
+        with patch.dict(sys.modules, {"fcntl": None, "msvcrt": None}):
+            handle = try_lock(str(tmp_path / "prewarm.lock"))
+        assert handle is not None
+        handle.close()
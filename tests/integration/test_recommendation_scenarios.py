@@ -380,6 +380,23 @@ class TestDuplicatePlaceIdsDeduplicated:
         assert Restaurant.query.filter_by(place_id="pid_dupe").count() == 1
 
 
+# ---------------------------------------------------------------------------
+# Scenario 9b: Input cuisines widen the search
+# ---------------------------------------------------------------------------
+
+class TestInputCuisinesReachSearch:
+    def test_input_primary_types_are_passed_as_cuisine_types(self, client, app):
+        thai = make_details("Thai Place", "pid_thai", primary_type="thai_restaurant")
+
+        with patch(DETAILS_TARGET, return_value=thai), \
+             patch(SEARCH_TARGET, return_value=DEFAULT_CANDIDATES) as mock_search, \
+             patch(RANK_TARGET, side_effect=rank_candidates_echo):
+            resp = _post(client, _base_payload(place_ids=["pid_thai"]))
+
+        assert resp.status_code == 200
+        assert mock_search.call_args.kwargs["cuisine_types"] == ["thai_restaurant"]
+
+
 # ---------------------------------------------------------------------------
 # Scenario 10: Missing required fields → 400
 # ---------------------------------------------------------------------------
@@ -0,0 +1,148 @@
+"""
+Integration tests for POST /get_recommendations_async.
+
+Mocked boundaries:
+  - app.get_async_places_service → FakeAsyncPlaces (sleeps, then returns canned data)
+  - app.rank_candidates_async    → async echo of the first 3 candidates
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests — see
+test_recommendation_scenarios.py.
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import app as app_module
+from services.places import AsyncPlacesService
+from tests.conftest import (
+    seed_user, seed_restaurant, seed_preference, seed_prev_recommendation,
+    DEFAULT_CANDIDATES, make_details, rank_candidates_echo,
+)
+from models import RequestRestaurant, RequestType, Restaurant, PreferenceType
+
+STAGE_DELAY = 0.3
+
+
+class FakeAsyncPlaces(AsyncPlacesService):
+    def __init__(self, candidates=DEFAULT_CANDIDATES, details=None, delay=STAGE_DELAY):
+        self.candidates = candidates
+        self.details = details or {}
+        self.delay = delay
+        self.search_calls = 0
+        self.details_calls = []
+
+    async def autocomplete(self, query, city, session_token=None):
+        return []
+
+    async def get_details(self, place_id, session_token=None):
+        self.details_calls.append(place_id)
+        await asyncio.sleep(self.delay)
+        return self.details.get(place_id)
+
+    async def search_nearby_candidates(self, city, neighborhood=None, restaurant_types=None, radius=8000, max_results=20, cuisine_types=None):
+        self.search_calls += 1
+        await asyncio.sleep(self.delay)
+        return [dict(c) for c in self.candidates]
+
+
+async def _rank_echo(candidates, **kwargs):
+    return rank_candidates_echo(candidates, **kwargs)
+
+
+def _post(client, **overrides):
+    payload = {
+        "user": "testuser",
+        "city": "Chicago",
+        "place_ids": [],
+        "input_weight": 0.7,
+        "revisit_weight": 0.0,
+        "restaurant_types": [],
+    }
+    payload.update(overrides)
+    return client.post("/get_recommendations_async", data=json.dumps(payload), content_type="application/json")
+
+
+def _slow_history(*args):
+    time.sleep(STAGE_DELAY)
+    return _real_load_history(*args)
+
+
+_real_load_history = app_module._load_history
+
+
+class TestAsyncRecommendations:
+    def test_returns_and_persists_recommendations(self, client, app):
+        places = FakeAsyncPlaces(details={"pid_in": make_details("Input Place", "pid_in")})
+        with patch("app.get_async_places_service", return_value=places), \
+             patch("app.rank_candidates_async", AsyncMock(side_effect=_rank_echo)):
+            resp = _post(client, place_ids=["pid_in"])
+
+        assert resp.status_code == 200
+        assert len(resp.get_json()["recommendations"]) == 3
+        assert places.details_calls == ["pid_in"]
+        links = RequestRestaurant.query.all()
+        assert sum(1 for l in links if l.type == RequestType.input) == 1
+        assert sum(1 for l in links if l.type == RequestType.recommendation) == 3
+
+    def test_stages_overlap(self, client, app):
+        """Search, input details and history each take STAGE_DELAY; together they should not add up."""
+        places = FakeAsyncPlaces(details={"pid_in": make_details("Input Place", "pid_in")})
+        with patch("app.get_async_places_service", return_value=places), \
+             patch("app._load_history", side_effect=_slow_history), \
+             patch("app.rank_candidates_async", AsyncMock(side_effect=_rank_echo)):
+            started = time.perf_counter()
+            resp = _post(client, place_ids=["pid_in"])
+            elapsed = time.perf_counter() - started
+
+        assert resp.status_code == 200
+        assert elapsed < 2.5 * STAGE_DELAY
+
+    def test_history_excluded_from_pool(self, client, app):
+        user = seed_user("testuser")
+        liked = seed_restaurant("Liked Place", DEFAULT_CANDIDATES[0]["place_id"])
+        seed_preference(user, liked, PreferenceType.like)
+        places = FakeAsyncPlaces()
+        rank = AsyncMock(side_effect=_rank_echo)
+        with patch("app.get_async_places_service", return_value=places), \
+             patch("app.rank_candidates_async", rank):
+            resp = _post(client)
+
+        assert resp.status_code == 200
+        pool_ids = {c["place_id"] for c in rank.call_args.kwargs["candidates"]}
+        assert liked.place_id not in pool_ids
+        assert "Liked Place" in rank.call_args.kwargs["liked_names"]
+
+    def test_revisit_only_ignores_search(self, client, app):
+        user = seed_user("testuser")
+        for i in range(3):
+            seed_prev_recommendation(user, seed_restaurant(f"Prev {i}", f"pid_prev_{i}"))
+        rank = AsyncMock(side_effect=_rank_echo)
+        with patch("app.get_async_places_service", return_value=FakeAsyncPlaces()), \
+             patch("app.rank_candidates_async", rank):
+            resp = _post(client, revisit_weight=1.0)
+
+        assert resp.status_code == 200
+        pool_ids = {c["place_id"] for c in rank.call_args.kwargs["candidates"]}
+        assert pool_ids == {"pid_prev_0", "pid_prev_1", "pid_prev_2"}
+        # Search results are not written to the store when the pool is revisit-only
+        assert Restaurant.query.filter_by(place_id=DEFAULT_CANDIDATES[0]["place_id"]).first() is None
+
+    def test_missing_city_is_400(self, client, app):
+        resp = client.post("/get_recommendations_async", data=json.dumps({"user": "x"}), content_type="application/json")
+        assert resp.status_code == 400
+
+    def test_rank_failure_serves_prerank_fallback(self, client, app):
+        with patch("app.get_async_places_service", return_value=FakeAsyncPlaces()), \
+             patch("app.rank_candidates_async", AsyncMock(return_value=[])):
+            resp = _post(client)
+        assert resp.status_code == 200
+        assert len(resp.get_json()["recommendations"]) == 3
+
+    def test_rank_failure_without_fallback_is_500(self, client, app):
+        with patch("app.get_async_places_service", return_value=FakeAsyncPlaces()), \
+             patch("app.rank_candidates_async", AsyncMock(return_value=[])), \
+             patch("app.PRERANK_FALLBACK", False):
+            resp = _post(client)
+        assert resp.status_code == 500
@@ -0,0 +1,72 @@
+"""
+Integration tests for POST /get_recommendations_stream (server-sent events).
+
+Mocked boundaries:
+  - places_service.search_nearby_candidates → DEFAULT_CANDIDATES
+  - app.stream_rank_candidates              → generator echoing the first 3 candidates
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+import json
+from unittest.mock import patch
+
+from tests.conftest import DEFAULT_CANDIDATES, rank_candidates_echo
+from models import RequestRestaurant, RequestType, UserRequest
+
+SEARCH_TARGET = "services.places_service.search_nearby_candidates"
+STREAM_TARGET = "app.stream_rank_candidates"
+
+
+def _stream_echo(candidates, **kwargs):
+    yield from rank_candidates_echo(candidates, **kwargs)
+
+
+def _post(client, **overrides):
+    payload = {"user": "testuser", "city": "Chicago", "place_ids": [], "revisit_weight": 0.0}
+    payload.update(overrides)
+    return client.post("/get_recommendations_stream", data=json.dumps(payload), content_type="application/json")
+
+
+def _events(resp):
+    events = []
+    for raw in resp.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in raw.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestRecommendationStream:
+    def test_streams_each_recommendation_then_done(self, client, app):
+        with patch(SEARCH_TARGET, return_value=[dict(c) for c in DEFAULT_CANDIDATES]), \
+             patch(STREAM_TARGET, side_effect=_stream_echo):
+            resp = _post(client)
+
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/event-stream"
+        events = _events(resp)
+        assert [e for e, _ in events] == ["recommendation"] * 3 + ["done"]
+        assert all(data["id"] for e, data in events if e == "recommendation")
+        assert events[-1][1] == {"count": 3}
+        assert RequestRestaurant.query.filter_by(type=RequestType.recommendation).count() == 3
+
+    def test_empty_rank_streams_prerank_fallback(self, client, app):
+        with patch(SEARCH_TARGET, return_value=[dict(c) for c in DEFAULT_CANDIDATES]), \
+             patch(STREAM_TARGET, side_effect=lambda **kwargs: iter([])):
+            resp = _post(client)
+
+        assert [e for e, _ in _events(resp)] == ["recommendation"] * 3 + ["done"]
+
+    def test_empty_rank_sends_error_event_and_saves_nothing(self, client, app):
+        with patch(SEARCH_TARGET, return_value=[dict(c) for c in DEFAULT_CANDIDATES]), \
+             patch(STREAM_TARGET, side_effect=lambda **kwargs: iter([])), \
+             patch("app.PRERANK_FALLBACK", False):
+            resp = _post(client)
+
+        assert _events(resp) == [("error", {"error": "Could not retrieve recommendations at this time."})]
+        assert UserRequest.query.count() == 0
+
+    def test_validation_errors_are_json(self, client, app):
+        resp = client.post("/get_recommendations_stream", data=json.dumps({"user": "x"}), content_type="application/json")
+        assert resp.status_code == 400
+        assert resp.get_json()["error"] == "City is required"
@@ -0,0 +1,110 @@
+"""
+Integration tests for /save_preferences and the bulk diff in preferences.py:
+one validating read, one upsert, and no writes for unchanged ratings.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, PreferenceType, UserRestaurantPreference
+import preferences
+from tests.conftest import count_statements, seed_user, seed_restaurant, seed_preference
+
+
+def _post(client, user, prefs):
+    return client.post("/save_preferences", json={
+        "user_name": user.name,
+        "preferences": [{"restaurant_id": rid, "preference": p} for rid, p in prefs],
+    })
+
+
+def _rows(user):
+    db.session.expire_all()
+    return {
+        p.restaurant_id: p for p in
+        db.session.execute(select(UserRestaurantPreference).filter_by(user_id=user.id)).scalars()
+    }
+
+
+class TestSavePreferences:
+    def test_inserts_updates_and_keeps_unchanged_timestamps(self, client):
+        user = seed_user()
+        a, b, c = (seed_restaurant(n, f"pid_{n}") for n in "abc")
+        old = datetime(2024, 1, 1)
+        seed_preference(user, a, PreferenceType.like).timestamp = old
+        seed_preference(user, b, PreferenceType.like).timestamp = old
+        db.session.commit()
+
+        response = _post(client, user, [(a.id, "like"), (b.id, "dislike"), (c.id, "neutral")])
+
+        assert response.status_code == 200
+        rows = _rows(user)
+        assert {rid: p.preference for rid, p in rows.items()} == {
+            a.id: PreferenceType.like, b.id: PreferenceType.dislike, c.id: PreferenceType.neutral,
+        }
+        assert rows[a.id].timestamp == old
+        assert rows[b.id].timestamp > old
+
+    def test_last_entry_per_restaurant_wins(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        db.session.commit()
+
+        assert _post(client, user, [(a.id, "like"), (a.id, "dislike")]).status_code == 200
+
+        rows = _rows(user)
+        assert len(rows) == 1
+        assert rows[a.id].preference == PreferenceType.dislike
+
+    def test_unknown_restaurant_rejects_whole_payload(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        db.session.commit()
+
+        response = _post(client, user, [(a.id, "like"), (999999, "like")])
+
+        assert response.status_code == 400
+        assert "999999" in response.json["error"]
+        assert _rows(user) == {}
+
+    def test_invalid_preference_type_is_400(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        db.session.commit()
+
+        response = _post(client, user, [(a.id, "love")])
+
+        assert response.status_code == 400
+        assert "love" in response.json["error"]
+
+    def test_hundreds_of_ratings_in_two_statements(self, app):
+        user = seed_user()
+        restaurants = [seed_restaurant(f"R{i}", f"pid_{i}") for i in range(300)]
+        for r in restaurants[:100]:
+            seed_preference(user, r, PreferenceType.dislike)
+        db.session.commit()
+        user_id = user.id
+        payload = [{"restaurant_id": r.id, "preference": "neutral"} for r in restaurants]
+
+        diff, statements = count_statements(lambda: preferences.save_preferences(user_id, payload))
+
+        assert (len(diff.inserts), len(diff.updates), len(diff.unchanged)) == (200, 100, 0)
+        assert len(statements) == 2
+        assert "ON CONFLICT" in statements[1]
+        db.session.commit()
+        assert len(_rows(user)) == 300
+
+    def test_unchanged_payload_writes_nothing(self, app):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        seed_preference(user, a, PreferenceType.like)
+        db.session.commit()
+        user_id, payload = user.id, [{"restaurant_id": a.id, "preference": "like"}]
+
+        diff, statements = count_statements(lambda: preferences.save_preferences(user_id, payload))
+
+        assert diff.unchanged == [a.id]
+        assert len(statements) == 1
@@ -0,0 +1,46 @@
+"""
+Integration tests for schema_check.verify_schema — only a database at
+latest_migration_id() counts as current.
+"""
+
+import pytest
+from sqlalchemy import text
+
+import schema_check
+from models import db
+
+
+@pytest.fixture()
+def alembic_version(app):
+    def set_version(version):
+        with db.engine.connect() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            conn.execute(text("DELETE FROM alembic_version"))
+            conn.execute(text("INSERT INTO alembic_version (version_num) VALUES (:v)"), {"v": version})
+            conn.commit()
+    yield set_version
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        conn.commit()
+
+
+class TestVerifySchema:
+    def test_latest_migration_is_current(self, app, alembic_version):
+        alembic_version(schema_check.latest_migration_id())
+        assert schema_check.verify_schema(app) is True
+
+    def test_head_comes_from_the_migration_scripts(self):
+        # The newest migration's revision, with no hand-maintained list to update
+        assert schema_check.latest_migration_id() == "b8c9d0e1f2a3"
+        assert schema_check.PREFERENCE_UNIQUE_MIGRATION_ID in schema_check.alembic_ids()
+        assert schema_check.INITIAL_MIGRATION_ID not in schema_check.alembic_ids()
+
+    def test_older_migration_is_pending(self, app, alembic_version):
+        alembic_version(schema_check.PREFERENCE_UNIQUE_MIGRATION_ID)
+        assert schema_check.verify_schema(app) is False
+
+    def test_verify_schema_command_fails_with_pending_migrations(self, app, alembic_version):
+        alembic_version(schema_check.PREFERENCE_UNIQUE_MIGRATION_ID)
+        result = app.test_cli_runner().invoke(args=["verify-schema"])
+        assert result.exit_code != 0
+        assert "Pending migrations" in result.output
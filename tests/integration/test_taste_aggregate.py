@@ -0,0 +1,142 @@
+"""
+Integration tests for the per-user taste aggregate: /save_preferences keeps it
+in step with the user's likes, and it matches a rebuild from scratch.
+
+NOTE: Do NOT use ``with app.app_context():`` anywhere in tests.
+"""
+
+from models import db, PreferenceType, UserTasteAggregate
+from openai_example import build_taste_profile
+import taste
+from tests.conftest import count_statements, seed_user, seed_restaurant, seed_preference
+
+
+def _save(client, user, *prefs):
+    response = client.post("/save_preferences", json={
+        "user_name": user.name,
+        "preferences": [{"restaurant_id": r.id, "preference": p} for r, p in prefs],
+    })
+    assert response.status_code == 200, response.json
+
+
+def _stored(user, with_contributions=False):
+    db.session.expire_all()
+    return taste.load_aggregate(user.id, with_contributions)
+
+
+class TestSavePreferencesAggregate:
+    def test_first_like_creates_row(self, client):
+        user = seed_user()
+        ramen = seed_restaurant("Ramen", "pid_ramen", primary_type="ramen_restaurant")
+        db.session.commit()
+
+        _save(client, user, (ramen, "like"))
+
+        aggregate = _stored(user)
+        assert aggregate.like_count == 1
+        assert aggregate.primary_types == {"ramen_restaurant": 1}
+        assert aggregate.bool_true["reservable"] == 1
+
+    def test_likes_switches_and_removals_match_rebuild(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a", price_level="PRICE_LEVEL_EXPENSIVE", rating=4.8)
+        b = seed_restaurant("B", "pid_b", primary_type="ramen_restaurant", rating=4.0)
+        c = seed_restaurant("C", "pid_c", primary_type="sushi_restaurant")
+        db.session.commit()
+
+        _save(client, user, (a, "like"), (b, "like"))
+        _save(client, user, (a, "dislike"), (c, "like"), (b, "neutral"), (b, "like"))
+
+        incremental = _stored(user)
+        rebuilt = taste.rebuild_aggregate(user.id)
+        db.session.rollback()
+        assert incremental == rebuilt
+        assert incremental.like_count == 2
+        assert build_taste_profile(incremental, [], 0.0) == build_taste_profile([b, c], [], 0.0)
+
+    def test_non_like_changes_leave_existing_row_alone(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        b = seed_restaurant("B", "pid_b")
+        db.session.commit()
+        _save(client, user, (a, "like"))
+        updated_at = db.session.get(UserTasteAggregate, user.id).updated_at
+
+        _save(client, user, (b, "dislike"), (a, "like"))
+
+        assert db.session.get(UserTasteAggregate, user.id).updated_at == updated_at
+
+    def test_user_without_row_gets_rebuilt_on_first_change(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        b = seed_restaurant("B", "pid_b")
+        seed_preference(user, a, PreferenceType.like)  # predates the aggregate table
+        db.session.commit()
+        assert taste.load_aggregate(user.id) is None
+
+        _save(client, user, (b, "like"))
+
+        assert _stored(user).like_count == 2
+
+    def test_drifted_row_is_rebuilt(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a", primary_type="ramen_restaurant")
+        db.session.commit()
+        _save(client, user, (a, "like"))
+
+        # The restaurant's type changes after it was counted
+        a.primary_type = "sushi_restaurant"
+        db.session.commit()
+        _save(client, user, (a, "dislike"))
+
+        aggregate = _stored(user)
+        assert aggregate.like_count == 0
+        assert not aggregate.primary_types
+
+    def test_unlike_after_rating_refresh_matches_rebuild(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a", rating=4.5, price_level="PRICE_LEVEL_EXPENSIVE")
+        b = seed_restaurant("B", "pid_b", rating=4.0)
+        db.session.commit()
+        _save(client, user, (a, "like"), (b, "like"))
+
+        # The place store refreshes A after it was counted; nothing goes negative
+        a.rating = 3.0
+        a.price_level = "PRICE_LEVEL_MODERATE"
+        db.session.commit()
+        _save(client, user, (a, "neutral"))
+
+        incremental = _stored(user)
+        rebuilt = taste.rebuild_aggregate(user.id)
+        db.session.rollback()
+        assert incremental == rebuilt
+        assert incremental.rating_sum == 4.0 and incremental.rating_count == 1
+
+    def test_row_without_contributions_is_rebuilt_on_unlike(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a", rating=4.8)
+        b = seed_restaurant("B", "pid_b", rating=4.0)
+        db.session.commit()
+        _save(client, user, (a, "like"), (b, "like"))
+        # A row written before contributions were recorded
+        db.session.get(UserTasteAggregate, user.id).contributions = {}
+        a.rating = 3.1
+        db.session.commit()
+
+        _save(client, user, (a, "dislike"))
+
+        aggregate = _stored(user, with_contributions=True)
+        assert aggregate.rating_sum == 4.0 and aggregate.rating_count == 1
+        assert set(aggregate.contributions) == {str(b.id)}
+
+    def test_recommendation_path_does_not_read_contributions(self, client):
+        user = seed_user()
+        a = seed_restaurant("A", "pid_a")
+        db.session.commit()
+        _save(client, user, (a, "like"))
+        user_id = user.id
+        db.session.expire_all()
+
+        aggregate, statements = count_statements(lambda: taste.load_aggregate(user_id))
+        assert aggregate.like_count == 1 and aggregate.contributions == {}
+        assert len(statements) == 1 and "contributions" not in statements[0]
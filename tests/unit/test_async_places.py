@@ -0,0 +1,120 @@
+"""Unit tests for the async places services and the shared rank prompt/parse helpers."""
+
+import asyncio
+import json
+
+import httpx
+from unittest.mock import MagicMock, patch
+
+from services.google_service import AsyncGooglePlacesService, GooglePlacesService, nearby_cache_key, search_area
+from services.http import AsyncRetryTransport
+from services.places import ThreadedAsyncPlacesService
+from openai_example import parse_rank_response
+from tests.conftest import make_candidate
+
+
+NEARBY_RESPONSE = {
+    "places": [
+        {"id": "pid_1", "displayName": {"text": "One"}, "formattedAddress": "1 St", "types": ["restaurant"], "rating": 4.5},
+        {"id": "pid_2", "displayName": {"text": "Two"}, "formattedAddress": "2 St", "types": ["bar"], "rating": 4.1},
+    ]
+}
+
+
+def _google_service():
+    with patch("services.google_service.NEARBY_CACHE_PATH", ""):
+        service = GooglePlacesService()
+    service.api_key = "test-key"
+    return service
+
+
+def _async_service(sync_service, handler):
+    service = AsyncGooglePlacesService(sync_service)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+
+class TestAsyncGooglePlacesService:
+    def test_search_nearby_parses_and_fills_shared_cache(self):
+        sync_service = _google_service()
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(json.loads(request.content))
+            return httpx.Response(200, json=NEARBY_RESPONSE)
+
+        service = _async_service(sync_service, handler)
+        first = asyncio.run(service.search_nearby_candidates("Chicago"))
+        second = asyncio.run(service.search_nearby_candidates("Chicago"))
+
+        assert [c["place_id"] for c in first] == ["pid_1", "pid_2"]
+        assert first == second
+        assert len(requests_seen) == 1
+        assert requests_seen[0]["includedTypes"] == ["restaurant"]
+        # The sync service sees the same cache entry
+        centre, radius, types = search_area("Chicago", None, None, 8000)
+        assert sync_service._nearby_cache.get(nearby_cache_key(centre, radius, types, 20)) is not None
+
+    def test_service_unavailable_is_retried(self):
+        sync_service = _google_service()
+        statuses = iter([503, 200])
+        service = AsyncGooglePlacesService(sync_service)
+        service.client = httpx.AsyncClient(transport=AsyncRetryTransport(
+            httpx.MockTransport(lambda request: httpx.Response(next(statuses), json=NEARBY_RESPONSE)),
+            backoff_factor=0,
+        ))
+        results = asyncio.run(service.search_nearby_candidates("Chicago"))
+        assert [c["place_id"] for c in results] == ["pid_1", "pid_2"]
+
+    def test_client_retries_like_the_sync_transport(self):
+        service = AsyncGooglePlacesService(_google_service())
+
+        async def transport():
+            async with service:
+                return service.client._transport
+
+        assert isinstance(asyncio.run(transport()), AsyncRetryTransport)
+
+    def test_error_status_returns_empty_and_is_not_cached(self):
+        sync_service = _google_service()
+        service = _async_service(sync_service, lambda request: httpx.Response(500, text="boom"))
+        assert asyncio.run(service.search_nearby_candidates("Chicago")) == []
+        assert len(sync_service._nearby_cache) == 0
+
+    def test_get_details_matches_sync_shape(self):
+        place = {"id": "pid_1", "displayName": {"text": "One"}, "nationalPhoneNumber": "555", "types": ["restaurant"]}
+        service = _async_service(_google_service(), lambda request: httpx.Response(200, json=place))
+        details = asyncio.run(service.get_details("pid_1"))
+        assert details["name"] == "One"
+        assert details["phone"] == "555"
+        assert details["place_id"] == "pid_1"
+
+    def test_transport_error_returns_none(self):
+        def handler(request):
+            raise httpx.ConnectError("down")
+
+        service = _async_service(_google_service(), handler)
+        assert asyncio.run(service.get_details("pid_1")) is None
+
+    def test_unknown_city_skips_request(self):
+        service = _async_service(_google_service(), MagicMock())
+        assert asyncio.run(service.search_nearby_candidates("Atlantis")) == []
+
+
+class TestThreadedAsyncPlacesService:
+    def test_delegates_to_sync_service(self):
+        sync_service = MagicMock()
+        sync_service.get_details.return_value = {"name": "One"}
+        service = ThreadedAsyncPlacesService(sync_service)
+        assert asyncio.run(service.get_details("pid_1")) == {"name": "One"}
+        sync_service.get_details.assert_called_once_with("pid_1", None)
+
+
+class TestParseRankResponse:
+    def test_resolves_numbers_to_candidates(self):
+        index = {1: make_candidate("Alpha", "pid_a"), 2: make_candidate("Beta", "pid_b")}
+        content = "2. Beta — Because you liked X — Great pasta\n1. Alpha - Matches your taste - Cozy spot\n9. Ghost - x - y"
+        results = parse_rank_response(content, index, num_recommendations=3)
+        assert [r["place_id"] for r in results] == ["pid_b", "pid_a"]
+        assert results[0]["reason"] == "Because you liked X"
+        assert results[0]["description"] == "Great pasta"
@@ -0,0 +1,65 @@
+"""Unit tests for services.autocomplete_cache and the cached GooglePlacesService.autocomplete."""
+
+from unittest.mock import patch
+
+from services.autocomplete_cache import AutocompleteCache, normalize_query, suggestion_matches
+from services.google_service import GooglePlacesService
+
+
+def _s(name, address="Chicago, IL, USA", place_id=None):
+    return {"name": name, "place_id": place_id or name.lower().replace(" ", "_"), "address": address}
+
+
+class TestNormalization:
+    def test_case_and_whitespace_collapsed(self):
+        assert normalize_query("  Au   Cheval ") == "au cheval"
+
+    def test_match_on_word_boundary(self):
+        assert suggestion_matches(_s("Girl & The Goat"), "the go")
+        assert not suggestion_matches(_s("Girl & The Goat"), "oat")
+
+
+class TestAutocompleteCache:
+    def test_exact_hit_is_city_scoped(self):
+        cache = AutocompleteCache(shared_url="")
+        cache.store("au c", "Chicago", [_s("Au Cheval")])
+        assert cache.lookup("AU  C", "Chicago") == [_s("Au Cheval")]
+        assert cache.lookup("au c", "New York") is None
+
+    def test_longer_prefix_filtered_from_complete_entry(self):
+        cache = AutocompleteCache(shared_url="")
+        cache.store("au", "Chicago", [_s("Au Cheval"), _s("Aurelio's Pizza"), _s("Avec", "Au Street")])
+        assert [s["name"] for s in cache.lookup("au ch", "Chicago")] == ["Au Cheval"]
+
+    def test_incomplete_entry_not_used_for_longer_prefix(self):
+        cache = AutocompleteCache(shared_url="")
+        cache.store("a", "Chicago", [_s(f"A{i}") for i in range(5)])  # full page → may be truncated
+        cache.store("au", "Chicago", [_s(f"Au {i}") for i in range(5)])
+        assert cache.lookup("au c", "Chicago") is None
+
+    def test_redis_backend_disabled_without_package(self):
+        with patch.dict("sys.modules", {"redis": None}):
+            cache = AutocompleteCache(shared_url="redis://localhost:6379/0")
+        cache.store("au", "Chicago", [_s("Au Cheval")])
+        assert cache.lookup("au", "Chicago") == [_s("Au Cheval")]
+
+
+class TestCachedGoogleAutocomplete:
+    def test_repeat_and_extended_prefix_skip_google(self):
+        service = GooglePlacesService()
+        service.api_key = "test-key"
+        service._autocomplete_cache = AutocompleteCache(shared_url="")
+        with patch.object(service, "_fetch_autocomplete", return_value=[_s("Au Cheval")]) as mock_fetch:
+            service.autocomplete("au", "Chicago", session_token="t1")
+            service.autocomplete("au", "Chicago", session_token="t2")
+            assert service.autocomplete("au che", "Chicago") == [_s("Au Cheval")]
+        mock_fetch.assert_called_once()
+
+    def test_errors_not_cached(self):
+        service = GooglePlacesService()
+        service.api_key = "test-key"
+        service._autocomplete_cache = AutocompleteCache(shared_url="")
+        with patch.object(service, "_fetch_autocomplete", return_value=None) as mock_fetch:
+            service.autocomplete("au", "Chicago")
+            service.autocomplete("au", "Chicago")
+        assert mock_fetch.call_count == 2
@@ -1,8 +1,9 @@
-"""Unit tests for openai_example.build_taste_profile."""
+"""Unit tests for openai_example.build_taste_profile and the TasteAggregate it blends."""
 
 import pytest
 from unittest.mock import MagicMock
 from openai_example import build_taste_profile
+from taste import TasteAggregate
 
 
 def _r(price=None, rating=None, primary_type=None, dine_in=None, reservable=None, takeout=None):
@@ -78,3 +79,31 @@ class TestBuildTasteProfile:
         assert "preferred_price_level" not in profile
         assert "min_rating" not in profile
         assert "top_cuisine_types" not in profile
+
+
+class TestTasteAggregateHistory:
+    HISTORY = [
+        _r(price="PRICE_LEVEL_MODERATE", rating=4.1, primary_type="ramen_restaurant", dine_in=True, reservable=False),
+        _r(price="PRICE_LEVEL_MODERATE", rating=4.6, primary_type="ramen_restaurant", dine_in=True),
+        _r(price="PRICE_LEVEL_EXPENSIVE", rating=None, primary_type="sushi_restaurant", takeout=True),
+        _r(),
+    ]
+    INPUTS = [_r(price="PRICE_LEVEL_EXPENSIVE", rating=4.9, primary_type="sushi_restaurant", dine_in=False)]
+
+    @pytest.mark.parametrize("alpha", [0.0, 0.3, 0.7, 1.0])
+    def test_aggregate_matches_restaurant_list(self, alpha):
+        aggregate = TasteAggregate.from_restaurants(self.HISTORY)
+        assert build_taste_profile(aggregate, self.INPUTS, alpha) == build_taste_profile(self.HISTORY, self.INPUTS, alpha)
+
+    def test_remove_undoes_add(self):
+        aggregate = TasteAggregate.from_restaurants(self.HISTORY[:2])
+        extra = self.HISTORY[2]
+        aggregate.add(extra)
+        aggregate.remove(extra)
+        assert build_taste_profile(aggregate, [], 0.0) == build_taste_profile(self.HISTORY[:2], [], 0.0)
+        assert aggregate.is_consistent()
+
+    def test_removing_uncounted_restaurant_is_inconsistent(self):
+        aggregate = TasteAggregate.from_restaurants(self.HISTORY[:1])
+        aggregate.remove(self.HISTORY[2])
+        assert not aggregate.is_consistent()
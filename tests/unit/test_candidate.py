@@ -0,0 +1,99 @@
+"""
+Unit tests for services.candidate.Candidate: conversions, interning, the
+dict-compatible read interface, and persistence through the candidate stores.
+"""
+
+import time
+
+import pytest
+
+from history import RestaurantRecord
+from services.cache import TTLCache
+from services.candidate import Candidate, candidates_from_json, candidates_to_json
+from services.candidate_pools import CandidatePoolSnapshot
+from services.google_service import parse_nearby
+from tests.conftest import make_candidate
+
+
+def test_is_slotted():
+    c = Candidate(name="One", place_id="p1")
+    assert not hasattr(c, "__dict__")
+    with pytest.raises(AttributeError):
+        c.unknown_field = 1
+
+
+def test_from_place_round_trips_the_candidate_dict():
+    place = make_candidate("One", "p1", is_revisit=True)
+    c = Candidate.from_place(place)
+    assert c.is_revisit is True and c.rating == place["rating"]
+    assert c.to_dict() == {**place, "phone": None, "website": None, "latitude": None, "longitude": None, "fetched_at": None}
+    assert c == place
+
+
+def test_vocabulary_strings_are_interned():
+    level = "".join(["PRICE_LEVEL_", "MODERATE"])
+    a = Candidate(price_level=level, primary_type="".join(["thai_", "restaurant"]), categories=["".join(["fo", "od"])])
+    b = Candidate(price_level="PRICE_LEVEL_MODERATE", primary_type="thai_restaurant", categories=["food"])
+    assert a.price_level is b.price_level
+    assert a.primary_type is b.primary_type
+    assert a.categories[0] is b.categories[0]
+
+
+def test_reads_like_a_dict():
+    c = Candidate.from_place(make_candidate("One", "p1"))
+    assert c["name"] == "One" and c.get("rating") == 4.2
+    assert c.get("_is_revisit") is False and c["_is_revisit"] is False
+    assert c.get("missing", "default") == "default"
+    assert "name" in c and "missing" not in c
+    assert dict(c)["place_id"] == "p1"
+    with pytest.raises(KeyError):
+        c["missing"]
+
+
+def test_from_restaurant_record():
+    record = RestaurantRecord(
+        id=1, name="Two", place_id="p2", location="2 St", cuisine_type="bar, pub", price_level=None,
+        rating=4.0, user_rating_count=10, editorial_summary=None, primary_type="bar",
+        serves_dine_in=None, serves_takeout=None, serves_delivery=None, reservable=None, city_hint="Chicago",
+    )
+    c = Candidate.from_restaurant(record, is_revisit=True)
+    assert c.categories == ("bar", "pub")
+    assert c.address == "2 St" and c.is_revisit
+
+
+def test_parse_nearby_builds_candidates():
+    [c] = parse_nearby({"places": [{"id": "p1", "displayName": {"text": "One"}, "types": ["restaurant"]}]})
+    assert isinstance(c, Candidate)
+    assert c.place_id == "p1" and c.categories == ("restaurant",)
+
+
+def test_persisted_cache_reloads_candidates(tmp_path):
+    path = str(tmp_path / "cache.json")
+    codec = {"encode": candidates_to_json, "decode": candidates_from_json}
+    cache = TTLCache("t", ttl=60, persist_path=path, **codec)
+    cache.set("k", [Candidate.from_place(make_candidate("One", "p1"))])
+    cache.flush()
+    [loaded] = TTLCache("t", ttl=60, persist_path=path, **codec).get("k")
+    assert isinstance(loaded, Candidate)
+    assert loaded == make_candidate("One", "p1")
+
+
+def test_candidate_is_read_only():
+    c = Candidate.from_place(make_candidate("One", "p1"))
+    with pytest.raises(TypeError):
+        c["rating"] = 1.0
+    with pytest.raises(TypeError):
+        c.update(rating=1.0)
+    copy = dict(c)
+    copy["rating"] = 1.0
+    assert c.rating == 4.2
+
+
+def test_pool_snapshot_json_round_trip():
+    snapshot = CandidatePoolSnapshot(
+        key="k", city="Chicago", neighborhood=None, included_types=("restaurant",), version=1,
+        fetched_at=time.time(), enriched_at=None, candidates=(Candidate.from_place(make_candidate("One", "p1")),),
+    )
+    restored = CandidatePoolSnapshot.from_json(snapshot.to_json())
+    assert isinstance(restored.candidates[0], Candidate)
+    assert restored == snapshot
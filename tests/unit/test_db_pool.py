@@ -0,0 +1,111 @@
+"""
+Unit tests for db_pool — profile selection, the engine options each profile
+produces, and the checkout/wait counters recorded by the Timed* pools.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+import db_pool
+
+PG_URL = "postgresql://user:pw@pooler.supabase.com:6543/postgres"
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    db_pool.pool_metrics.reset()
+    yield
+    db_pool.pool_metrics.reset()
+
+
+class TestSelectProfile:
+    def test_auto_picks_sqlite_for_sqlite_urls(self, monkeypatch):
+        monkeypatch.setenv("VERCEL", "1")
+        assert db_pool.select_profile("sqlite:///:memory:") == "sqlite"
+
+    def test_auto_picks_serverless_on_vercel(self, monkeypatch):
+        monkeypatch.setenv("VERCEL", "1")
+        assert db_pool.select_profile(PG_URL) == "serverless"
+
+    def test_auto_picks_server_elsewhere(self, monkeypatch):
+        monkeypatch.delenv("VERCEL", raising=False)
+        assert db_pool.select_profile(PG_URL) == "server"
+
+    def test_explicit_profile_wins(self):
+        with patch.object(db_pool, "DB_POOL_PROFILE", "server"):
+            assert db_pool.select_profile("sqlite:///:memory:") == "server"
+
+    def test_unknown_profile_raises(self):
+        with patch.object(db_pool, "DB_POOL_PROFILE", "pgbouncer"), pytest.raises(ValueError):
+            db_pool.select_profile(PG_URL)
+
+
+class TestEngineOptions:
+    def test_serverless_uses_null_pool(self):
+        options = db_pool.engine_options(PG_URL, "serverless")
+        assert options["poolclass"] is db_pool.TimedNullPool
+        assert "pool_size" not in options
+        assert options["connect_args"]["connect_timeout"] == db_pool.DB_CONNECT_TIMEOUT
+
+    def test_server_uses_sized_queue_pool_with_pre_ping(self):
+        options = db_pool.engine_options(PG_URL, "server")
+        assert options["poolclass"] is db_pool.TimedQueuePool
+        assert options["pool_size"] == db_pool.DB_POOL_SIZE
+        assert options["pool_pre_ping"] is True
+        assert options["pool_recycle"] == db_pool.DB_POOL_RECYCLE
+
+    def test_sqlite_leaves_pool_to_flask_sqlalchemy(self):
+        assert "poolclass" not in db_pool.engine_options("sqlite:///:memory:", "sqlite")
+
+    def test_server_options_build_an_engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **db_pool.engine_options("sqlite://", "server"))
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert db_pool.pool_status(engine)["size"] == db_pool.DB_POOL_SIZE
+        engine.dispose()
+
+
+class TestPoolMetrics:
+    def _engine(self, tmp_path, **options):
+        return create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=db_pool.TimedQueuePool, **options)
+
+    def test_counts_checkouts_and_checkins(self, tmp_path):
+        engine = self._engine(tmp_path, pool_size=2, max_overflow=0)
+        for _ in range(3):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        stats = db_pool.pool_status(engine)
+        assert stats["checkouts"] == 3
+        assert stats["checkins"] == 3
+        assert stats["connects"] == 1  # the pooled connection is reused
+        assert stats["checked_out"] == 0
+        engine.dispose()
+
+    def test_exhausted_pool_records_timeout_and_wait(self, tmp_path):
+        engine = self._engine(tmp_path, pool_size=1, max_overflow=0, pool_timeout=0.05)
+        with engine.connect():
+            assert db_pool.pool_status(engine)["checked_out"] == 1
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        stats = db_pool.pool_metrics.stats()
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 50
+        engine.dispose()
+
+    def test_null_pool_connects_per_checkout(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=db_pool.TimedNullPool)
+        for _ in range(2):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        stats = db_pool.pool_status(engine)
+        assert isinstance(engine.pool, NullPool)
+        assert stats["checkouts"] == 2
+        assert stats["connects"] == 2
+        assert "size" not in stats
@@ -0,0 +1,38 @@
+"""
+Unit tests for geo.py: geohash encoding, circle covers and distances.
+"""
+
+import math
+
+import pytest
+
+import geo
+
+
+def test_encode_matches_reference_geohash():
+    assert geo.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geo.encode(57.64911, 10.40744) == "u4pruydqq"
+
+
+def test_cell_sizes_shrink_with_precision():
+    assert geo.cell_size(1) == (45.0, 45.0)
+    lat5, lng5 = geo.cell_size(5)
+    assert lat5 == pytest.approx(0.0439, abs=1e-3) and lng5 == pytest.approx(0.0439, abs=1e-3)
+
+
+@pytest.mark.parametrize("radius", [500, 2000, 8000])
+def test_cover_contains_every_point_of_the_circle(radius):
+    lat, lng = 41.8827, -87.6480
+    cells = geo.cover(lat, lng, radius)
+    assert 1 <= len(cells) <= 16
+    dlat = radius / geo.METRES_PER_DEGREE
+    dlng = dlat / math.cos(math.radians(lat))
+    for angle in range(0, 360, 15):
+        point = (lat + dlat * math.sin(math.radians(angle)), lng + dlng * math.cos(math.radians(angle)))
+        assert any(geo.encode(*point).startswith(cell) for cell in cells)
+
+
+def test_distance():
+    assert geo.distance_m(41.8781, -87.6298, 41.8781, -87.6298) == 0
+    # Chicago to New York is about 1145 km
+    assert geo.distance_m(41.8781, -87.6298, 40.7128, -74.0060) == pytest.approx(1_145_000, rel=0.01)
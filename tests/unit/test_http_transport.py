@@ -0,0 +1,145 @@
+"""Unit tests for services.http — shared transport, retry policy and circuit breaker."""
+
+import asyncio
+
+import httpx
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+
+from services.http import AsyncRetryTransport, CircuitBreaker, CircuitOpenError, HttpTransport, RETRY_STATUSES
+
+
+def _response(status):
+    r = MagicMock(spec=requests.Response)
+    r.status_code = status
+    return r
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("example.com", failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker("example.com", failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker("example.com", failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.state == "half-open"
+        assert breaker.allow()
+        assert not breaker.allow()  # second caller waits for the probe
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+
+class TestHttpTransport:
+    def test_default_timeout_applied(self):
+        transport = HttpTransport(connect_timeout=1, read_timeout=2)
+        with patch.object(transport.session, "request", return_value=_response(200)) as mock_request:
+            transport.get("https://places.googleapis.com/v1/places/abc")
+        assert mock_request.call_args.kwargs["timeout"] == (1, 2)
+
+    def test_explicit_timeout_wins(self):
+        transport = HttpTransport()
+        with patch.object(transport.session, "request", return_value=_response(200)) as mock_request:
+            transport.post("https://places.googleapis.com/v1/places:searchNearby", timeout=5)
+        assert mock_request.call_args.kwargs["timeout"] == 5
+
+    def test_server_errors_open_circuit(self):
+        transport = HttpTransport()
+        url = "https://places.googleapis.com/v1/places:searchNearby"
+        transport.breaker_for(url).failure_threshold = 2
+        with patch.object(transport.session, "request", return_value=_response(503)) as mock_request:
+            transport.post(url)
+            transport.post(url)
+            with pytest.raises(CircuitOpenError):
+                transport.post(url)
+        assert mock_request.call_count == 2
+
+    def test_circuit_open_is_a_request_exception(self):
+        # Providers catch requests.RequestException; an open circuit must be handled the same way
+        assert issubclass(CircuitOpenError, requests.RequestException)
+
+    def test_connection_errors_count_as_failures(self):
+        transport = HttpTransport()
+        url = "https://api.yelp.com/v3/businesses/abc"
+        with patch.object(transport.session, "request", side_effect=requests.ConnectionError("down")):
+            with pytest.raises(requests.ConnectionError):
+                transport.get(url)
+        assert transport.breaker_for(url).failures == 1
+
+    def test_circuits_are_per_host(self):
+        transport = HttpTransport()
+        transport.breaker_for("https://a.example.com/x").record_failure()
+        assert transport.breaker_for("https://b.example.com/x").failures == 0
+
+    def test_retry_policy_covers_post_and_rate_limits(self):
+        transport = HttpTransport(max_retries=3)
+        retry = transport.session.get_adapter("https://places.googleapis.com").max_retries
+        assert retry.total == 3
+        assert "POST" in retry.allowed_methods
+        assert set(RETRY_STATUSES) <= set(retry.status_forcelist)
+
+
+def _async_post(transport, url="https://places.googleapis.com/v1/places:searchNearby"):
+    async def get():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post(url)
+    return asyncio.run(get())
+
+
+class TestAsyncRetryTransport:
+    def test_retryable_status_is_retried(self):
+        statuses = iter([503, 200])
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(next(statuses))
+
+        response = _async_post(AsyncRetryTransport(httpx.MockTransport(handler), backoff_factor=0))
+        assert response.status_code == 200
+        assert len(calls) == 2
+
+    def test_gives_up_after_max_retries_with_last_response(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        transport = AsyncRetryTransport(httpx.MockTransport(handler), max_retries=2, backoff_factor=0)
+        assert _async_post(transport).status_code == 429
+        assert len(calls) == 3
+
+    def test_connection_errors_are_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200)
+
+        assert _async_post(AsyncRetryTransport(httpx.MockTransport(handler), backoff_factor=0)).status_code == 200
+        assert len(calls) == 2
+
+    def test_client_errors_are_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400)
+
+        assert _async_post(AsyncRetryTransport(httpx.MockTransport(handler), backoff_factor=0)).status_code == 400
+        assert len(calls) == 1
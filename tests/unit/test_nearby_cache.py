@@ -0,0 +1,125 @@
+"""Unit tests for services.cache.TTLCache and the searchNearby cache in GooglePlacesService."""
+
+import time
+from unittest.mock import patch
+
+from services.cache import TTLCache
+from services.google_service import GooglePlacesService, nearby_cache_key
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestTTLCache:
+    def test_miss_then_hit(self):
+        cache = TTLCache("t", ttl=60)
+        calls = []
+        loader = lambda: calls.append(1) or ["a"]
+        assert cache.get_or_load("k", loader) == ["a"]
+        assert cache.get_or_load("k", loader) == ["a"]
+        assert len(calls) == 1
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_empty_result_not_cached(self):
+        cache = TTLCache("t", ttl=60)
+        calls = []
+        loader = lambda: calls.append(1) or []
+        cache.get_or_load("k", loader)
+        cache.get_or_load("k", loader)
+        assert len(calls) == 2
+        assert len(cache) == 0
+
+    def test_expired_entry_is_a_miss(self):
+        cache = TTLCache("t", ttl=60)
+        with patch("services.cache.time.time", return_value=1000.0):
+            cache.set("k", ["old"])
+        with patch("services.cache.time.time", return_value=1061.0):
+            assert cache.get("k") is None
+
+    def test_stale_entry_served_and_refreshed(self):
+        cache = TTLCache("t", ttl=60, stale_ttl=600)
+        with patch("services.cache.time.time", return_value=time.time() - 120):
+            cache.set("k", ["old"])
+
+        assert cache.get_or_load("k", lambda: ["new"]) == ["old"]
+        assert cache.stale_hits == 1
+        assert _wait_for(lambda: cache.get("k") == ["new"])
+
+    def test_lru_eviction(self):
+        cache = TTLCache("t", ttl=60, max_entries=2)
+        cache.set("a", [1])
+        cache.set("b", [2])
+        cache.get("a")  # a is now most recently used
+        cache.set("c", [3])
+        assert cache.get("b") is None
+        assert cache.get("a") == [1]
+        assert cache.get("c") == [3]
+
+    def test_persisted_entries_survive_restart(self, tmp_path):
+        path = str(tmp_path / "cache.json")
+        cache = TTLCache("t", ttl=60, persist_path=path)
+        cache.set("k", [{"place_id": "p1"}])
+        cache.flush()
+        reloaded = TTLCache("t", ttl=60, persist_path=path)
+        assert reloaded.get("k") == [{"place_id": "p1"}]
+
+    def test_writes_are_batched_in_the_background(self, tmp_path):
+        path = tmp_path / "cache.json"
+        cache = TTLCache("t", ttl=60, persist_path=str(path), save_delay=0.05)
+        for i in range(50):
+            cache.set(f"k{i}", [i])
+        assert cache.saves == 0 and not path.exists()
+
+        deadline = time.time() + 2
+        while cache.saves == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert cache.saves == 1
+        assert len(TTLCache("t", ttl=60, persist_path=str(path))) == 50
+
+
+class TestNearbyCacheKey:
+    def test_rounds_centre_and_sorts_types(self):
+        a = nearby_cache_key({"latitude": 41.88271, "longitude": -87.64801}, 2000, ["bar", "pub"], 20)
+        b = nearby_cache_key({"latitude": 41.88269, "longitude": -87.64799}, 2000, ["pub", "bar"], 20)
+        assert a == b
+
+    def test_radius_changes_key(self):
+        centre = {"latitude": 41.8827, "longitude": -87.6480}
+        assert nearby_cache_key(centre, 2000, ["restaurant"], 20) != nearby_cache_key(centre, 1500, ["restaurant"], 20)
+
+
+class TestSearchNearbyCaching:
+    def _service(self):
+        service = GooglePlacesService()
+        service.api_key = "test-key"
+        service._nearby_cache = TTLCache("searchNearby", ttl=60)
+        return service
+
+    def test_repeat_query_skips_google(self):
+        service = self._service()
+        pool = [{"place_id": "p1", "name": "One"}]
+        with patch.object(service, "_fetch_nearby", return_value=pool) as mock_fetch:
+            first = service.search_nearby_candidates("Chicago", "West Loop")
+            second = service.search_nearby_candidates("Chicago", "West Loop")
+        assert first == second == pool
+        mock_fetch.assert_called_once()
+
+    def test_different_type_set_is_separate_entry(self):
+        service = self._service()
+        with patch.object(service, "_fetch_nearby", return_value=[{"place_id": "p1"}]) as mock_fetch:
+            service.search_nearby_candidates("Chicago", None, ["Casual"])
+            service.search_nearby_candidates("Chicago", None, ["Bar"])
+        assert mock_fetch.call_count == 2
+
+    def test_returned_list_is_a_copy(self):
+        service = self._service()
+        with patch.object(service, "_fetch_nearby", return_value=[{"place_id": "p1"}]):
+            first = service.search_nearby_candidates("Chicago")
+            first.clear()
+            assert service.search_nearby_candidates("Chicago") == [{"place_id": "p1"}]
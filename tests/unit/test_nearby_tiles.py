@@ -0,0 +1,153 @@
+"""
+Unit tests for wide candidate retrieval: nearby_searches() tiling and cuisine
+queries, merge_candidates(), and the concurrent fan-out in both Google services.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from services import google_service
+from services.cache import TTLCache
+from services.google_service import (
+    AsyncGooglePlacesService, GooglePlacesService, merge_candidates, nearby_searches,
+)
+
+CHICAGO = {"latitude": 41.8781, "longitude": -87.6298}
+
+
+@pytest.fixture(autouse=True)
+def tiling():
+    with patch.object(google_service, "NEARBY_TILING", True):
+        yield
+
+
+def _service():
+    service = GooglePlacesService()
+    service.api_key = "test-key"
+    service._nearby_cache = TTLCache("searchNearby", ttl=60)
+    return service
+
+
+def _fake_fetch(city, centre, radius, included_types, max_results):
+    """One distinct place per search, plus one every search shares."""
+    own = f"{centre['latitude']:.4f},{centre['longitude']:.4f}|{radius}|{included_types[0]}"
+    return [{"place_id": own}, {"place_id": "shared"}]
+
+
+def _distance_m(centre, point):
+    dlat = (point[0] - centre["latitude"]) * 111_320
+    dlng = (point[1] - centre["longitude"]) * 111_320 * math.cos(math.radians(centre["latitude"]))
+    return math.hypot(dlat, dlng)
+
+
+class TestNearbySearches:
+    def test_small_radius_is_one_search(self):
+        assert nearby_searches(CHICAGO, 2000, ["restaurant"]) == [(CHICAGO, 2000, ["restaurant"])]
+
+    def test_large_radius_is_tiled_and_tiles_cover_the_circle(self):
+        searches = nearby_searches(CHICAGO, 8000, ["restaurant"])
+        assert len(searches) == 7
+        for angle in range(0, 360, 10):
+            point = (
+                CHICAGO["latitude"] + 8000 * math.sin(math.radians(angle)) / 111_320,
+                CHICAGO["longitude"] + 8000 * math.cos(math.radians(angle)) / (111_320 * math.cos(math.radians(CHICAGO["latitude"]))),
+            )
+            assert any(_distance_m(centre, point) <= radius for centre, radius, _ in searches)
+
+    def test_tiling_can_be_disabled(self):
+        with patch.object(google_service, "NEARBY_TILING", False):
+            assert len(nearby_searches(CHICAGO, 8000, ["restaurant"])) == 1
+
+    def test_cuisine_queries_for_restaurant_searches_only(self):
+        cuisines = ["thai_restaurant", "bar", "thai_restaurant", "ramen_restaurant", None]
+        searches = nearby_searches(CHICAGO, 2000, ["restaurant"], cuisines)
+        assert [types for _, _, types in searches] == [["restaurant"], ["thai_restaurant"], ["ramen_restaurant"]]
+        assert len(nearby_searches(CHICAGO, 2000, ["bar", "pub"], cuisines)) == 1
+
+    def test_cuisine_queries_are_capped(self):
+        cuisines = [f"cuisine{i}_restaurant" for i in range(10)]
+        searches = nearby_searches(CHICAGO, 2000, ["restaurant"], cuisines)
+        assert len(searches) == 1 + google_service.NEARBY_CUISINE_QUERIES
+
+
+def test_merge_keeps_first_candidate_per_place_id():
+    merged = merge_candidates([[{"place_id": "a", "n": 1}], [{"place_id": "a", "n": 2}, {"place_id": "b"}]])
+    assert merged == [{"place_id": "a", "n": 1}, {"place_id": "b"}]
+
+
+class TestSyncFanOut:
+    def test_tiles_and_cuisines_are_merged_and_deduplicated(self):
+        service = _service()
+        with patch.object(service, "_fetch_nearby", side_effect=_fake_fetch) as fetch:
+            results = service.search_nearby_candidates("Chicago", cuisine_types=["thai_restaurant"])
+        assert fetch.call_count == 8
+        ids = [c["place_id"] for c in results]
+        assert len(ids) == len(set(ids)) == 9
+        assert ids[0].endswith("|8000|restaurant")   # whole-circle search first
+
+    @pytest.mark.parametrize("limit, expected_peak", [(None, 7), (3, 3)])
+    def test_searches_run_concurrently_with_bounded_parallelism(self, limit, expected_peak):
+        service = _service()
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def slow_fetch(*args):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return _fake_fetch(*args)
+
+        concurrency = google_service.NEARBY_MAX_CONCURRENCY if limit is None else limit
+        with patch.object(google_service, "NEARBY_MAX_CONCURRENCY", concurrency), \
+                patch.object(service, "_fetch_nearby", side_effect=slow_fetch):
+            service.search_nearby_candidates("Chicago")
+        # By default all 7 tile searches run in a single wave
+        assert peak[0] == expected_peak
+
+    def test_cached_searches_are_not_refetched(self):
+        service = _service()
+        with patch.object(service, "_fetch_nearby", side_effect=_fake_fetch) as fetch:
+            service.search_nearby_candidates("Chicago")
+            service.search_nearby_candidates("Chicago", cuisine_types=["thai_restaurant"])
+        # 7 tiles once, then only the new cuisine search
+        assert fetch.call_count == 8
+
+
+class TestAsyncFanOut:
+    def test_async_service_issues_every_search_and_fills_shared_cache(self):
+        sync_service = _service()
+        bodies = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            bodies.append(body)
+            circle = body["locationRestriction"]["circle"]
+            place_id = f"{circle['center']['latitude']:.4f}|{body['includedTypes'][0]}"
+            return httpx.Response(200, json={"places": [
+                {"id": place_id, "displayName": {"text": place_id}},
+                {"id": "shared", "displayName": {"text": "Shared"}},
+            ]})
+
+        async def run():
+            service = AsyncGooglePlacesService(sync_service)
+            service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return await service.search_nearby_candidates("Chicago", cuisine_types=["thai_restaurant"])
+
+        results = asyncio.run(run())
+        assert len(bodies) == 8
+        assert len({c["place_id"] for c in results}) == len(results)
+        assert "shared" in {c["place_id"] for c in results}
+
+        # The sync service now serves the same wide search from cache
+        with patch.object(sync_service, "_fetch_nearby") as fetch:
+            assert len(sync_service.search_nearby_candidates("Chicago", cuisine_types=["thai_restaurant"])) == len(results)
+        fetch.assert_not_called()
@@ -0,0 +1,79 @@
+"""Unit tests for prerank — local candidate scoring, top-K trimming and the LLM-free fallback."""
+
+from prerank import fallback_rank, score_candidates, top_k
+from tests.conftest import make_candidate
+
+
+PROFILE = {
+    "preferred_price_level": "PRICE_LEVEL_MODERATE",
+    "top_cuisine_types": ["italian_restaurant", "pizza_restaurant"],
+    "prefers_dine_in": True,
+    "prefers_reservable": True,
+}
+
+
+def _c(place_id, **kwargs):
+    return make_candidate(name=f"Place {place_id}", place_id=place_id, **kwargs)
+
+
+class TestScoreCandidates:
+    def test_columns_align_with_candidates(self):
+        candidates = [_c("a"), _c("b"), _c("c")]
+        columns = score_candidates(candidates, PROFILE)
+        assert set(columns) == {"price", "cuisine", "service", "quality", "revisit", "total"}
+        assert all(len(col) == 3 for col in columns.values())
+
+    def test_price_distance(self):
+        candidates = [_c("a", price_level="PRICE_LEVEL_MODERATE"), _c("b", price_level="PRICE_LEVEL_VERY_EXPENSIVE")]
+        price = score_candidates(candidates, PROFILE)["price"]
+        assert price[0] == 1.0
+        assert price[1] == 0.5
+
+    def test_cuisine_overlap_prefers_top_type(self):
+        candidates = [_c("a", primary_type="italian_restaurant"), _c("b", primary_type="pizza_restaurant"), _c("c", primary_type="bar")]
+        cuisine = score_candidates(candidates, PROFILE)["cuisine"]
+        assert cuisine[0] > cuisine[1] > cuisine[2] == 0.0
+
+    def test_rating_is_smoothed_by_review_count(self):
+        few = _c("few", rating=5.0)
+        few["user_rating_count"] = 3
+        many = _c("many", rating=4.7)
+        many["user_rating_count"] = 3000
+        quality = score_candidates([few, many], {})["quality"]
+        assert quality[1] > quality[0]
+
+    def test_empty_profile_is_neutral(self):
+        columns = score_candidates([_c("a", price_level=None)], {})
+        assert columns["price"][0] == columns["cuisine"][0] == columns["service"][0] == 0.5
+
+    def test_revisit_scaled_by_weight(self):
+        candidates = [_c("new"), _c("old", is_revisit=True)]
+        assert score_candidates(candidates, PROFILE, revisit_weight=0.0)["revisit"][1] == 0.0
+        assert score_candidates(candidates, PROFILE, revisit_weight=0.8)["revisit"][1] == 0.8
+
+
+class TestTopK:
+    def test_trims_and_orders_by_score(self):
+        candidates = [_c(f"x{i}", primary_type="bar", rating=4.0) for i in range(10)]
+        candidates.append(_c("best", primary_type="italian_restaurant", rating=4.8))
+        result = top_k(candidates, PROFILE, k=4)
+        assert len(result) == 4
+        assert result[0]["place_id"] == "best"
+
+    def test_ties_keep_incoming_order(self):
+        candidates = [_c("a"), _c("b"), _c("c")]
+        assert [c["place_id"] for c in top_k(candidates, {}, k=3)] == ["a", "b", "c"]
+
+
+class TestFallbackRank:
+    def test_result_shape_matches_rank_candidates(self):
+        candidates = [_c("a", primary_type="italian_restaurant", rating=4.6), _c("b"), _c("c"), _c("d")]
+        results = fallback_rank(candidates, PROFILE, num_recommendations=3)
+        assert len(results) == 3
+        assert results[0]["place_id"] == "a"
+        assert set(results[0]) == {"place_id", "name", "description", "reason", "address", "rating", "price_level"}
+        assert results[0]["reason"] == "Matches your taste for italian restaurant"
+        assert results[0]["description"]
+
+    def test_empty_pool(self):
+        assert fallback_rank([], PROFILE, 3) == []
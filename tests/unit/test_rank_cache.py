@@ -0,0 +1,80 @@
+"""Unit tests for the rank_candidates result cache in openai_example."""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from openai_example import rank_cache, rank_cache_key, rank_candidates
+from tests.conftest import make_candidate
+
+
+CANDIDATES = [make_candidate(f"Candidate {i}", f"pid_{i}") for i in range(1, 5)]
+PROFILE = {"preferred_price_level": "PRICE_LEVEL_MODERATE", "top_cuisine_types": ["restaurant"]}
+
+
+@pytest.fixture(autouse=True)
+def empty_rank_cache():
+    rank_cache.invalidate()
+    rank_cache.hits = rank_cache.misses = 0
+    yield
+    rank_cache.invalidate()
+
+
+def _client(text="1. Candidate 1 - Because you liked X - Great spot\n2. Candidate 2 - Because you liked Y - Cozy"):
+    client = MagicMock()
+    client.messages.create.return_value = MagicMock(content=[MagicMock(text=text)])
+    return client
+
+
+def _rank(candidates=CANDIDATES, **overrides):
+    kwargs = dict(taste_profile=PROFILE, candidates=candidates, liked_names=["A"], disliked_names=[], city="Chicago")
+    kwargs.update(overrides)
+    return rank_candidates(**kwargs)
+
+
+class TestRankCache:
+    def test_repeat_call_skips_llm(self):
+        client = _client()
+        with patch("openai_example.get_anthropic_client", return_value=client):
+            first = _rank()
+            second = _rank()
+        assert first == second
+        assert [r["place_id"] for r in first] == ["pid_1", "pid_2"]
+        assert client.messages.create.call_count == 1
+        assert rank_cache.hits == 1 and rank_cache.misses == 1
+
+    def test_cached_results_are_copies(self):
+        with patch("openai_example.get_anthropic_client", return_value=_client()):
+            _rank()[0]["name"] = "mutated"
+            assert _rank()[0]["name"] == "Candidate 1"
+
+    def test_failed_call_not_cached(self):
+        client = _client()
+        client.messages.create.side_effect = [RuntimeError("overloaded"), client.messages.create.return_value]
+        with patch("openai_example.get_anthropic_client", return_value=client):
+            assert _rank() == []
+            assert len(_rank()) == 2
+        assert client.messages.create.call_count == 2
+
+
+class TestRankCacheKey:
+    def _key(self, **overrides):
+        kwargs = dict(taste_profile=PROFILE, candidates=CANDIDATES, liked_names=["A", "B"], disliked_names=[])
+        kwargs.update(overrides)
+        return rank_cache_key(**kwargs)
+
+    def test_alpha_within_bucket_shares_key(self):
+        assert self._key(alpha=0.8) == self._key(alpha=0.95)
+        assert self._key(alpha=0.8) != self._key(alpha=0.5)
+
+    def test_revisit_weight_buckets(self):
+        assert self._key(revisit_weight=0.4) == self._key(revisit_weight=0.6)
+        assert self._key(revisit_weight=0.0) != self._key(revisit_weight=0.1)
+
+    def test_name_order_ignored_but_candidate_order_kept(self):
+        assert self._key(liked_names=["A", "B"]) == self._key(liked_names=["B", "A"])
+        assert self._key(candidates=list(reversed(CANDIDATES))) != self._key()
+
+    def test_profile_and_filters_change_key(self):
+        assert self._key(taste_profile={**PROFILE, "min_rating": 4.5}) != self._key()
+        assert self._key(neighborhood="West Loop") != self._key()
+        assert self._key(restaurant_types=["Bar"]) != self._key()
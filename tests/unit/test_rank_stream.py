@@ -0,0 +1,69 @@
+"""Unit tests for openai_example.stream_rank_candidates (incremental line parsing)."""
+
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from openai_example import rank_cache, stream_rank_candidates
+from tests.conftest import make_candidate
+
+
+CANDIDATES = [make_candidate(f"Candidate {i}", f"pid_{i}") for i in range(1, 5)]
+
+
+@pytest.fixture(autouse=True)
+def empty_rank_cache():
+    rank_cache.invalidate()
+    yield
+    rank_cache.invalidate()
+
+
+def _streaming_client(chunks, consumed):
+    @contextmanager
+    def stream(**kwargs):
+        def text_stream():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+        yield MagicMock(text_stream=text_stream())
+
+    client = MagicMock()
+    client.messages.stream.side_effect = stream
+    return client
+
+
+def _stream(**overrides):
+    kwargs = dict(taste_profile={}, candidates=CANDIDATES, liked_names=[], disliked_names=[], city="Chicago")
+    kwargs.update(overrides)
+    return stream_rank_candidates(**kwargs)
+
+
+class TestStreamRankCandidates:
+    def test_yields_each_line_as_it_completes(self):
+        consumed = []
+        chunks = ["2. Candidate 2 - Because you liked X", " - Great\n1. Cand", "idate 1 - Because you liked Y - Cozy\n", "3. Candidate 3 - x - y"]
+        with patch("openai_example.get_anthropic_client", return_value=_streaming_client(chunks, consumed)):
+            gen = _stream()
+            first = next(gen)
+            # The first pick is out before the rest of the response has been read
+            assert first["place_id"] == "pid_2"
+            assert len(consumed) == 2
+            rest = list(gen)
+        assert [r["place_id"] for r in rest] == ["pid_1", "pid_3"]
+
+    def test_stops_at_num_recommendations_and_caches(self):
+        consumed = []
+        chunks = ["1. A - reason here - d\n", "2. B - reason here - d\n", "3. C - reason here - d\n"]
+        client = _streaming_client(chunks, consumed)
+        with patch("openai_example.get_anthropic_client", return_value=client):
+            assert len(list(_stream(num_recommendations=2))) == 2
+            assert len(consumed) == 2
+            # Second call is served from the rank cache
+            assert [r["place_id"] for r in _stream(num_recommendations=2)] == ["pid_1", "pid_2"]
+        assert client.messages.stream.call_count == 1
+
+    def test_error_yields_nothing(self):
+        client = MagicMock()
+        client.messages.stream.side_effect = RuntimeError("overloaded")
+        with patch("openai_example.get_anthropic_client", return_value=client):
+            assert list(_stream()) == []
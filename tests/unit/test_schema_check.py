@@ -0,0 +1,52 @@
+"""
+Unit tests for schema_check.check_on_startup — which SCHEMA_CHECK modes run
+the (patched) verification and when the marker file short-circuits it.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import schema_check
+
+
+@pytest.fixture()
+def fake_app(tmp_path):
+    return SimpleNamespace(instance_path=str(tmp_path / "instance"))
+
+
+def _startup(fake_app, mode, current=True):
+    with patch.object(schema_check, "SCHEMA_CHECK", mode), \
+            patch("schema_check.verify_schema", return_value=current) as verify:
+        schema_check.check_on_startup(fake_app)
+    return verify.call_count
+
+
+class TestCheckOnStartup:
+    def test_marker_mode_verifies_once(self, fake_app):
+        assert _startup(fake_app, "marker") == 1
+        assert _startup(fake_app, "marker") == 0
+
+    def test_marker_for_older_migration_does_not_skip(self, fake_app, tmp_path):
+        (tmp_path / "instance").mkdir()
+        (tmp_path / "instance" / "schema_verified.b2c3d4e5f6a7").write_text("b2c3d4e5f6a7")
+        assert _startup(fake_app, "marker") == 1
+
+    def test_startup_mode_always_verifies(self, fake_app):
+        schema_check.write_marker(fake_app)
+        assert _startup(fake_app, "startup") == 1
+
+    def test_off_never_verifies(self, fake_app):
+        assert _startup(fake_app, "off") == 0
+
+    def test_failed_check_writes_no_marker(self, fake_app):
+        with patch.object(schema_check, "SCHEMA_CHECK", "marker"), \
+                patch("schema_check.verify_schema", side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                schema_check.check_on_startup(fake_app)
+        assert _startup(fake_app, "marker") == 1
+
+    def test_pending_migrations_write_no_marker(self, fake_app):
+        assert _startup(fake_app, "marker", current=False) == 1
+        assert _startup(fake_app, "marker") == 1
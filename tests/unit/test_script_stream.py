@@ -0,0 +1,135 @@
+"""
+Unit tests for the streamed results in static/script.js: each submission
+replaces the previous cards. The script runs under node with a minimal fake
+DOM and a scripted fetch; skipped when node is not installed.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "..", "static", "script.js")
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+HARNESS = r"""
+const vm = require('vm');
+const fs = require('fs');
+
+function card(name) {
+    return { isCard: true, name, querySelectorAll: () => [] };
+}
+
+class Element {
+    constructor() { this.children = []; this.style = {}; }
+    set innerHTML(html) {
+        this.children = [];
+        for (const m of html.matchAll(/<h3 class="restaurant-name">([^<]*)<\/h3>/g)) this.children.push(card(m[1]));
+    }
+    get firstElementChild() { return this.children[0]; }
+    appendChild(child) { this.children.push(child); }
+    querySelector(selector) { return selector === '.recommendation-card' ? (this.children.find(c => c.isCard) || null) : null; }
+    querySelectorAll() { return []; }
+    scrollIntoView() {}
+    addEventListener() {}
+}
+
+// One scripted SSE response per fetch() call
+class Stream {
+    constructor() { this.chunks = []; this.waiting = null; this.done = false; }
+    send(event, data) { this.push(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`); }
+    push(text) {
+        const chunk = { done: false, value: new TextEncoder().encode(text) };
+        if (this.waiting) { this.waiting(chunk); this.waiting = null; } else this.chunks.push(chunk);
+    }
+    end() {
+        if (this.waiting) { this.waiting({ done: true }); this.waiting = null; } else this.done = true;
+    }
+    read() {
+        if (this.chunks.length) return Promise.resolve(this.chunks.shift());
+        if (this.done) return Promise.resolve({ done: true });
+        return new Promise(resolve => { this.waiting = resolve; });
+    }
+}
+
+const output = new Element();
+const streams = [];
+const context = vm.createContext({
+    console, TextDecoder, TextEncoder, Promise, JSON,
+    window: { innerWidth: 1024 },
+    document: {
+        getElementById: id => (id === 'recommendations-output' ? output : null),
+        createElement: () => new Element(),
+        addEventListener() {},
+    },
+    fetch: () => {
+        const stream = new Stream();
+        streams.push(stream);
+        return Promise.resolve({
+            headers: { get: () => 'text/event-stream' },
+            body: { getReader: () => stream },
+        });
+    },
+});
+vm.runInContext(fs.readFileSync(process.argv[process.argv.length - 1], 'utf8'), context);
+
+const names = () => output.children.filter(c => c.isCard).map(c => c.name);
+const tick = () => new Promise(resolve => setTimeout(resolve, 0));
+const loading = { style: {} };
+
+(async () => {
+    const result = {};
+
+    // Two submissions in a row
+    let done = context.showStreamedRecommendations({}, loading);
+    await tick();
+    streams[0].send('recommendation', { id: 1, name: 'First A' });
+    streams[0].send('recommendation', { id: 2, name: 'First B' });
+    streams[0].end();
+    await done;
+    result.first = names();
+
+    done = context.showStreamedRecommendations({}, loading);
+    await tick();
+    streams[1].send('recommendation', { id: 3, name: 'Second A' });
+    streams[1].end();
+    await done;
+    result.sequential = names();
+
+    // A new submission while the previous stream is still open
+    const stale = context.showStreamedRecommendations({}, loading);
+    await tick();
+    done = context.showStreamedRecommendations({}, loading);
+    await tick();
+    streams[3].send('recommendation', { id: 5, name: 'Fourth A' });
+    streams[2].send('recommendation', { id: 4, name: 'Third A' });
+    streams[2].end();
+    streams[3].end();
+    await Promise.all([stale, done]);
+    result.overlapping = names();
+
+    console.log(JSON.stringify(result));
+})();
+"""
+
+
+def _run_harness():
+    completed = subprocess.run(
+        ["node", "-e", HARNESS, os.path.abspath(SCRIPT)],
+        capture_output=True, text=True, timeout=30,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_second_submission_replaces_first_cards():
+    result = _run_harness()
+    assert result["first"] == ["First A", "First B"]
+    assert result["sequential"] == ["Second A"]
+
+
+def test_superseded_stream_is_ignored():
+    assert _run_harness()["overlapping"] == ["Fourth A"]
@@ -0,0 +1,199 @@
+"""
+Unit tests for services.singleflight.SingleFlight and the places/rank call
+sites that coalesce through it.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import openai_example
+from openai_example import rank_cache, rank_candidates
+from services.cache import TTLCache
+from services.google_service import GooglePlacesService
+from services.singleflight import SingleFlight, SingleFlightTimeout
+from tests.conftest import make_candidate
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def _gated(result=None, error=None):
+    """(fn, gate, calls): fn blocks until gate is set, then returns result or raises error."""
+    gate = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        gate.wait(5)
+        if error is not None:
+            raise error
+        return result
+
+    return fn, gate, calls
+
+
+def _run_concurrently(flight, key, fn, callers, **kwargs):
+    """Start `callers` threads on flight.do(key, fn) once the first one leads; returns their futures."""
+    pool = ThreadPoolExecutor(max_workers=callers)
+    futures = [pool.submit(flight.do, key, fn, **kwargs)]
+    assert _wait_for(lambda: flight.in_flight() == 1)
+    futures += [pool.submit(flight.do, key, fn, **kwargs) for _ in range(callers - 1)]
+    assert _wait_for(lambda: flight.shared == callers - 1)
+    pool.shutdown(wait=False)
+    return futures
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight("t")
+        result = ["shared"]
+        fn, gate, calls = _gated(result)
+        futures = _run_concurrently(flight, "k", fn, callers=5)
+        gate.set()
+
+        assert all(f.result(timeout=2) is result for f in futures)
+        assert len(calls) == 1
+        assert flight.stats()["leaders"] == 1 and flight.stats()["shared"] == 4
+        assert flight.in_flight() == 0
+
+    def test_error_reaches_every_caller(self):
+        flight = SingleFlight("t")
+        fn, gate, calls = _gated(error=RuntimeError("quota"))
+        futures = _run_concurrently(flight, "k", fn, callers=3)
+        gate.set()
+
+        for f in futures:
+            with pytest.raises(RuntimeError, match="quota"):
+                f.result(timeout=2)
+        assert len(calls) == 1
+
+    def test_follower_times_out_but_leader_finishes(self):
+        flight = SingleFlight("t")
+        fn, gate, _ = _gated("late")
+        leader, follower = _run_concurrently(flight, "k", fn, callers=2, timeout=0.05)
+
+        with pytest.raises(SingleFlightTimeout):
+            follower.result(timeout=2)
+        gate.set()
+        assert leader.result(timeout=2) == "late"
+        assert flight.timeouts == 1
+
+    def test_finished_call_is_not_reused(self):
+        flight = SingleFlight("t")
+        calls = []
+        assert flight.do("k", lambda: calls.append(1) or len(calls)) == 1
+        assert flight.do("k", lambda: calls.append(1) or len(calls)) == 2
+
+    def test_different_keys_do_not_coalesce(self):
+        flight = SingleFlight("t")
+        fn, gate, calls = _gated("x")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(flight.do, key, fn) for key in ("a", "b")]
+            assert _wait_for(lambda: len(calls) == 2)
+            gate.set()
+        assert [f.result() for f in futures] == ["x", "x"]
+
+    def test_async_caller_joins_threaded_leader(self):
+        flight = SingleFlight("t")
+        fn, gate, calls = _gated(["from thread"])
+        leader = threading.Thread(target=flight.do, args=("k", fn))
+        leader.start()
+        assert _wait_for(lambda: flight.in_flight() == 1)
+
+        async def follow():
+            async def never_called():
+                raise AssertionError("follower ran the call")
+            threading.Timer(0.05, gate.set).start()
+            return await flight.do_async("k", never_called)
+
+        assert asyncio.run(follow()) == ["from thread"]
+        leader.join(2)
+        assert len(calls) == 1
+
+    def test_cancelled_async_leader_does_not_cancel_follower(self):
+        flight = SingleFlight("t")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(10)  # the leader's caller hits its deadline first
+            return "fetched"
+
+        async def main():
+            leader = asyncio.create_task(flight.do_async("k", fetch))
+            await asyncio.sleep(0.01)
+            follower = asyncio.create_task(flight.do_async("k", fetch))
+            await asyncio.to_thread(_wait_for, lambda: flight.shared == 1)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.wait_for(follower, 2)
+
+        assert asyncio.run(main()) == "fetched"
+        assert len(calls) == 2
+        assert flight.in_flight() == 0
+
+
+class TestCoalescedCallSites:
+    def test_concurrent_nearby_misses_make_one_request(self):
+        service = GooglePlacesService()
+        service.api_key = "test-key"
+        service._nearby_cache = TTLCache("searchNearby", ttl=60)
+        fetch, gate, calls = _gated([{"place_id": "p1"}])
+
+        with patch.object(service, "_fetch_nearby", side_effect=lambda *args: fetch()):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(service.search_nearby_candidates, "Chicago", "West Loop") for _ in range(4)]
+                assert _wait_for(lambda: service._flight.shared == 3)
+                gate.set()
+            results = [f.result() for f in futures]
+
+        assert results == [[{"place_id": "p1"}]] * 4
+        assert len(calls) == 1
+
+    def test_shared_details_are_copied_per_caller(self):
+        service = GooglePlacesService()
+        service.api_key = "test-key"
+        details = {"place_id": "p1", "name": "One"}
+        with patch.object(service, "_fetch_details", return_value=details):
+            first = service.get_details("p1")
+        first["name"] = "mutated"
+        assert details["name"] == "One"
+
+    def test_concurrent_identical_rank_calls_make_one_llm_call(self):
+        rank_cache.invalidate()
+        gate = threading.Event()
+        client = MagicMock()
+
+        def create(**kwargs):
+            gate.wait(5)
+            return MagicMock(content=[MagicMock(text="1. Candidate 1 - Because - Great")])
+
+        client.messages.create.side_effect = create
+        candidates = [make_candidate(f"Candidate {i}", f"pid_{i}") for i in range(1, 4)]
+        kwargs = dict(taste_profile={}, candidates=candidates, liked_names=[], disliked_names=[], city="Chicago")
+        shared_before = openai_example.rank_flight.shared
+
+        with patch("openai_example.get_anthropic_client", return_value=client):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                futures = [pool.submit(rank_candidates, **kwargs) for _ in range(3)]
+                assert _wait_for(lambda: openai_example.rank_flight.shared - shared_before == 2)
+                gate.set()
+            results = [f.result() for f in futures]
+
+        rank_cache.invalidate()
+        assert client.messages.create.call_count == 1
+        assert [r[0]["place_id"] for r in results] == ["pid_1"] * 3
+        assert results[0] is not results[1]
@@ -0,0 +1,132 @@
+"""
+Unit tests for write_behind.WriteBehindQueue — batching, backpressure, retries,
+the spool and shutdown. The handler is a plain function; no database involved.
+"""
+
+import json
+import os
+import threading
+from unittest.mock import patch
+
+from write_behind import WriteBehindQueue
+
+
+def _queue(handler, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    kwargs.setdefault("enqueue_timeout", 0.01)
+    return WriteBehindQueue("test_log", handler, encode=json.dumps, decode=json.loads, **kwargs)
+
+
+class TestWriteBehindQueue:
+    def test_items_reach_handler_in_batches(self):
+        batches = []
+        gate = threading.Event()
+        # Hold the worker on the first batch so the rest queue up
+        q = _queue(lambda items: (gate.wait(1), batches.append(items)), batch_size=3)
+
+        for i in range(7):
+            assert q.submit(i)
+        gate.set()
+        assert q.flush(timeout=2)
+        q.close()
+
+        assert [i for batch in batches for i in batch] == list(range(7))
+        assert all(len(batch) <= 3 for batch in batches)
+        assert q.stats()["written"] == 7
+
+    def test_disabled_queue_refuses_items(self):
+        q = _queue(lambda items: None, enabled=False)
+        assert q.submit("event") is False
+
+    def test_full_queue_refuses_instead_of_blocking(self):
+        gate = threading.Event()
+        q = _queue(lambda items: gate.wait(2), maxsize=1, batch_size=1)
+
+        accepted = [q.submit(i) for i in range(4)]
+        gate.set()
+        q.flush(timeout=2)
+        q.close()
+
+        # One item is with the worker and one fills the queue; the rest are refused
+        assert accepted[:2] == [True, True]
+        assert False in accepted[2:]
+        assert q.stats()["rejected"] == accepted.count(False)
+
+    def test_failed_batch_is_retried(self):
+        calls = []
+
+        def flaky(items):
+            calls.append(list(items))
+            if len(calls) == 1:
+                raise RuntimeError("database unavailable")
+
+        q = _queue(flaky)
+        with patch("write_behind.time.sleep"):
+            q.submit("event")
+            assert q.flush(timeout=2)
+        q.close()
+
+        assert calls == [["event"], ["event"]]
+        assert q.stats()["written"] == 1 and q.stats()["failed"] == 0
+
+    def test_poison_item_only_drops_itself(self):
+        gate = threading.Event()
+
+        def handler(items):
+            gate.wait(1)
+            if "poison" in items:
+                raise ValueError("constraint violation")
+
+        q = _queue(handler, batch_size=3)
+        with patch("write_behind.time.sleep"):
+            for item in ("a", "poison", "b"):
+                q.submit(item)
+            gate.set()
+            assert q.flush(timeout=2)
+        q.close()
+
+        assert q.stats()["written"] == 2 and q.stats()["failed"] == 1
+
+    def test_close_drains_queue(self):
+        written = []
+        q = _queue(written.extend)
+        for i in range(5):
+            q.submit(i)
+        q.close()
+        assert written == list(range(5))
+        assert q.submit(99) is False
+
+
+class TestSpool:
+    def test_pending_items_are_spooled_and_cleared(self, tmp_path):
+        gate = threading.Event()
+        q = _queue(lambda items: gate.wait(2), batch_size=1, spool_dir=str(tmp_path))
+        q.submit({"n": 1})
+        q.submit({"n": 2})
+
+        spool = tmp_path / f"test_log.{os.getpid()}.jsonl"
+        assert [json.loads(line) for line in spool.read_text().splitlines()] == [{"n": 1}, {"n": 2}]
+
+        gate.set()
+        assert q.flush(timeout=2)
+        q.close()
+        assert not spool.exists()
+
+    def test_orphaned_spool_is_replayed(self, tmp_path):
+        # A spool left by a process that no longer exists
+        orphan = tmp_path / "test_log.999999999.jsonl"
+        orphan.write_text('{"n": 1}\n{"n": 2}\nnot json\n')
+        replayed = []
+        done = threading.Event()
+
+        def handler(items):
+            replayed.extend(items)
+            done.set()
+
+        q = _queue(handler, spool_dir=str(tmp_path))
+        q.submit({"n": 3})
+        assert done.wait(2) and q.flush(timeout=2)
+        q.close()
+
+        assert replayed == [{"n": 1}, {"n": 2}, {"n": 3}]
+        assert list(tmp_path.iterdir()) == []
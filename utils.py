@@ -1,5 +1,19 @@
 import re
 from slugify import slugify as pyslugify
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Dialects whose insert() has on_conflict_do_nothing() and RETURNING
+CONFLICT_INSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def conflict_insert(session):
+    """The bound dialect's insert() construct if it supports ON CONFLICT, else None."""
+    return CONFLICT_INSERTS.get(session.get_bind().dialect.name)
+
 
 def generate_slug(name: str, city: str) -> str:
     """
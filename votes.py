@@ -0,0 +1,99 @@
+"""
+Atomic feedback voting.
+
+A vote toggles: voting the same way again removes the vote, voting the other
+way switches it. cast_vote() reads the user's current vote and applies the
+transition with a single-row conditional statement:
+
+    DELETE  ... WHERE vote_type = :v             same vote again  -> delta -v
+    UPDATE  ... SET vote_type = :v WHERE = -:v   switch           -> delta 2v
+    INSERT  ... ON CONFLICT DO NOTHING           first vote       -> delta v
+
+The delta only counts if the statement matched a row. If it didn't, the same
+user's parallel request changed the row in between, and the read is retried. The
+materialized FeedbackSuggestion.score is then moved with
+`score = score + :delta ... RETURNING score`, never read-modify-written in
+Python, so concurrent voters can't lose each other's updates. That UPDATE is
+the last statement before the caller's commit, so the suggestion row lock is
+held for one round trip.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, FeedbackSuggestion, FeedbackVote
+from utils import conflict_insert
+
+VOTE_TYPES = (1, -1)
+MAX_ATTEMPTS = 3
+
+
+def cast_vote(user_id: int, suggestion_id: int, vote_type: int) -> Optional[Tuple[int, int]]:
+    """
+    Apply a vote in the current transaction; the caller commits.
+    Returns (delta, new_score), or None if the suggestion does not exist.
+    """
+    if vote_type not in VOTE_TYPES:
+        raise ValueError(f"vote_type must be one of {VOTE_TYPES}, got {vote_type!r}")
+    exists = db.session.execute(
+        select(FeedbackSuggestion.id).where(FeedbackSuggestion.id == suggestion_id)
+    ).first()
+    if exists is None:
+        return None
+
+    delta = _apply_vote(user_id, suggestion_id, vote_type)
+    new_score = db.session.execute(
+        update(FeedbackSuggestion)
+        .where(FeedbackSuggestion.id == suggestion_id)
+        .values(score=FeedbackSuggestion.score + delta)
+        .returning(FeedbackSuggestion.score)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    return delta, new_score
+
+
+def _apply_vote(user_id: int, suggestion_id: int, vote_type: int) -> int:
+    """Move the user's FeedbackVote row to its next state; returns the score delta."""
+    this_vote = and_(FeedbackVote.user_id == user_id, FeedbackVote.suggestion_id == suggestion_id)
+    for attempt in range(MAX_ATTEMPTS):
+        # The read only picks which conditional statement to try; that statement's
+        # WHERE re-checks it, and a miss means the row changed under us
+        current = db.session.execute(select(FeedbackVote.vote_type).where(this_vote)).scalar()
+
+        if current == vote_type:
+            removed = db.session.execute(
+                delete(FeedbackVote).where(this_vote, FeedbackVote.vote_type == vote_type)
+                .execution_options(synchronize_session=False)
+            )
+            if removed.rowcount:
+                return -vote_type
+        elif current == -vote_type:
+            switched = db.session.execute(
+                update(FeedbackVote).where(this_vote, FeedbackVote.vote_type == -vote_type)
+                .values(vote_type=vote_type)
+                .execution_options(synchronize_session=False)
+            )
+            if switched.rowcount:
+                return 2 * vote_type
+        elif _insert_vote(user_id, suggestion_id, vote_type):
+            return vote_type
+        logging.debug(f"vote race for user {user_id} on suggestion {suggestion_id}, retrying ({attempt + 1})")
+    raise RuntimeError(f"Could not apply vote for user {user_id} on suggestion {suggestion_id}")
+
+
+def _insert_vote(user_id: int, suggestion_id: int, vote_type: int) -> bool:
+    """Insert a first vote; False if a row for (user, suggestion) appeared in the meantime."""
+    values = {"user_id": user_id, "suggestion_id": suggestion_id, "vote_type": vote_type}
+    dialect_insert = conflict_insert(db.session)
+    if dialect_insert is not None:
+        result = db.session.execute(dialect_insert(FeedbackVote.__table__).values(**values).on_conflict_do_nothing())
+        return bool(result.rowcount)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(FeedbackVote.__table__).values(**values))
+        return True
+    except IntegrityError:
+        return False
@@ -0,0 +1,279 @@
+"""
+In-process write-behind queue.
+
+Producers hand items to submit() and return immediately; a daemon thread
+drains the queue in batches of up to `batch_size` and passes each batch to
+`handler` (which does the actual writes and commits).
+
+- Backpressure: the queue is bounded. submit() waits at most `enqueue_timeout`
+  for space, then returns False and the caller writes the item itself, so a
+  slow or unavailable database turns into inline writes, not unbounded memory.
+- Spool: with `spool_dir` set, every accepted item is appended to a per-process
+  JSONL file before submit() returns. The file is rewritten to the items
+  still outstanding after each batch is handled. Files left behind by a crashed process are
+  claimed and replayed by the next process that starts a worker. Delivery is
+  at-least-once.
+- Failures: a batch is retried MAX_ATTEMPTS times, then its items are written
+  one at a time so a single bad item only drops itself.
+- Shutdown: close() is registered with atexit when the worker starts and waits
+  up to `shutdown_timeout` seconds for the queue to drain.
+
+The worker is started lazily on the first submit() and restarted after a fork,
+so pre-forking servers get one worker per process.
+"""
+
+import atexit
+import glob
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+MAX_ATTEMPTS = 3
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], None],
+        encode: Callable[[Any], str],
+        decode: Callable[[str], Any],
+        maxsize: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        enqueue_timeout: float = 0.05,
+        shutdown_timeout: float = 5.0,
+        spool_dir: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.handler = handler
+        self.encode = encode
+        self.decode = decode
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.spool_dir = spool_dir
+        self.enabled = enabled
+
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def submit(self, item: Any) -> bool:
+        """
+        Queue item for the worker. False means it was not accepted (disabled,
+        closed, or still full after enqueue_timeout) and the caller must write it.
+        """
+        if not self.enabled:
+            return False
+        self._ensure_worker()
+        if self._stop.is_set():
+            return False
+
+        # Held across put and spool append, so the worker can't finish an item before it is recorded
+        with self._lock:
+            key = next(self._keys)
+            try:
+                self._queue.put((key, item), timeout=self.enqueue_timeout)
+            except queue.Full:
+                self.rejected += 1
+                logging.warning(f"{self.name}: queue full ({self.maxsize}), writing inline")
+                return False
+            self._pending[key] = item
+            self._append_spool(item)
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted item has been handled; False if timeout passed first."""
+        if self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Stop accepting items and give the worker shutdown_timeout seconds to drain the queue."""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._worker.join(self.shutdown_timeout)
+        if self._worker.is_alive():
+            logging.warning(f"{self.name}: {self._queue.qsize()} items still queued at shutdown"
+                            + (", left in spool" if self.spool_dir else ", dropped"))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "queued": self._queue.qsize() if self._pid == os.getpid() else 0,
+            "written": self.written,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Fresh state per process: queues, locks and threads don't survive a fork
+            self._queue = queue.Queue(self.maxsize)
+            self._lock = threading.Lock()
+            self._stop = threading.Event()
+            self._keys = itertools.count()
+            self._pending = OrderedDict()  # key -> item, submitted but not yet handled
+            self._spool_path = None
+            orphans = []
+            if self.spool_dir:
+                os.makedirs(self.spool_dir, exist_ok=True)
+                self._spool_path = os.path.join(self.spool_dir, f"{self.name}.{os.getpid()}.jsonl")
+                items, claimed = self._claim_orphans()
+                orphans = [(next(self._keys), item) for item in items]
+                self._pending.update(orphans)
+                # Orphans are in this process's spool before their old files go
+                self._rewrite_spool()
+                for path in claimed:
+                    os.remove(path)
+
+            self._worker = threading.Thread(target=self._run, args=(orphans,), name=f"{self.name}-writer", daemon=True)
+            self._pid = os.getpid()
+            self._worker.start()
+            atexit.register(self.close)
+
+    def _run(self, orphans):
+        if orphans:
+            logging.info(f"{self.name}: replaying {len(orphans)} spooled items")
+            for start in range(0, len(orphans), self.batch_size):
+                self._handle(orphans[start:start + self.batch_size])
+
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._handle(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _handle(self, batch):
+        """Pass (key, item) pairs to the handler with retries, then drop them from the spool."""
+        items = [item for _, item in batch]
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                self.handler(items)
+                self.written += len(items)
+                break
+            except Exception as e:
+                logging.warning(f"{self.name}: writing {len(items)} items failed (attempt {attempt}/{MAX_ATTEMPTS}): {e}")
+                if attempt < MAX_ATTEMPTS:
+                    time.sleep(0.2 * 2 ** attempt)
+        else:
+            self._handle_each(items)
+
+        with self._lock:
+            for key, _ in batch:
+                self._pending.pop(key, None)
+            self._rewrite_spool()
+
+    def _handle_each(self, items):
+        """After a batch has failed MAX_ATTEMPTS times: write item by item, dropping only the items that fail."""
+        if len(items) > 1:
+            logging.warning(f"{self.name}: retrying {len(items)} items one at a time")
+        for item in items:
+            try:
+                self.handler([item])
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"{self.name}: dropped item after {MAX_ATTEMPTS} batch attempts: {e}")
+
+    # ------------------------------------------------------------------
+    # Spool
+    # ------------------------------------------------------------------
+
+    def _append_spool(self, item):
+        if not self._spool_path:
+            return
+        try:
+            with open(self._spool_path, "a") as f:
+                f.write(self.encode(item) + "\n")
+        except OSError as e:
+            logging.warning(f"{self.name}: could not append to {self._spool_path}: {e}")
+
+    def _rewrite_spool(self):
+        if not self._spool_path:
+            return
+        try:
+            if not self._pending:
+                if os.path.exists(self._spool_path):
+                    os.remove(self._spool_path)
+                return
+            tmp_path = f"{self._spool_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(self.encode(item) + "\n" for item in self._pending.values())
+            os.replace(tmp_path, self._spool_path)
+        except OSError as e:
+            logging.warning(f"{self.name}: could not rewrite {self._spool_path}: {e}")
+
+    def _claim_orphans(self):
+        """
+        Read spool files whose process is gone (or whose pid this process has
+        reused). Returns (items, claimed paths); the caller deletes the paths
+        once the items are safe in its own spool.
+        """
+        items, claimed_paths = [], []
+        for path in glob.glob(os.path.join(self.spool_dir, f"{self.name}.*.jsonl")):
+            pid = path.rsplit(".", 2)[-2]
+            if not pid.isdigit() or (int(pid) != os.getpid() and _pid_alive(int(pid))):
+                continue
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)  # only one process wins the rename
+                with open(claimed) as f:
+                    lines = [line for line in f if line.strip()]
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    items.append(self.decode(line))
+                except ValueError as e:
+                    logging.warning(f"{self.name}: skipping unreadable spool line in {path}: {e}")
+            claimed_paths.append(claimed)
+        return items, claimed_paths
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True